@@ -14,28 +14,56 @@ from PIL import Image
 import re
 import pytesseract 
 from collections import defaultdict, Counter
-from pymongo import MongoClient
 from datetime import datetime
+import atexit
+import threading
+from ocr_workers import OCRWorkerPool, OCRBusyError, OCRTimeoutError, DEFAULT_WORKERS
+from ocr_cache import OCRResultCache, image_key
+from attempt_logger import AttemptLogger, get_db
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# Initialize EasyOCR reader with optimized settings
-cuda_available = torch.cuda.is_available()
-reader = easyocr.Reader(
-    ['en'],
-    gpu=cuda_available,
+# EasyOCR reader settings shared by the worker processes
+READER_SETTINGS = dict(
     verbose=False,
     model_storage_directory='./easyocr_models',
     recog_network='english_g2',
     download_enabled=True
 )
+
+# OCR runs in a pool of worker processes, each loading its own reader.
+# Set OCR_WORKERS=0 to run a single reader inside the Flask process instead.
+_reader = None
+_reader_lock = threading.Lock()
+
+# Engine cascade: stages run cheapest first and stop once one of them
+# reaches CASCADE_THRESHOLD confidence (0-1)
+CASCADE_THRESHOLD = float(os.getenv('OCR_CASCADE_THRESHOLD', 0.85))
+TEXT_CASCADE = os.getenv('OCR_TEXT_CASCADE', 'tesseract,easyocr_greedy,easyocr_beam').split(',')
+CHAR_CASCADE = os.getenv('OCR_CHAR_CASCADE', 'tesseract_psm10,tesseract_psm6,tesseract_psm8,easyocr').split(',')
+LETTER_WHITELIST = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+cascade_stats = Counter()
+
+# Cache of OCR results keyed by normalized image content
+ocr_cache = OCRResultCache()
+
+def get_reader():
+    """Return the OCR backend, starting it on first use"""
+    global _reader
+    with _reader_lock:
+        if _reader is None:
+            if DEFAULT_WORKERS > 0:
+                _reader = OCRWorkerPool(num_workers=DEFAULT_WORKERS, **READER_SETTINGS)
+                atexit.register(_reader.shutdown)
+            else:
+                _reader = easyocr.Reader(['en'], gpu=torch.cuda.is_available(), **READER_SETTINGS)
+    return _reader
+
 def test_mongo_connection():
     try:
-        client = MongoClient('mongodb://localhost:27017/', serverSelectionTimeoutMS=5000)
-        client.server_info()  # Force connection to check if server is available
-
-        db = client['language_learning_db']
+        db = get_db()
+        db.client.server_info()  # Force connection to check if server is available
 
         # Check and create collections if they don't exist
         if 'writing' not in db.list_collection_names():
@@ -51,6 +79,9 @@ def test_mongo_connection():
         return f"Error: {e}"
 
 print(test_mongo_connection())
+
+# Attempt records are written behind the response by a background flusher
+attempt_logger = AttemptLogger()
 # Enhanced practice content
 letters = list("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz")
 words = [
@@ -76,11 +107,53 @@ sentences = [
 spell = SpellChecker()
 spell.word_frequency.load_words(words + [word.lower() for word in words])
 
-def preprocess_image(image, is_single_char=False):
-    """Enhanced preprocessing with case preservation"""
+# Ink region settings: crops are padded by INK_PADDING (fraction of the ink
+# box) and downscaled so the ink is at most this many pixels tall
+INK_PADDING = 0.15
+TARGET_INK_HEIGHT = {'char': 64, 'text': 96}
+
+def crop_to_ink(gray, is_single_char=False):
+    """Crop a grayscale canvas to its ink bounding box, padded and downscaled.
+
+    Returns the crop and an roi dict with the crop offsets and scale, so
+    coordinates on the crop can be mapped back to the original canvas:
+    original = roi offset + crop coordinate / roi scale.
+    """
+    height, width = gray.shape
+    roi = {'x': 0, 'y': 0, 'width': width, 'height': height, 'scale': 1.0}
+    
+    # Dark strokes on a light canvas
+    ink = cv2.findNonZero((gray < 128).view(np.uint8))
+    if ink is None:
+        return gray, roi
+    
+    x, y, w, h = cv2.boundingRect(ink)
+    pad = max(4, int(max(w, h) * INK_PADDING))
+    x0, y0 = max(0, x - pad), max(0, y - pad)
+    x1, y1 = min(width, x + w + pad), min(height, y + h + pad)
+    crop = gray[y0:y1, x0:x1]
+    
+    # Only ever shrink - upscaling adds no detail
+    target = TARGET_INK_HEIGHT['char' if is_single_char else 'text']
+    scale = min(1.0, target / max(h, 1))
+    if scale < 1.0:
+        crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    
+    roi.update({'x': x0, 'y': y0, 'width': x1 - x0, 'height': y1 - y0, 'scale': round(scale, 4)})
+    return crop, roi
+
+def preprocess_image(image, is_single_char=False, return_roi=False):
+    """Enhanced preprocessing with case preservation.
+    
+    The canvas is cropped to its ink region before thresholding; pass
+    return_roi=True to also get the crop offsets (see crop_to_ink).
+    """
     # Convert to grayscale
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     
+    # Skip the whitespace - work only on the ink region
+    gray, roi = crop_to_ink(gray, is_single_char)
+    
     # Contrast enhancement
     clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
     enhanced = clahe.apply(gray)
@@ -106,80 +179,47 @@ def preprocess_image(image, is_single_char=False):
         kernel = np.ones((2, 2), np.uint8)
         processed = cv2.morphologyEx(combined, cv2.MORPH_CLOSE, kernel)
     
+    if return_roi:
+        return processed, roi
     return processed
 
+def decode_image(image_data):
+    """Decode a base64 data URL or raw bytes into an OpenCV image"""
+    if isinstance(image_data, str):
+        if image_data.startswith('data:image'):
+            image_data = image_data.split(',')[1]
+        image_bytes = base64.b64decode(image_data)
+        nparr = np.frombuffer(image_bytes, np.uint8)
+    else:
+        nparr = np.frombuffer(image_data, np.uint8)
+    
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
 def extract_text(image_data, is_single_char=False):
     """Enhanced text extraction with case preservation"""
     try:
         # Handle image data
-        if isinstance(image_data, str):
-            if image_data.startswith('data:image'):
-                image_data = image_data.split(',')[1]
-            image_bytes = base64.b64decode(image_data)
-            nparr = np.frombuffer(image_bytes, np.uint8)
-        else:
-            nparr = np.frombuffer(image_data, np.uint8)
-            
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        image = decode_image(image_data)
         
         if image is None:
             return None, "Could not decode image"
         
+        # Repeat submissions of the same drawing are served from cache
+        cache_key = image_key(image, 'char' if is_single_char else 'text')
+        cached = ocr_cache.get(cache_key)
+        if cached is not None:
+            return cached, None
+        
         # Preprocess based on content type
         processed = preprocess_image(image, is_single_char)
         
-        # Multi-engine OCR approach
-        texts = []
-        confidences = []
-        
-        # EasyOCR configuration
-        easy_results = reader.readtext(
-            processed,
-            paragraph=False,
-            decoder='beamsearch',
-            beamWidth=10,
-            batch_size=4,
-            min_size=10,
-            text_threshold=0.4,
-            low_text=0.3,
-            link_threshold=0.3,
-            contrast_ths=0.1,
-            adjust_contrast=0.5,
-            add_margin=0.1
+        # Adaptive engine cascade - cheapest engine first, stop when confident
+        extracted_text, _, _, _ = run_cascade(
+            TEXT_CASCADE,
+            lambda stage: run_text_stage(stage, processed, is_single_char)
         )
         
-        if easy_results:
-            result_text = ' '.join([r[1] for r in easy_results])
-            avg_confidence = sum([r[2] for r in easy_results]) / len(easy_results) if easy_results else 0
-            texts.append(result_text)
-            confidences.append(avg_confidence)
-        
-        # Tesseract configuration
-        try:
-            config = '--psm 6 --oem 3 -c preserve_interword_spaces=1'
-            if is_single_char:
-                config = '--psm 10 --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
-            
-            tess_text = pytesseract.image_to_string(processed, config=config).strip()
-            
-            if tess_text:
-                texts.append(tess_text)
-                data = pytesseract.image_to_data(processed, config=config, output_type=pytesseract.Output.DICT)
-                if data['conf']:
-                    valid_confs = [c for c in data['conf'] if c != -1]
-                    avg_tess_conf = sum(valid_confs) / len(valid_confs) if valid_confs else 0
-                    confidences.append(avg_tess_conf / 100)
-        except Exception:
-            pass
-        
-        # Select best result
-        if texts:
-            if confidences:
-                best_idx = confidences.index(max(confidences))
-                extracted_text = texts[best_idx]
-            else:
-                extracted_text = max(texts, key=len)
-            
+        if extracted_text:
             # Clean text while preserving case
             extracted_text = clean_text(extracted_text)
             
@@ -189,13 +229,171 @@ def extract_text(image_data, is_single_char=False):
             else:
                 corrected_text = extracted_text
             
-            return corrected_text.strip(), None
+            corrected_text = corrected_text.strip()
+            ocr_cache.set(cache_key, corrected_text)
+            return corrected_text, None
         else:
             return None, "No text detected"
     
+    except (OCRBusyError, OCRTimeoutError):
+        # Overload, not a bad image - callers answer 503
+        raise
     except Exception as e:
         return None, f"Error processing image: {str(e)}"
 
+def tesseract_read(image, config):
+    """Text and confidence (0-1) from a single Tesseract image_to_data call"""
+    data = pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
+    words = []
+    confs = []
+    for text, conf in zip(data['text'], data['conf']):
+        conf = float(conf)
+        if text.strip() and conf >= 0:
+            words.append(text.strip())
+            confs.append(conf)
+    
+    if not words:
+        return '', 0.0
+    return ' '.join(words), sum(confs) / len(confs) / 100
+
+def easyocr_read(image, **kwargs):
+    """Text and average confidence (0-1) from EasyOCR"""
+    results = get_reader().readtext(image, paragraph=False, **kwargs)
+    if not results:
+        return '', 0.0
+    return ' '.join(r[1] for r in results), sum(r[2] for r in results) / len(results)
+
+def run_text_stage(stage, processed, is_single_char):
+    """Run one engine of the word/sentence cascade"""
+    if stage == 'tesseract':
+        config = '--psm 6 --oem 3 -c preserve_interword_spaces=1'
+        if is_single_char:
+            config = f'--psm 10 --oem 3 -c tessedit_char_whitelist={LETTER_WHITELIST}'
+        return tesseract_read(processed, config)
+    
+    easy_settings = dict(
+        batch_size=4,
+        min_size=10,
+        text_threshold=0.4,
+        low_text=0.3,
+        link_threshold=0.3,
+        contrast_ths=0.1,
+        adjust_contrast=0.5,
+        add_margin=0.1
+    )
+    if stage == 'easyocr_greedy':
+        return easyocr_read(processed, decoder='greedy', **easy_settings)
+    if stage == 'easyocr_beam':
+        return easyocr_read(processed, decoder='beamsearch', beamWidth=10, **easy_settings)
+    raise ValueError(f"Unknown OCR stage: {stage}")
+
+def run_char_stage(stage, resized):
+    """Run one engine of the single character cascade"""
+    if stage.startswith('tesseract_psm'):
+        psm = stage[len('tesseract_psm'):]
+        config = f'--psm {psm} --oem 3 -c tessedit_char_whitelist={LETTER_WHITELIST}'
+        text, confidence = tesseract_read(resized, config)
+    elif stage == 'easyocr':
+        text, confidence = easyocr_read(
+            resized,
+            min_size=10,
+            text_threshold=0.2,
+            low_text=0.1,
+            link_threshold=0.2,
+        )
+    else:
+        raise ValueError(f"Unknown OCR stage: {stage}")
+    return text[:1], confidence
+
+def run_cascade(stages, run_stage, threshold=None):
+    """Run OCR stages in order until one is confident enough.
+
+    Returns (best_text, best_confidence, answering_stage, attempts) where
+    attempts lists (stage, text, confidence) for every stage that ran.
+    """
+    if threshold is None:
+        threshold = CASCADE_THRESHOLD
+    
+    best_text, best_conf, best_stage = '', 0.0, None
+    attempts = []
+    for stage in stages:
+        try:
+            text, confidence = run_stage(stage)
+        except (OCRBusyError, OCRTimeoutError):
+            raise
+        except Exception as e:
+            print(f"OCR stage {stage} failed: {e}")
+            continue
+        
+        if not text:
+            continue
+        attempts.append((stage, text, confidence))
+        if best_stage is None or confidence > best_conf:
+            best_text, best_conf, best_stage = text, confidence, stage
+        if confidence >= threshold:
+            break
+    
+    if best_stage:
+        cascade_stats[best_stage] += 1
+    return best_text, best_conf, best_stage, attempts
+
+def recognize_batch(images, is_single_char=False):
+    """Recognize several preprocessed images with a single EasyOCR call.
+
+    The crops are stacked vertically onto one canvas and passed to
+    reader.recognize with one box per crop, so the recognizer runs them
+    as a single batch instead of once per image.
+    Returns a list of (text, confidence) tuples in input order.
+    """
+    if not images:
+        return []
+    
+    # Normalise every crop to the same height so they batch cleanly
+    target_height = 64
+    margin = 8
+    crops = []
+    for img in images:
+        height, width = img.shape[:2]
+        scale = target_height / max(height, 1)
+        new_width = max(1, int(width * scale))
+        crops.append(cv2.resize(img, (new_width, target_height), interpolation=cv2.INTER_AREA))
+    
+    canvas_width = max(c.shape[1] for c in crops) + 2 * margin
+    canvas_height = len(crops) * (target_height + margin) + margin
+    canvas = np.zeros((canvas_height, canvas_width), dtype=np.uint8)
+    
+    horizontal_list = []
+    row_starts = []
+    y = margin
+    for crop in crops:
+        width = crop.shape[1]
+        canvas[y:y+target_height, margin:margin+width] = crop
+        horizontal_list.append([margin, margin + width, y, y + target_height])
+        row_starts.append(y)
+        y += target_height + margin
+    
+    allowlist = LETTER_WHITELIST if is_single_char else None
+    batch_results = get_reader().recognize(
+        canvas,
+        horizontal_list=horizontal_list,
+        free_list=[],
+        decoder='beamsearch',
+        beamWidth=10,
+        batch_size=len(crops),
+        allowlist=allowlist,
+        contrast_ths=0.1,
+        adjust_contrast=0.5
+    )
+    
+    # Map each result back to its crop using the box's top edge
+    results = [('', 0.0)] * len(images)
+    for box, text, confidence in batch_results:
+        top = min(point[1] for point in box)
+        idx = min(range(len(row_starts)), key=lambda i: abs(row_starts[i] - top))
+        results[idx] = (text, float(confidence))
+    
+    return results
+
 def clean_text(text):
     """Clean while preserving case and basic punctuation"""
     # Remove special characters except basic punctuation and letters
@@ -313,6 +511,8 @@ def evaluate_writing():
             'is_correct': is_correct,
             'feedback': feedback
         })
+    except (OCRBusyError, OCRTimeoutError) as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -351,6 +551,11 @@ def convert_letter():
         nparr = np.frombuffer(image_data, np.uint8)
         img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
         
+        cache_key = image_key(img, 'convert')
+        cached = ocr_cache.get(cache_key)
+        if cached is not None:
+            return jsonify(cached)
+        
         # Special preprocessing for single character
         processed = preprocess_image(img, is_single_char=True)
         
@@ -363,36 +568,13 @@ def convert_letter():
         square[start_y:start_y+height, start_x:start_x+width] = processed
         resized = cv2.resize(square, (64, 64), interpolation=cv2.INTER_CUBIC)
         
-        # Multi-engine recognition
-        results = []
-        confidences = []
-        
-        # Tesseract with different configurations
-        for psm in [10, 6, 8]:  # Try single char first, then other modes
-            config = f'--psm {psm} --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
-            text = pytesseract.image_to_string(resized, config=config).strip()
-            if text:
-                results.append(text[0])
-                data = pytesseract.image_to_data(resized, config=config, output_type=pytesseract.Output.DICT)
-                if data['conf']:
-                    confidences.append(float(data['conf'][0]) if data['conf'] else 0)
-                else:
-                    confidences.append(0)
-        
-        # EasyOCR for single character
-        easy_result = reader.readtext(
-            resized,
-            detail=1,
-            paragraph=False,
-            min_size=10,
-            text_threshold=0.2,
-            low_text=0.1,
-            link_threshold=0.2,
+        # Engine cascade, stopping early on a confident character
+        _, _, answered_by, attempts = run_cascade(
+            CHAR_CASCADE,
+            lambda stage: run_char_stage(stage, resized)
         )
-        
-        if easy_result and easy_result[0][1]:
-            results.append(easy_result[0][1][0])
-            confidences.append(float(easy_result[0][2]) if len(easy_result[0]) > 2 else 0)
+        results = [text for _, text, _ in attempts]
+        confidences = [conf * 100 for _, _, conf in attempts]
         
         # Decision logic with confidence threshold
         final_char = ""
@@ -418,18 +600,39 @@ def convert_letter():
                 final_char = counts.most_common(1)[0][0]
                 max_conf = 50  # Default confidence for fallback
         
-        return jsonify({
+        response = {
             'success': True,
             'text': final_char,
             'confidence': max_conf,
-            'all_detected': ''.join(set(results)) if results else ""
-        })
+            'all_detected': ''.join(set(results)) if results else "",
+            'stage': answered_by
+        }
+        ocr_cache.set(cache_key, response)
+        
+        return jsonify(response)
+    except (OCRBusyError, OCRTimeoutError) as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         })
 
+@app.route('/api/ocr/stats', methods=['GET'])
+def ocr_stats():
+    """Report OCR queue depth and worker utilization"""
+    engine = get_reader()
+    if isinstance(engine, OCRWorkerPool):
+        stats = engine.stats()
+    else:
+        stats = {'workers': 0, 'mode': 'in-process'}
+    stats['cache'] = ocr_cache.stats()
+    stats['cascade'] = dict(cascade_stats)
+    return jsonify(stats)
+
 @app.route('/api/generate/letters', methods=['GET'])
 def generate_letter_questions():
     """Generate letter practice questions"""
@@ -514,44 +717,8 @@ def evaluate_single_test_answer():
         is_correct = score >= 70
         feedback = generate_feedback(extracted_text, target, score, content_type)
         
-        # MongoDB operations
-        try:
-            client = MongoClient('mongodb://localhost:27017/')
-            db = client['language_learning_db']
-            current_time = datetime.now()
-            
-            # Update cumulative score (+1 only if correct)
-            if is_correct:
-                result = db.overall.update_one(
-                    {'username': username},
-                    {
-                        '$inc': {'score': 1},  # Always +1 if correct
-                        '$setOnInsert': {  # Only set these on new document creation
-                            'username': username,
-                            'created_at': current_time
-                        },
-                        '$set': {  # Always update these
-                            'last_updated': current_time,
-                            'last_activity': content_type
-                        }
-                    },
-                    upsert=True  # Create document if it doesn't exist
-                )
-            
-            # Store individual attempts in writing collection
-            db.writing.insert_one({
-                'username': username,
-                'score': 1 if is_correct else 0,  # Store 1 if correct, 0 otherwise
-                'content_type': content_type,
-                'timestamp': current_time,
-                'accuracy': score,
-                'is_correct': is_correct
-            })
-            
-            print(f"Updated cumulative score for {username}")
-        
-        except Exception as db_error:
-            print(f"Database error: {str(db_error)}")
+        # Queue the attempt - the score upsert and insert happen in the background
+        attempt_logger.log_attempt(username, content_type, score, is_correct)
         
         return jsonify({
             'extracted_text': extracted_text,
@@ -561,15 +728,105 @@ def evaluate_single_test_answer():
             'feedback': feedback
         })
         
+    except (OCRBusyError, OCRTimeoutError) as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/test/evaluate-batch', methods=['POST'])
+def evaluate_batch_test_answers():
+    """Evaluate a whole answer sheet with one batched OCR pass"""
+    try:
+        data = request.json
+        answers = data.get('answers', [])
+        content_type = data.get('type', 'letter')
+        username = data.get('username', 'User')
+        is_single_char = content_type == 'letter'
+        
+        if not answers:
+            return jsonify({'error': 'No answers provided'}), 400
+        
+        # Preprocess every image that still needs OCR
+        extracted = [None] * len(answers)
+        errors = [None] * len(answers)
+        rois = [None] * len(answers)
+        pending_idx = []
+        pending_images = []
+        for i, answer in enumerate(answers):
+            if answer.get('extracted_text'):
+                extracted[i] = clean_text(answer['extracted_text'])
+            elif answer.get('image'):
+                image = decode_image(answer['image'])
+                if image is None:
+                    errors[i] = "Could not decode image"
+                    continue
+                processed, rois[i] = preprocess_image(image, is_single_char, return_roi=True)
+                pending_idx.append(i)
+                pending_images.append(processed)
+            else:
+                errors[i] = "No evaluation data provided"
+        
+        # One recognizer call for the whole sheet
+        for i, (text, confidence) in zip(pending_idx, recognize_batch(pending_images, is_single_char)):
+            text = clean_text(text)
+            if not is_single_char and text:
+                text = correct_text(text)
+            if text:
+                extracted[i] = text.strip()
+            else:
+                errors[i] = "No text detected"
+        
+        results = []
+        correct_count = 0
+        current_time = datetime.now()
+        for i, answer in enumerate(answers):
+            target = answer.get('target', '')
+            if errors[i]:
+                results.append({'id': answer.get('id', i + 1), 'target': target, 'error': errors[i]})
+                continue
+            
+            extracted_text = extracted[i]
+            if len(target) == 1 and len(extracted_text) >= 1:
+                accuracy = 1.0 if extracted_text[0] == target else 0.0
+            else:
+                accuracy = calculate_similarity(extracted_text, target)
+            
+            score = min(100, int(accuracy * 100))
+            is_correct = score >= 70
+            if is_correct:
+                correct_count += 1
+            
+            results.append({
+                'id': answer.get('id', i + 1),
+                'extracted_text': extracted_text,
+                'target': target,
+                'accuracy': score,
+                'is_correct': is_correct,
+                'feedback': generate_feedback(extracted_text, target, score, content_type),
+                'roi': rois[i]
+            })
+            attempt_logger.log_attempt(username, content_type, score, is_correct, current_time)
+        
+        return jsonify({
+            'results': results,
+            'count': len(results),
+            'correct': correct_count
+        })
+        
+    except (OCRBusyError, OCRTimeoutError) as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/attempts/stats', methods=['GET'])
+def attempt_log_stats():
+    """Report write-behind queue depth and lag"""
+    return jsonify(attempt_logger.stats())
+
 def get_total_score(username):
     """Helper function to get current total score"""
     try:
-        client = MongoClient('mongodb://localhost:27017/')
-        db = client['language_learning_db']
-        record = db.overall.find_one({'username': username})
+        record = get_db().overall.find_one({'username': username})
         return record['score'] if record else 0
     except:
         return 0
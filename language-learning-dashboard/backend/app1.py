@@ -1,5 +1,5 @@
-
-# Global variablesfrom flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, send_from_directory, abort
+import re
 from flask_cors import CORS
 import os
 import threading
@@ -8,27 +8,22 @@ import json
 import pygame
 import spacy
 import random
-from gtts import gTTS
+import hashlib
+from collections import namedtuple, OrderedDict
 import uuid
-import requests
 import speech_recognition as sr
-from deep_translator import GoogleTranslator
 from sentence_transformers import SentenceTransformer, util
-from flask import Flask
+from session_store import SessionStore
+from translation_cache import TranslationCache
+from audio_store import AudioStore
+from llm_gateway import get_gateway, LLMError
+
 app = Flask(__name__) 
-story_text = ""
-current_position = 0
-is_speaking = False
-is_listening = False
-story_completed = False
+CORS(app)
 api_key = os.getenv("GROQ_API_KEY")  # Replace with your actual key
+llm = get_gateway()
 TEMP_AUDIO_FILE = "temp_speech.mp3"
 
-# User preferences
-speech_speed = 1.0  # Default speed (1.0 = normal, 0.8 = slower, 1.2 = faster)
-target_language = "ta"  # Default target language (Tamil)
-difficulty_level = "beginner"  # Default difficulty level
-
 # Language options
 LANGUAGE_CODES = {
     "tamil": "ta",
@@ -41,17 +36,112 @@ LANGUAGE_CODES = {
     "korean": "ko"
 }
 
+# Where narration is heard: "browser" streams audio to the client,
+# "server" plays it on this machine's sound card (single user kiosks)
+NARRATION_OUTPUT = os.getenv("NARRATION_OUTPUT", "browser")
+
 # Load models
 bert_model = SentenceTransformer('all-MiniLM-L6-v2')
 nlp = spacy.load("en_core_web_sm")
 
-# User progress tracking
-user_progress = {
-    "stories_completed": 0,
-    "listening_time": 0,
-    "difficult_words": set(),
-    "quiz_scores": []
-}
+class ListeningSession:
+    """Story and progress state for one learner"""
+    __slots__ = (
+        "session_id", "story_text", "story_type", "current_position",
+        "is_speaking", "is_listening", "story_completed",
+        "speech_speed", "target_language", "difficulty_level",
+        "stories_completed", "listening_time", "difficult_words",
+        "quiz_correct", "quiz_total", "stop_event", "lock",
+        "events", "event_version", "last_event", "chunk_started_at"
+    )
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.story_text = ""
+        self.story_type = None
+        self.current_position = 0
+        self.is_speaking = False
+        self.is_listening = False
+        self.story_completed = False
+
+        # User preferences
+        self.speech_speed = 1.0  # Default speed (1.0 = normal, 0.8 = slower, 1.2 = faster)
+        self.target_language = "ta"  # Default target language (Tamil)
+        self.difficulty_level = "beginner"  # Default difficulty level
+
+        # User progress tracking
+        self.stories_completed = 0
+        self.listening_time = 0
+        self.difficult_words = set()
+        self.quiz_correct = 0
+        self.quiz_total = 0
+
+        # Signals the narration thread of this session to stop
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+
+        # Progress events for the server-push stream
+        self.events = threading.Condition()
+        self.event_version = 0
+        self.last_event = None
+
+        # When the browser fetched the chunk it is playing
+        self.chunk_started_at = None
+
+    def stop_narration(self):
+        """Stop this session's narration thread, if any"""
+        self.is_listening = False
+        self.stop_event.set()
+
+    def publish_status(self):
+        """Push the current progress to any open event streams.
+
+        The event carries the translation only if it is already cached, so
+        narration never waits on the translator; a missing one is fetched in
+        the background and pushed as a follow-up event.
+        """
+        event = build_status_event(self, cached_only=True)
+        version = self._push_event(event)
+        if event["translation"] is None:
+            threading.Thread(target=self._push_translation, args=(event, version), daemon=True).start()
+
+    def _push_event(self, event, after_version=None):
+        with self.events:
+            if after_version is not None and self.event_version != after_version:
+                return None  # Narration has moved on
+            self.event_version += 1
+            self.last_event = event
+            self.events.notify_all()
+            return self.event_version
+
+    def _push_translation(self, event, version):
+        translation = translate_text(event["current_sentence"], self.target_language)
+        self._push_event(dict(event, translation=translation), after_version=version)
+
+    def start_narration(self):
+        """Resume narration; the server only drives playback in server output mode"""
+        self.stop_event.set()
+        self.stop_event = threading.Event()
+        self.is_listening = True
+        self.chunk_started_at = None
+        if NARRATION_OUTPUT == "server":
+            threading.Thread(target=narrate_story, args=(self, self.stop_event), daemon=True).start()
+
+# Per-learner state, evicted after a period of inactivity
+sessions = SessionStore(
+    ListeningSession,
+    is_busy=lambda s: s.is_speaking,
+    on_evict=lambda s: s.stop_narration()
+)
+
+def get_session():
+    """Look up the calling learner's session from the request"""
+    session_id = request.args.get('session_id')
+    if not session_id and request.is_json:
+        session_id = (request.get_json(silent=True) or {}).get('session_id')
+    if not session_id:
+        session_id = request.form.get('session_id') or request.remote_addr or 'default'
+    return sessions.get(session_id)
 
 # Difficulty settings
 DIFFICULTY_SETTINGS = {
@@ -116,16 +206,16 @@ STORIES = {
 # Speech recognizer for pronunciation practice
 recognizer = sr.Recognizer()
 
-def translate_text(text, target_lang=None):
+# Translations are memoized in memory and in a local SQLite file
+translator = TranslationCache()
+
+def translate_text(text, target_lang="ta"):
     """Translate text to target language"""
-    if not target_lang:
-        target_lang = target_language
-        
-    try:
-        return GoogleTranslator(source="en", target=target_lang).translate(text)
-    except Exception as e:
-        print(f"Translation error: {e}")
-        return text  # Return original if translation fails
+    return translator.translate(text, target_lang)
+
+def translate_many(texts, target_lang="ta"):
+    """Translate several strings, fetching any uncached ones in one bulk call"""
+    return translator.translate_many(texts, target_lang)
 
 def get_word_difficulty(word):
     """Determine if a word should be highlighted as difficult"""
@@ -152,30 +242,105 @@ def get_word_definition(word):
     }
     return definitions.get(word.lower(), "Definition not available")
 
-def speak_text(text, stop_event=None):
-    global is_speaking
-    try:
-        is_speaking = True
-        temp_file = f"temp_speech_{uuid.uuid4().hex}.mp3"  # Unique filename
-        
-        # Use speech speed setting
-        slow_setting = speech_speed < 1.0
-        
-        # Enhanced TTS with human-like parameters
-        tts = gTTS(
-            text=text,
-            lang='en',
-            tld='com',  # Use 'com' domain for American English
-            slow=slow_setting,
-            lang_check=False  # Bypass strict language checking
-        )
-        
-        tts.save(temp_file)
-        
-        # Initialize pygame mixer with error handling
+# Parsed form of a story, built once per story content and shared read-only
+StoryAnalysis = namedtuple("StoryAnalysis", [
+    "content_hash",
+    "sentences",        # sentence texts, stripped
+    "sentence_words",   # alpha tokens longer than 3 chars, per sentence
+    "tokens",           # (text, pos, is_alpha) for every token
+    "words",            # unique lowercased alpha words longer than 3 chars
+    "analyzed_text"     # interactive transcript payload
+])
+
+_analysis_cache = {}
+_analysis_lock = threading.Lock()
+
+def analyze_story(story_text, key_vocabulary=()):
+    """Run spaCy over a story once and build its analysis record"""
+    doc = nlp(story_text)
+    
+    sentences = tuple(sent.text.strip() for sent in doc.sents)
+    sentence_words = tuple(
+        tuple(t.text for t in sent if t.is_alpha and len(t.text) > 3)
+        for sent in doc.sents
+    )
+    tokens = tuple((t.text, t.pos_, t.is_alpha) for t in doc)
+    words = tuple(dict.fromkeys(t.text.lower() for t in doc if t.is_alpha and len(t.text) > 3))
+    
+    analyzed_text = []
+    for text, pos, is_alpha in tokens:
+        if is_alpha:
+            difficulty = get_word_difficulty(text)
+            definition = get_word_definition(text) if difficulty != "easy" else ""
+            
+            analyzed_text.append({
+                "word": text,
+                "difficulty": difficulty,
+                "definition": definition,
+                "pos": pos,  # Part of speech
+                "is_key": text.lower() in key_vocabulary
+            })
+        else:
+            analyzed_text.append({
+                "word": text,
+                "is_punctuation": True
+            })
+    
+    return StoryAnalysis(
+        content_hash=story_hash(story_text),
+        sentences=sentences,
+        sentence_words=sentence_words,
+        tokens=tokens,
+        words=words,
+        analyzed_text=tuple(analyzed_text)
+    )
+
+def story_hash(story_text):
+    return hashlib.sha1(story_text.encode('utf-8')).hexdigest()
+
+def get_story_analysis(story_text, story_type=None):
+    """Return the cached analysis for a story, parsing it on first use.
+    
+    Entries are keyed by content hash, so editing a story's text produces a
+    new entry and drops the stale one for that story type.
+    """
+    key = (story_hash(story_text), story_type)
+    analysis = _analysis_cache.get(key)
+    if analysis is not None:
+        return analysis
+    
+    with _analysis_lock:
+        analysis = _analysis_cache.get(key)
+        if analysis is None:
+            key_vocabulary = tuple(STORIES.get(story_type, {}).get("key_vocabulary", []))
+            analysis = analyze_story(story_text, key_vocabulary)
+            # Invalidate older versions of the same story
+            for stale in [k for k in _analysis_cache if k[1] == story_type and k != key]:
+                del _analysis_cache[stale]
+            _analysis_cache[key] = analysis
+            # Quiz answers come from these sentences - embed them ahead of time
+            index_sentences(analysis.sentences)
+    return analysis
+
+# Synthesized speech is stored by content, shared with the tutor service.
+# Narration renders the next PRESYNTH_AHEAD chunks in the background.
+audio_store = AudioStore()
+PRESYNTH_AHEAD = int(os.getenv("PRESYNTH_AHEAD", 3))
+
+def synthesize_speech(text, session):
+    """Path to the narration clip for text, rendering it only if not cached"""
+    # Use 'com' domain for American English, slow speech for lower speeds
+    return audio_store.get(text, lang='en', tld='com', slow=session.speech_speed < 1.0)
+
+_mixer_lock = threading.Lock()
+
+def init_mixer():
+    """Initialize the pygame mixer once; it stays open between chunks"""
+    with _mixer_lock:
+        if pygame.mixer.get_init():
+            return
         try:
-            if not pygame.mixer.get_init():
-                pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=4096)
+            pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=4096)
         except Exception as e:
             print(f"Mixer initialization error: {e}")
             # Try with different parameters
@@ -184,17 +349,37 @@ def speak_text(text, stop_event=None):
             except Exception as e:
                 print(f"Fallback mixer initialization failed: {e}")
                 raise
+
+def audio_url_for(path):
+    return f"/api/audio/{os.path.basename(path)}" if path else None
+
+def speak_or_stream(text, session, stop_event=None):
+    """Speak text on the server, or return a URL the browser can play it from"""
+    if NARRATION_OUTPUT == "server":
+        threading.Thread(target=speak_text, args=(text, session, stop_event or threading.Event())).start()
+        return None
+    return audio_url_for(synthesize_speech(text, session))
+
+def speak_text(text, session, stop_event=None):
+    try:
+        session.is_speaking = True
+        
+        audio_file = synthesize_speech(text, session)
+        if not audio_file:
+            return
+        
+        init_mixer()
         
         # Load and play the audio
         try:
-            pygame.mixer.music.load(temp_file)
+            pygame.mixer.music.load(audio_file)
             pygame.mixer.music.set_volume(1.0)
             pygame.mixer.music.play()
             
             # Adjust playback rate if supported
             try:
-                if speech_speed != 1.0:
-                    pygame.mixer.music.set_pos(1.0 / speech_speed * 0.01)
+                if session.speech_speed != 1.0:
+                    pygame.mixer.music.set_pos(1.0 / session.speech_speed * 0.01)
             except:
                 pass
             
@@ -211,7 +396,7 @@ def speak_text(text, stop_event=None):
             
             # Update listening time
             if not stop_event or not stop_event.is_set():
-                user_progress["listening_time"] += (time.time() - start_time)
+                session.listening_time += (time.time() - start_time)
                 
         finally:
             # Clean up resources
@@ -221,50 +406,49 @@ def speak_text(text, stop_event=None):
     except Exception as e:
         print(f"Error in speech: {e}")
     finally:
-        # Ensure cleanup happens
-        if pygame.mixer.get_init():
-            pygame.mixer.quit()
-        if os.path.exists(temp_file):
-            try:
-                os.remove(temp_file)
-            except:
-                pass
-        is_speaking = False
+        session.is_speaking = False
 
-def get_next_chunk():
-    global current_position, story_text, story_completed
-    
-    # Parse sentences
-    doc = nlp(story_text)
-    sentences = [sent.text.strip() for sent in doc.sents]
+def get_next_chunk(session):
+    # Pre-parsed sentences
+    sentences = get_story_analysis(session.story_text, session.story_type).sentences
     
     # Get chunk size based on difficulty level
-    chunk_size = DIFFICULTY_SETTINGS.get(difficulty_level, {}).get("chunk_size", 1)
+    chunk_size = DIFFICULTY_SETTINGS.get(session.difficulty_level, {}).get("chunk_size", 1)
     
-    if current_position >= len(sentences):
-        story_completed = True
-        return None
-    
-    end_pos = min(current_position + chunk_size, len(sentences))
-    chunk = ' '.join(sentences[current_position:end_pos])
-    current_position = end_pos
+    with session.lock:
+        if session.current_position >= len(sentences):
+            session.story_completed = True
+            return None
+        
+        end_pos = min(session.current_position + chunk_size, len(sentences))
+        chunk = ' '.join(sentences[session.current_position:end_pos])
+        session.current_position = end_pos
     
     return chunk
 
-def ask_groq(question):
+def peek_chunks(session, count):
+    """The next count chunks after the current position, without advancing"""
+    sentences = get_story_analysis(session.story_text, session.story_type).sentences
+    chunk_size = DIFFICULTY_SETTINGS.get(session.difficulty_level, {}).get("chunk_size", 1)
+    
+    chunks = []
+    position = session.current_position
+    while len(chunks) < count and position < len(sentences):
+        end_pos = min(position + chunk_size, len(sentences))
+        chunks.append(' '.join(sentences[position:end_pos]))
+        position = end_pos
+    return chunks
+
+def ask_groq(question, session):
     try:
-        headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
         # Get difficulty-specific instructions
+        difficulty_level = session.difficulty_level
         vocab_level = DIFFICULTY_SETTINGS.get(difficulty_level, {}).get("vocabulary_level", "simple")
         
         # Enhanced system prompt with story context and difficulty level
         prompt = f"""
         You're an English tutor helping a {difficulty_level} student understand this story:
-        {story_text}
+        {session.story_text}
         
         Guidelines for your answers:
         1. Focus exclusively on the story content
@@ -276,34 +460,73 @@ def ask_groq(question):
         7. Avoid general English lessons unless directly relevant
         """
         
-        data = {
-            "model": "llama3-70b-8192",
-            "messages": [
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": question}
-            ],
-            "temperature": 0.5  # Lower for more focused answers
-        }
+        messages = [
+            {"role": "system", "content": prompt},
+            {"role": "user", "content": question}
+        ]
         
-        response = requests.post("https://api.groq.com/openai/v1/chat/completions", 
-                              headers=headers, json=data)
+        # Shared gateway: pooled connections, timeout, cached repeat questions
+        answer = llm.chat(
+            messages,
+            model="llama3-70b-8192",
+            temperature=0.5  # Lower for more focused answers
+        )
         
-        if response.status_code == 200:
-            answer = response.json()['choices'][0]['message']['content']
-            # Post-process to ensure brevity
-            if len(answer.split('.')) > 3:
-                answer = '.'.join(answer.split('.')[:3]) + '.'
-            return answer
-        return f"Error: {response.text}"
+        # Post-process to ensure brevity
+        if len(answer.split('.')) > 3:
+            answer = '.'.join(answer.split('.')[:3]) + '.'
+        return answer
     
+    except LLMError as e:
+        return str(e)
     except Exception as e:
         return f"API error: {str(e)}"
 
+# Sentence embeddings: story sentences are indexed up front, user inputs
+# go through a bounded LRU cache
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", 4096))
+_sentence_index = {}
+_input_embeddings = OrderedDict()
+_embedding_lock = threading.Lock()
+
+def index_sentences(sentences):
+    """Precompute embeddings for known sentences in one encode call"""
+    missing = [s for s in dict.fromkeys(sentences) if s not in _sentence_index]
+    if not missing:
+        return
+    embeddings = bert_model.encode(missing, batch_size=32)
+    with _embedding_lock:
+        for sentence, embedding in zip(missing, embeddings):
+            _sentence_index[sentence] = embedding
+
+def get_embeddings(texts):
+    """Embeddings for many texts, encoding all cache misses in a single batch"""
+    found = {}
+    missing = []
+    with _embedding_lock:
+        for text in dict.fromkeys(texts):
+            if text in _sentence_index:
+                found[text] = _sentence_index[text]
+            elif text in _input_embeddings:
+                _input_embeddings.move_to_end(text)
+                found[text] = _input_embeddings[text]
+            else:
+                missing.append(text)
+    
+    if missing:
+        embeddings = bert_model.encode(missing, batch_size=32)
+        with _embedding_lock:
+            for text, embedding in zip(missing, embeddings):
+                found[text] = embedding
+                _input_embeddings[text] = embedding
+            while len(_input_embeddings) > EMBEDDING_CACHE_SIZE:
+                _input_embeddings.popitem(last=False)
+    
+    return [found[text] for text in texts]
+
 def check_sentence_similarity(user_sentence, correct_sentence):
-    similarity = util.pytorch_cos_sim(
-        bert_model.encode(user_sentence),
-        bert_model.encode(correct_sentence)
-    ).item()
+    user_embedding, correct_embedding = get_embeddings([user_sentence, correct_sentence])
+    similarity = util.pytorch_cos_sim(user_embedding, correct_embedding).item()
     return similarity > 0.7
 
 def check_pronunciation(audio_file, text_to_check):
@@ -323,35 +546,38 @@ def check_pronunciation(audio_file, text_to_check):
     except Exception as e:
         return {"success": False, "error": str(e)}
 
-def generate_quiz():
+def generate_quiz(session):
     """Generate enhanced quiz questions from the story"""
-    global story_text
+    story_text = session.story_text
+    difficulty_level = session.difficulty_level
     
-    doc = nlp(story_text)
-    sentences = [sent.text.strip() for sent in doc.sents]
-    words = list(set([token.text.lower() for token in doc if token.is_alpha and len(token.text) > 3]))
+    analysis = get_story_analysis(story_text, session.story_type)
+    sentences = list(analysis.sentences)
+    words = list(analysis.words)
     
     quiz = []
     
     # Get key vocabulary based on current story
-    story_type = None
-    for stype, sdata in STORIES.items():
-        if sdata["text"].strip() == story_text.strip():
-            story_type = stype
-            break
-            
-    key_vocabulary = []
-    if story_type and "key_vocabulary" in STORIES[story_type]:
-        key_vocabulary = STORIES[story_type]["key_vocabulary"]
+    key_vocabulary = STORIES.get(session.story_type, {}).get("key_vocabulary", [])
     
     # Add difficult words from user progress
-    priority_words = list(user_progress["difficult_words"]) + key_vocabulary
+    priority_words = list(session.difficult_words) + key_vocabulary
     available_words = [w for w in words if len(w) > 4]
-    for word in available_words[:3] + priority_words[:2]:  # Mix regular and difficult words
-        if word not in available_words:
-            continue
-            
-        translated_word = translate_text(word)
+    quiz_words = [w for w in available_words[:3] + priority_words[:2]  # Mix regular and difficult words
+                  if w in available_words]
+    
+    # Choose sentences based on difficulty
+    selected_sentences = []
+    if len(sentences) >= 3:
+        num_sentences = 3 if difficulty_level == "advanced" else (2 if difficulty_level == "intermediate" else 1)
+        selected_sentences = random.sample(sentences, num_sentences)
+    
+    # Translate every word and sentence of the quiz in one bulk call
+    to_translate = quiz_words + selected_sentences
+    translations = dict(zip(to_translate, translate_many(to_translate, session.target_language)))
+    
+    for word in quiz_words:
+        translated_word = translations[word]
         options = [word]
         # Add distractor options
         distractors = [w for w in words if w != word]
@@ -366,24 +592,21 @@ def generate_quiz():
         })
     
     # Sentence translation questions
-    if len(sentences) >= 3:
-        # Choose sentences based on difficulty
-        num_sentences = 3 if difficulty_level == "advanced" else (2 if difficulty_level == "intermediate" else 1)
-        selected_sentences = random.sample(sentences, num_sentences)
-        for sentence in selected_sentences:
-            translation = translate_text(sentence)
-            quiz.append({
-                "type": "translation",
-                "question": f"Translate this sentence into English: '{translation}'",
-                "answer": sentence
-            })
+    for sentence in selected_sentences:
+        translation = translations[sentence]
+        quiz.append({
+            "type": "translation",
+            "question": f"Translate this sentence into English: '{translation}'",
+            "answer": sentence
+        })
     
     # Listening comprehension
     if len(sentences) >= 2:
-        comprehension_sentences = random.sample(sentences, 2)
-        for sentence in comprehension_sentences:
+        comprehension_indices = random.sample(range(len(sentences)), 2)
+        for idx in comprehension_indices:
+            sentence = sentences[idx]
             # Create fill-in-the-blank
-            tokens = [t.text for t in nlp(sentence) if t.is_alpha and len(t.text) > 3]
+            tokens = analysis.sentence_words[idx]
             if tokens:
                 word_to_remove = random.choice(tokens)
                 blank_sentence = sentence.replace(word_to_remove, "______")
@@ -403,39 +626,9 @@ def generate_quiz():
     
     return quiz
 
-def analyze_text_for_display():
-    """Analyze text to provide word-by-word information for interactive transcript"""
-    global story_text
-    
-    doc = nlp(story_text)
-    analyzed_text = []
-    
-    for token in doc:
-        if token.is_alpha:
-            difficulty = get_word_difficulty(token.text)
-            definition = get_word_definition(token.text) if difficulty != "easy" else ""
-            
-            analyzed_text.append({
-                "word": token.text,
-                "difficulty": difficulty,
-                "definition": definition,
-                "pos": token.pos_,  # Part of speech
-                "is_key": token.text.lower() in STORIES.get(get_current_story_type(), {}).get("key_vocabulary", [])
-            })
-        else:
-            analyzed_text.append({
-                "word": token.text,
-                "is_punctuation": True
-            })
-    
-    return analyzed_text
-
-def get_current_story_type():
-    """Get the current story type based on story text"""
-    for story_type, story_data in STORIES.items():
-        if story_data["text"].strip() == story_text.strip():
-            return story_type
-    return None
+def analyze_text_for_display(session):
+    """Word-by-word information for the interactive transcript"""
+    return list(get_story_analysis(session.story_text, session.story_type).analyzed_text)
 
 @app.route('/api/get_stories', methods=['GET'])
 def get_stories():
@@ -475,58 +668,69 @@ def get_languages():
 @app.route('/api/set_preferences', methods=['POST'])
 def set_preferences():
     """Set user preferences for speech and difficulty"""
-    global speech_speed, target_language, difficulty_level
+    session = get_session()
     
     data = request.json
     if 'speed' in data:
-        speech_speed = float(data['speed'])
+        session.speech_speed = float(data['speed'])
     
     if 'language' in data:
         if data['language'] in LANGUAGE_CODES.values():
-            target_language = data['language']
+            session.target_language = data['language']
         elif data['language'] in LANGUAGE_CODES:
-            target_language = LANGUAGE_CODES[data['language']]
+            session.target_language = LANGUAGE_CODES[data['language']]
     
     if 'difficulty' in data:
-        difficulty_level = data['difficulty']
+        session.difficulty_level = data['difficulty']
     
     return jsonify({
         "status": "success",
         "preferences": {
-            "speed": speech_speed,
-            "language": target_language,
-            "difficulty": difficulty_level
+            "speed": session.speech_speed,
+            "language": session.target_language,
+            "difficulty": session.difficulty_level
         }
     })
 
 @app.route('/api/select_story', methods=['POST'])
 def select_story():
-    global story_text, current_position, is_listening, story_completed
+    session = get_session()
     story_type = request.json.get('type', 'horror')
     
     if story_type not in STORIES:
         return jsonify({"error": "Story type not found"}), 400
-        
-    story_text = STORIES[story_type]["text"]
-    current_position = 0
-    is_listening = True
-    story_completed = False
+    
+    # Stop whatever this learner was listening to before
+    session.stop_narration()
+    
+    session.story_text = STORIES[story_type]["text"]
+    session.story_type = story_type
+    session.current_position = 0
+    session.story_completed = False
     
     # Get additional story metadata
     cultural_notes = STORIES[story_type].get("cultural_notes", {})
     key_vocabulary = STORIES[story_type].get("key_vocabulary", [])
     
     # Analyze text for interactive transcript
-    analyzed_text = analyze_text_for_display()
+    analyzed_text = analyze_text_for_display(session)
     
     # Start narration in a separate thread
-    stop_event = threading.Event()
-    threading.Thread(target=narrate_story, args=(stop_event,)).start()
+    session.publish_status()
+    session.start_narration()
+    
+    # Warm the translation cache so status updates are lookups
+    analysis = get_story_analysis(session.story_text, story_type)
+    threading.Thread(
+        target=translate_many,
+        args=(list(analysis.sentences), session.target_language),
+        daemon=True
+    ).start()
     
     return jsonify({
         "status": "started", 
         "story_title": story_type.capitalize() + " Story",
-        "full_text": story_text,
+        "full_text": session.story_text,
         "cultural_notes": cultural_notes,
         "key_vocabulary": key_vocabulary,
         "analyzed_text": analyzed_text,
@@ -535,38 +739,35 @@ def select_story():
 
 @app.route('/api/pause_story', methods=['POST'])
 def pause_story():
-    global is_speaking, is_listening
-    is_listening = False
-    if pygame.mixer.get_init():
-        pygame.mixer.music.stop()
+    session = get_session()
+    session.stop_narration()
     return jsonify({"status": "paused"})
 
 @app.route('/api/continue_story', methods=['POST'])
 def continue_story():
-    global is_listening
-    is_listening = True
-    stop_event = threading.Event()
-    threading.Thread(target=narrate_story, args=(stop_event,)).start()
+    session = get_session()
+    session.start_narration()
     return jsonify({"status": "continued"})
 
 @app.route('/api/repeat_current', methods=['POST'])
 def repeat_current():
     """Repeat the current chunk or sentence"""
-    global current_position
+    session = get_session()
     
     # Move position back by chunk size
-    chunk_size = DIFFICULTY_SETTINGS.get(difficulty_level, {}).get("chunk_size", 1)
-    current_position = max(0, current_position - chunk_size)
+    chunk_size = DIFFICULTY_SETTINGS.get(session.difficulty_level, {}).get("chunk_size", 1)
+    with session.lock:
+        session.current_position = max(0, session.current_position - chunk_size)
     
     # Start narration
-    stop_event = threading.Event()
-    threading.Thread(target=narrate_story, args=(stop_event,)).start()
+    session.start_narration()
     
     return jsonify({"status": "repeating"})
 
 @app.route('/api/pronounce_word', methods=['POST'])
 def pronounce_word():
     """Pronounce a specific word"""
+    session = get_session()
     word = request.json.get('word', '')
     
     if not word:
@@ -574,17 +775,16 @@ def pronounce_word():
     
     # Get word definition and translation
     definition = get_word_definition(word)
-    translation = translate_text(word)
+    translation = translate_text(word, session.target_language)
     
-    # Speak word in a separate thread
-    stop_event = threading.Event()
-    speak_thread = threading.Thread(target=speak_text, args=(word, stop_event))
-    speak_thread.start()
+    # Speak word on the server or hand the browser its audio
+    audio_url = speak_or_stream(word, session)
     
     return jsonify({
         "word": word,
         "definition": definition,
-        "translation": translation
+        "translation": translation,
+        "audio_url": audio_url
     })
 
 @app.route('/api/check_pronunciation', methods=['POST'])
@@ -612,79 +812,171 @@ def api_check_pronunciation():
 
 @app.route('/api/ask_question', methods=['POST'])
 def ask_question():
-    global is_speaking, is_listening
+    session = get_session()
     question = request.json.get('question', '')
     
     # Stop current narration if any
-    is_listening = False
-    stop_event = threading.Event()
-    stop_event.set()
-    
-    if pygame.mixer.get_init() and pygame.mixer.music.get_busy():
-        pygame.mixer.music.stop()
+    session.stop_narration()
     
     # Get answer
-    answer = ask_groq(question)
-    translation = translate_text(answer)
+    answer = ask_groq(question, session)
+    translation = translate_text(answer, session.target_language)
     
     # Extract keywords from answer for learning
     doc = nlp(answer)
     keywords = [token.text for token in doc if token.is_alpha and len(token.text) > 3 and not token.is_stop]
     
-    # Speak answer in a separate thread
-    speak_thread = threading.Thread(target=speak_text, args=(answer, stop_event))
-    speak_thread.start()
+    # Speak answer on the server or hand the browser its audio
+    audio_url = speak_or_stream(answer, session)
     
     return jsonify({
         "answer": answer, 
         "translation": translation,
-        "story_completed": story_completed,
-        "keywords": keywords[:5]  # Top 5 keywords
+        "story_completed": session.story_completed,
+        "keywords": keywords[:5],  # Top 5 keywords
+        "audio_url": audio_url
     })
 
-@app.route('/api/get_story_status', methods=['GET'])
-def get_story_status():
-    global current_position, story_text, story_completed
+@app.route('/api/narration/next', methods=['POST'])
+def next_narration_chunk():
+    """Advance the session's story by one chunk and return its audio URL.
+    
+    The browser calls this each time it finishes playing a chunk, so the
+    story position moves with actual playback just like narrate_story.
+    """
+    session = get_session()
+    if not session.is_listening or session.story_completed:
+        return jsonify({"done": session.story_completed, "paused": not session.is_listening})
+    
+    # Count the time spent on the chunk that just finished
+    now = time.time()
+    if session.chunk_started_at:
+        session.listening_time += min(now - session.chunk_started_at, 120)
+    
+    chunk = get_next_chunk(session)
+    if not chunk:
+        session.story_completed = True
+        session.chunk_started_at = None
+        session.stories_completed += 1
+        session.publish_status()
+        return jsonify({"done": True})
     
+    session.chunk_started_at = now
+    session.publish_status()
+    
+    # Render upcoming chunks while this one plays
+    audio_store.prefetch(peek_chunks(session, PRESYNTH_AHEAD), slow=session.speech_speed < 1.0)
+    
+    return jsonify({
+        "done": False,
+        "text": chunk,
+        "audio_url": audio_url_for(synthesize_speech(chunk, session))
+    })
+
+@app.route('/api/audio/<filename>')
+def serve_narration_audio(filename):
+    """Serve a synthesized clip; supports HTTP range requests for seeking"""
+    if not re.fullmatch(r'[0-9a-f]{40}\.mp3', filename):
+        abort(404)
+    return send_from_directory(
+        audio_store.directory,
+        filename,
+        mimetype='audio/mpeg',
+        conditional=True,
+        max_age=24 * 3600
+    )
+
+def build_status_event(session, cached_only=False):
+    """Compact progress snapshot: completion, current sentence and its translation.
+
+    With cached_only the translation is None unless it is already cached.
+    """
     # Calculate completion percentage
-    doc = nlp(story_text)
-    sentences = list(doc.sents)
+    sentences = get_story_analysis(session.story_text, session.story_type).sentences
     total_sentences = len(sentences)
+    current_position = session.current_position
     completion = min(100, int((current_position / max(1, total_sentences)) * 100))
     
     # Get current chunk/sentence being read
     current_sentence = ""
     if current_position > 0 and current_position <= len(sentences):
         # Get the current sentence being processed
-        current_sentence = sentences[current_position-1].text.strip()
+        current_sentence = sentences[current_position-1]
+    
+    if cached_only:
+        translation = translator.lookup(current_sentence, session.target_language)
+    else:
+        translation = translate_text(current_sentence, session.target_language)
+    
+    return {
+        "completion_percentage": completion,
+        "is_completed": session.story_completed,
+        "current_sentence": current_sentence,
+        "translation": translation,
+        "current_difficulty": session.difficulty_level
+    }
+
+@app.route('/api/get_story_status', methods=['GET'])
+def get_story_status():
+    session = get_session()
+    status = build_status_event(session)
     
     # Get cultural notes for current sentence
-    story_type = get_current_story_type()
     cultural_notes = {}
-    if story_type:
-        cultural_notes = STORIES[story_type].get("cultural_notes", {})
+    if session.story_type:
+        cultural_notes = STORIES[session.story_type].get("cultural_notes", {})
+    status["relevant_cultural_notes"] = cultural_notes
         
-    return jsonify({
-        "completion_percentage": completion,
-        "is_completed": story_completed,
-        "current_sentence": current_sentence,
-        "translation": translate_text(current_sentence),
-        "relevant_cultural_notes": cultural_notes,
-        "current_difficulty": difficulty_level
-    })
+    return jsonify(status)
+
+@app.route('/api/story_events', methods=['GET'])
+def story_events():
+    """Server-Sent Events stream of story progress.
+    
+    An event is sent only when narration moves to a new chunk or the story
+    completes; idle connections just get a keep-alive comment now and then.
+    """
+    session = get_session()
+    
+    def stream():
+        version = -1
+        while True:
+            with session.events:
+                if session.event_version == version:
+                    session.events.wait(timeout=15)
+                event = None
+                if session.event_version != version:
+                    version = session.event_version
+                    event = session.last_event
+            
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            
+            yield f"data: {json.dumps(event)}\n\n"
+            # A completed event without a translation still has a follow-up
+            if event["is_completed"] and event["translation"] is not None:
+                break
+    
+    return Response(
+        stream_with_context(stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @app.route('/api/generate_quiz', methods=['GET'])
 def get_quiz():
-    global story_completed
+    session = get_session()
     
-    if not story_completed:
+    if not session.story_completed:
         return jsonify({"error": "Story not yet completed"}), 400
         
-    quiz = generate_quiz()
+    quiz = generate_quiz(session)
     return jsonify({"quiz": quiz})
 
 @app.route('/api/check_answer', methods=['POST'])
 def check_answer():
+    session = get_session()
     data = request.json
     question_type = data.get('type', 'multiple_choice')
     user_answer = data.get('user_answer', '')
@@ -699,21 +991,12 @@ def check_answer():
     else:
         is_correct = False
         
-    # Update user progress
-    if not is_correct and len(correct_answer) > 0:
-        # Add difficult words to user's profile
-        words = correct_answer.split()
-        for word in words:
-            if len(word) > 3 and word.isalpha():
-                user_progress["difficult_words"].add(word.lower())
-    
-    # Record quiz score
-    user_progress["quiz_scores"].append(1 if is_correct else 0)
+    record_answer(session, is_correct, correct_answer)
     
     feedback = "Good job!" if is_correct else f"The correct answer is: {correct_answer}"
     
     # Add translation for feedback
-    translated_feedback = translate_text(feedback)
+    translated_feedback = translate_text(feedback, session.target_language)
     
     return jsonify({
         "correct": is_correct,
@@ -721,65 +1004,126 @@ def check_answer():
         "translation": translated_feedback
     })
 
+@app.route('/api/check_answers', methods=['POST'])
+def check_answers():
+    """Grade a whole quiz; translation answers share one encode call"""
+    session = get_session()
+    answers = request.json.get('answers', [])
+    
+    # Embed every translation answer and its reference together
+    pairs = [(a.get('user_answer', ''), a.get('correct_answer', ''))
+             for a in answers if a.get('type') == 'translation']
+    embeddings = get_embeddings([text for pair in pairs for text in pair])
+    similarities = [
+        util.pytorch_cos_sim(embeddings[2 * i], embeddings[2 * i + 1]).item()
+        for i in range(len(pairs))
+    ]
+    
+    results = []
+    translation_idx = 0
+    for answer in answers:
+        question_type = answer.get('type', 'multiple_choice')
+        user_answer = answer.get('user_answer', '')
+        correct_answer = answer.get('correct_answer', '')
+        
+        if question_type == 'multiple_choice':
+            is_correct = user_answer == correct_answer
+        elif question_type == 'translation':
+            is_correct = similarities[translation_idx] > 0.7
+            translation_idx += 1
+        elif question_type == 'fill_blank':
+            is_correct = user_answer.lower() == correct_answer.lower()
+        else:
+            is_correct = False
+        
+        record_answer(session, is_correct, correct_answer)
+        results.append({
+            "correct": is_correct,
+            "message": "Good job!" if is_correct else f"The correct answer is: {correct_answer}"
+        })
+    
+    return jsonify({
+        "results": results,
+        "score": sum(1 for r in results if r["correct"]),
+        "total": len(results)
+    })
+
+def record_answer(session, is_correct, correct_answer):
+    """Update the learner's progress after a quiz answer"""
+    if not is_correct and len(correct_answer) > 0:
+        # Add difficult words to user's profile
+        words = correct_answer.split()
+        for word in words:
+            if len(word) > 3 and word.isalpha():
+                session.difficult_words.add(word.lower())
+    
+    # Record quiz score
+    session.quiz_total += 1
+    if is_correct:
+        session.quiz_correct += 1
+
 @app.route('/api/get_user_progress', methods=['GET'])
 def get_user_progress():
     """Get user's learning progress"""
-    global user_progress
+    session = get_session()
     
     # Calculate statistics
-    total_quizzes = len(user_progress["quiz_scores"])
-    correct_answers = sum(user_progress["quiz_scores"])
+    total_quizzes = session.quiz_total
+    correct_answers = session.quiz_correct
     accuracy = 0 if total_quizzes == 0 else (correct_answers / total_quizzes * 100)
     
     return jsonify({
-        "stories_completed": user_progress["stories_completed"],
-        "listening_time_minutes": round(user_progress["listening_time"] / 60, 1),
+        "stories_completed": session.stories_completed,
+        "listening_time_minutes": round(session.listening_time / 60, 1),
         "quiz_accuracy": round(accuracy, 1),
-        "difficult_words_count": len(user_progress["difficult_words"]),
-        "difficult_words": list(user_progress["difficult_words"])[:10]  # Top 10 difficult words
+        "difficult_words_count": len(session.difficult_words),
+        "difficult_words": list(session.difficult_words)[:10]  # Top 10 difficult words
     })
 
 @app.route('/api/get_transcript', methods=['GET'])
 def get_transcript():
     """Get interactive transcript of current story"""
-    global story_text
+    session = get_session()
     
     # Get analyzed text with word-by-word information
-    analyzed_text = analyze_text_for_display()
+    analyzed_text = analyze_text_for_display(session)
     
     # Get story type and cultural notes
-    story_type = get_current_story_type()
     cultural_notes = {}
-    if story_type:
-        cultural_notes = STORIES[story_type].get("cultural_notes", {})
+    if session.story_type:
+        cultural_notes = STORIES[session.story_type].get("cultural_notes", {})
     
     return jsonify({
         "transcript": analyzed_text,
         "cultural_notes": cultural_notes
     })
 
-def narrate_story(stop_event):
-    global is_speaking, is_listening, story_completed, user_progress
-    
-    while is_listening and not story_completed and not stop_event.is_set():
-        chunk = get_next_chunk()
+def narrate_story(session, stop_event):
+    while session.is_listening and not session.story_completed and not stop_event.is_set():
+        chunk = get_next_chunk(session)
         if not chunk:
-            story_completed = True
+            session.story_completed = True
             # Update completed stories count
-            if story_completed:
-                user_progress["stories_completed"] += 1
+            session.stories_completed += 1
+            session.publish_status()
             break
         
-        # Get translation
-        translation = translate_text(chunk)
+        session.publish_status()
+        
+        # Render upcoming chunks while this one plays
+        audio_store.prefetch(peek_chunks(session, PRESYNTH_AHEAD), slow=session.speech_speed < 1.0)
         
         # Speak English if not stopped
         if not stop_event.is_set():
-            speak_text(chunk, stop_event)
+            speak_text(chunk, session, stop_event)
         
         # Add slight pause between chunks
         time.sleep(0.8)
 
 if __name__ == '__main__':
-    pygame.init()
-    app.run(host='0.0.0.0', port=5001, threaded=True)
\ No newline at end of file
+    # Parse every story up front so no request pays for spaCy
+    for story_type, story_data in STORIES.items():
+        get_story_analysis(story_data["text"], story_type)
+    if NARRATION_OUTPUT == "server":
+        pygame.init()
+    app.run(host='0.0.0.0', port=5001, threaded=True)
@@ -1,9 +1,10 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 import os
 from dotenv import load_dotenv
+from session_tokens import SessionTokens, bearer_token, require_session
 
 # Load environment variables
 load_dotenv()
@@ -16,6 +17,9 @@ app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///language_learning.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db = SQLAlchemy(app)
 
+# Signed session tokens - other backends validate them with the same SESSION_SECRET
+session_tokens = SessionTokens()
+
 # User Model
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -81,7 +85,26 @@ def login():
         }
     }
 
-    return jsonify({"message": "Login successful", "user": user_data}), 200
+    token, expires_at = session_tokens.issue(user.username, user.id)
+
+    return jsonify({
+        "message": "Login successful",
+        "user": user_data,
+        "token": token,
+        "expires_at": expires_at
+    }), 200
+
+# Token check for clients and other services - no DB or password hashing
+@app.route('/api/auth/validate', methods=['GET', 'POST'])
+@require_session(session_tokens)
+def validate_session():
+    return jsonify({"valid": True, "username": g.session["sub"], "expires_at": g.session["exp"]}), 200
+
+@app.route('/api/logout', methods=['POST'])
+def logout():
+    if not session_tokens.revoke(bearer_token()):
+        return jsonify({"error": "Invalid or expired session"}), 401
+    return jsonify({"message": "Logged out"}), 200
 
 # Run the app
 if __name__ == '__main__':
@@ -1,11 +1,14 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import json
 import os
 import random
 import hashlib
-from groq import Groq
-from gtts import gTTS
+from llm_gateway import get_gateway
+import shutil
+from audio_store import AudioStore
+from question_pool import QuestionPool
+from seen_index import SeenIndex
+from q_table_store import QTableStore
 import os
 from flask import send_from_directory
 
@@ -14,6 +17,7 @@ CORS(app)
 
 # Initialize Groq client
 api_key = os.getenv("GROQ_API_KEY") 
+llm = get_gateway()
 
 # Q-learning parameters
 alpha = 0.1  # Learning rate
@@ -24,23 +28,28 @@ AUDIO_FOLDER = 'static/audio'
 if not os.path.exists(AUDIO_FOLDER):
     os.makedirs(AUDIO_FOLDER)
 
-def generate_audio(text, filename):
-    """Generate audio file using gTTS with improved error handling"""
-    try:
-        # Always use English for the audio generation
-        tts = gTTS(text=text, lang='en', slow=False)
-        filepath = os.path.join(AUDIO_FOLDER, filename)
-        tts.save(filepath)
-        
-        # Verify the file exists and has content
-        if os.path.exists(filepath) and os.path.getsize(filepath) > 0:
-            return f"/static/audio/{filename}"
-        else:
-            print(f"Generated audio file is empty or missing: {filepath}")
-            return None
-    except Exception as e:
-        print(f"Error generating audio: {e}")
+# Content-addressed audio, shared with the listening service
+audio_store = AudioStore(directory=AUDIO_FOLDER)
+
+def generate_audio(text, filename=None):
+    """Return the URL of the audio for text, synthesizing it only if not already stored.
+
+    filename is only used for legacy names requested through serve_audio.
+    """
+    # Always use English for the audio generation
+    filepath = audio_store.get(text, lang='en', tld='com', slow=False)
+    if not filepath:
         return None
+    
+    if filename and filename != os.path.basename(filepath):
+        # Legacy name - keep a copy under the requested name
+        try:
+            shutil.copyfile(filepath, os.path.join(AUDIO_FOLDER, filename))
+        except OSError as e:
+            print(f"Error generating audio: {e}")
+            return None
+        return f"/static/audio/{filename}"
+    return f"/static/audio/{os.path.basename(filepath)}"
 
 @app.route('/static/audio/<path:filename>')
 def serve_audio(filename):
@@ -69,39 +78,20 @@ DIFFICULTY_LEVELS = {
     5: {"description": "Short conversations", "types": ["speaking_sentence", "listening", "writing"]}
 }
 
-# In-memory cache to avoid repeated questions
-question_cache = {}
-
-# Initialize Q-table
-q_table = {}
-if os.path.exists('qtable.json'):
-    with open('qtable.json', 'r') as f:
-        q_table = json.load(f)
+# Initialize Q-table (imports a legacy qtable.json on first run)
+q_store = QTableStore(difficulties=len(DIFFICULTY_LEVELS))
 
 def hash_text(text):
+    """Question id - computed once when the question is built"""
     return hashlib.md5(text.encode()).hexdigest()
 
 def update_q_table(user_id, difficulty, exercise_type, reward):
     """Updates the Q-table based on the reward received"""
-    state = f"{user_id}-{difficulty}-{exercise_type}"
-    
-    if state not in q_table:
-        q_table[state] = [0] * len(DIFFICULTY_LEVELS)
-    
-    old_value = q_table[state][difficulty - 1]
-    next_max = max(q_table[state])
-    new_value = (1 - alpha) * old_value + alpha * (reward + gamma * next_max)
-    q_table[state][difficulty - 1] = new_value
-    
-    with open('qtable.json', 'w') as f:
-        json.dump(q_table, f)
-    
-    return new_value
+    # Only this state's row is written
+    return q_store.update(user_id, difficulty, exercise_type, reward, alpha, gamma)
 
 def determine_next_exercise(user_id, last_correct, current_difficulty, force_type=None):
     """Q-learning based decision with adaptive difficulty and exercise type enforcement"""
-    states = [key for key in q_table.keys() if key.startswith(user_id)]
-    
     # Adjust difficulty based on last answer
     new_difficulty = current_difficulty
     if last_correct:
@@ -116,196 +106,193 @@ def determine_next_exercise(user_id, last_correct, current_difficulty, force_typ
         return new_difficulty, force_type
     
     # Exploration vs Exploitation
-    if not states or random.random() < epsilon:
+    if not q_store.has_user(user_id) or random.random() < epsilon:
         return new_difficulty, random.choice(DIFFICULTY_LEVELS[new_difficulty]["types"])
     
-    # Exploitation
-    possible_states = [s for s in states if s.split('-')[1] == str(new_difficulty)]
-    if possible_states:
-        best_state = max(possible_states, key=lambda x: max(q_table[x]))
-        _, difficulty, ex_type = best_state.split('-')
-        return int(difficulty), ex_type
+    # Exploitation - best type at this difficulty is kept up to date by the store
+    best_type = q_store.best_action(user_id, new_difficulty)
+    if best_type:
+        return new_difficulty, best_type
     
     return new_difficulty, random.choice(DIFFICULTY_LEVELS[new_difficulty]["types"])
 
-def generate_question(ex_type, difficulty, native_language="tamil", past_question_ids=None):
-    """Generate a question with enhanced audio handling"""
-    if past_question_ids is None:
-        past_question_ids = []
+def build_question(ex_type, difficulty, native_language="tamil"):
+    """Generate a complete question with its audio rendered; raises on failure"""
+    # Create the prompt based on exercise type and difficulty
+    prompt = f"""
+    Generate a {ex_type} question for English learning at difficulty level {difficulty}.
+    The user's native language is {native_language}.
     
-    # First check cache
-    cache_key = f"{ex_type}_{difficulty}"
-    if cache_key in question_cache:
-        cached_questions = [q for q in question_cache[cache_key] 
-                          if hash_text(q["question"]) not in past_question_ids]
-        if cached_questions:
-            question = random.choice(cached_questions)
-            question["question_id"] = hash_text(question["question"])
-            return question
+    Provide the question in {native_language}, but provide the correct_answer in English.
     
-    # Generate new question
-    try:
-        # Create the prompt based on exercise type and difficulty
-        prompt = f"""
-        Generate a {ex_type} question for English learning at difficulty level {difficulty}.
-        The user's native language is {native_language}.
-        
-        Provide the question in {native_language}, but provide the correct_answer in English.
-        
-        For listening exercises, the question should be in {native_language} asking what English word/phrase they hear, 
-        and the correct_answer should be the English word/phrase that will be played in the audio.
-        Also provide 3 plausible but incorrect English options that are similar to the correct answer.
-        
-        For speaking exercises, the question should be in {native_language} asking them to speak an English word/phrase, 
-        and the correct_answer should be the English word/phrase they need to say.
-        
-        For writing exercises, the question should be in {native_language} asking them to write an English word/phrase,
-        and the correct_answer should be the English word/phrase they need to write.
-        
-        All explanations should be in {native_language} to help the user understand.
-        
-        Return the response as a JSON object with these keys:
-        - question
-        - correct_answer
-        - explanation
-        - options (for listening exercises, provide an array with 4 options: the correct answer and 3 incorrect options)
-        """
-        
-        # Make the API call to Groq
-        chat_completion = groq_client.chat.completions.create(
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-            model="llama3-70b-8192",
-            response_format={"type": "json_object"}
-        )
-        
-        # Parse the response
-        question_data = json.loads(chat_completion.choices[0].message.content)
-        
-        # Validate and format the response
-        question_data["difficulty"] = difficulty
-        question_data["exercise_type"] = ex_type
-        question_data["question_id"] = hash_text(question_data["question"])
-        
-        # Generate audio for speaking/listening exercises - ALWAYS in English
-        if ex_type in ["speaking_word", "speaking_sentence", "listening"]:
-            audio_text = question_data["correct_answer"]  # This should be English
-            audio_filename = f"{ex_type}_{difficulty}_{hash_text(audio_text)}.mp3"
-            audio_url = generate_audio(audio_text, audio_filename)
-            question_data["audio_url"] = audio_url or ""
-        
-        # Handle listening options - ensure options are in English
-        if ex_type == "listening":
-            if "options" not in question_data or not question_data["options"] or len(question_data["options"]) < 4:
-                # Generate backup options if the LLM didn't provide proper ones
-                correct = question_data["correct_answer"]
-                
-                # Create more natural distractor options
-                if difficulty <= 2:  # For words or short phrases
-                    # For single words, create options with similar sounds or meanings
-                    if len(correct.split()) <= 2:
-                        similar_words = [
-                            correct,
-                            correct[0] + "".join(random.sample(correct[1:], len(correct)-1)) if len(correct) > 3 else correct + "s",
-                            correct[:-1] + random.choice("aeiou") if len(correct) > 3 else correct + "ing",
-                            "".join(random.sample(correct, len(correct))) if len(correct) > 3 else "the " + correct
-                        ]
-                    else:
-                        # For phrases, modify one word
-                        words = correct.split()
-                        similar_words = [
-                            correct,
-                            " ".join(words[:-1] + [words[-1] + "s"]),
-                            " ".join([words[0] + "ing"] + words[1:]),
-                            " ".join(["the"] + words)
-                        ]
-                else:  # For sentences
-                    words = correct.split()
+    For listening exercises, the question should be in {native_language} asking what English word/phrase they hear, 
+    and the correct_answer should be the English word/phrase that will be played in the audio.
+    Also provide 3 plausible but incorrect English options that are similar to the correct answer.
+    
+    For speaking exercises, the question should be in {native_language} asking them to speak an English word/phrase, 
+    and the correct_answer should be the English word/phrase they need to say.
+    
+    For writing exercises, the question should be in {native_language} asking them to write an English word/phrase,
+    and the correct_answer should be the English word/phrase they need to write.
+    
+    All explanations should be in {native_language} to help the user understand.
+    
+    Return the response as a JSON object with these keys:
+    - question
+    - correct_answer
+    - explanation
+    - options (for listening exercises, provide an array with 4 options: the correct answer and 3 incorrect options)
+    """
+    
+    # Make the API call through the shared gateway. Questions should vary,
+    # so every call goes upstream - parallel pool refills each get their own.
+    question_data = llm.chat_json(
+        [
+            {
+                "role": "user",
+                "content": prompt,
+            }
+        ],
+        model="llama3-70b-8192",
+        cache=False
+    )
+    
+    # Validate and format the response
+    question_data["difficulty"] = difficulty
+    question_data["exercise_type"] = ex_type
+    question_data["question_id"] = hash_text(question_data["question"])
+    
+    # Generate audio for speaking/listening exercises - ALWAYS in English
+    if ex_type in ["speaking_word", "speaking_sentence", "listening"]:
+        audio_text = question_data["correct_answer"]  # This should be English
+        audio_url = generate_audio(audio_text)
+        question_data["audio_url"] = audio_url or ""
+    
+    # Handle listening options - ensure options are in English
+    if ex_type == "listening":
+        if "options" not in question_data or not question_data["options"] or len(question_data["options"]) < 4:
+            # Generate backup options if the LLM didn't provide proper ones
+            correct = question_data["correct_answer"]
+            
+            # Create more natural distractor options
+            if difficulty <= 2:  # For words or short phrases
+                # For single words, create options with similar sounds or meanings
+                if len(correct.split()) <= 2:
                     similar_words = [
                         correct,
-                        " ".join(words[:len(words)//2] + ["is"] + words[len(words)//2+1:]) if len(words) > 2 else correct + " please",
-                        " ".join(words[:1] + ["don't"] + words[1:]) if len(words) > 2 else "I " + correct,
-                        " ".join(["Can"] + words) if len(words) > 2 else correct + " now"
+                        correct[0] + "".join(random.sample(correct[1:], len(correct)-1)) if len(correct) > 3 else correct + "s",
+                        correct[:-1] + random.choice("aeiou") if len(correct) > 3 else correct + "ing",
+                        "".join(random.sample(correct, len(correct))) if len(correct) > 3 else "the " + correct
                     ]
-                
-                question_data["options"] = similar_words
-            
-            # Ensure options are strings and correct answer is included
-            question_data["options"] = [str(opt) for opt in question_data["options"]]
-            if question_data["correct_answer"] not in question_data["options"]:
-                question_data["options"][0] = question_data["correct_answer"]
-            
-            # Limit to 4 options maximum
-            if len(question_data["options"]) > 4:
-                # Keep the correct answer and 3 other options
-                correct_answer = question_data["correct_answer"]
-                other_options = [opt for opt in question_data["options"] if opt != correct_answer]
-                question_data["options"] = [correct_answer] + random.sample(other_options, min(3, len(other_options)))
-            
-            # If we still don't have enough options, add some
-            while len(question_data["options"]) < 4:
-                # Add variations of the correct answer
-                correct = question_data["correct_answer"]
-                if len(correct.split()) <= 1:  # Single word
-                    question_data["options"].append(correct + random.choice(["s", "ed", "ing"]))
-                else:  # Phrase or sentence
+                else:
+                    # For phrases, modify one word
                     words = correct.split()
-                    question_data["options"].append(" ".join(words[:-1] + [words[-1] + random.choice(["s", "ed"])]))
-            
-            # Make sure options are unique
-            question_data["options"] = list(dict.fromkeys(question_data["options"]))
-            
-            # Ensure we have exactly 4 options
-            while len(question_data["options"]) < 4:
-                question_data["options"].append(f"Option {len(question_data['options']) + 1}")
-            
-            # Keep only 4 options if we have more
-            if len(question_data["options"]) > 4:
-                # Make sure correct answer is included
-                correct_answer = question_data["correct_answer"]
-                other_options = [opt for opt in question_data["options"] if opt != correct_answer]
-                question_data["options"] = [correct_answer] + random.sample(other_options, 3)
+                    similar_words = [
+                        correct,
+                        " ".join(words[:-1] + [words[-1] + "s"]),
+                        " ".join([words[0] + "ing"] + words[1:]),
+                        " ".join(["the"] + words)
+                    ]
+            else:  # For sentences
+                words = correct.split()
+                similar_words = [
+                    correct,
+                    " ".join(words[:len(words)//2] + ["is"] + words[len(words)//2+1:]) if len(words) > 2 else correct + " please",
+                    " ".join(words[:1] + ["don't"] + words[1:]) if len(words) > 2 else "I " + correct,
+                    " ".join(["Can"] + words) if len(words) > 2 else correct + " now"
+                ]
             
-            # Always shuffle the options
-            random.shuffle(question_data["options"])
+            question_data["options"] = similar_words
         
-        # Cache the question
-        if cache_key not in question_cache:
-            question_cache[cache_key] = []
-        if len(question_cache[cache_key]) >= 10:
-            question_cache[cache_key].pop(0)  
-        question_cache[cache_key].append(question_data)
+        # Ensure options are strings and correct answer is included
+        question_data["options"] = [str(opt) for opt in question_data["options"]]
+        if question_data["correct_answer"] not in question_data["options"]:
+            question_data["options"][0] = question_data["correct_answer"]
         
-        return question_data
+        # Limit to 4 options maximum
+        if len(question_data["options"]) > 4:
+            # Keep the correct answer and 3 other options
+            correct_answer = question_data["correct_answer"]
+            other_options = [opt for opt in question_data["options"] if opt != correct_answer]
+            question_data["options"] = [correct_answer] + random.sample(other_options, min(3, len(other_options)))
         
-    except Exception as e:
-        print(f"Error generating question: {e}")
-        # Return backup question with fallback audio
-        backup_question = {
-            "question": f"Sample {ex_type} question ({difficulty})",
-            "correct_answer": "sample answer",
-            "explanation": "இது ஒரு மாதிரி கேள்வி",
-            "difficulty": difficulty,
-            "exercise_type": ex_type,
-            "audio_url": "",
-            "question_id": f"backup_{random.randint(1000, 9999)}"
-        }
+        # If we still don't have enough options, add some
+        while len(question_data["options"]) < 4:
+            # Add variations of the correct answer
+            correct = question_data["correct_answer"]
+            if len(correct.split()) <= 1:  # Single word
+                question_data["options"].append(correct + random.choice(["s", "ed", "ing"]))
+            else:  # Phrase or sentence
+                words = correct.split()
+                question_data["options"].append(" ".join(words[:-1] + [words[-1] + random.choice(["s", "ed"])]))
         
-        # Add options for listening exercises
-        if ex_type == "listening":
-            backup_question["options"] = [
-                "sample answer", 
-                "option one", 
-                "option two", 
-                "option three"
-            ]
-            random.shuffle(backup_question["options"])
-            
-        return backup_question
+        # Make sure options are unique
+        question_data["options"] = list(dict.fromkeys(question_data["options"]))
+        
+        # Ensure we have exactly 4 options
+        while len(question_data["options"]) < 4:
+            question_data["options"].append(f"Option {len(question_data['options']) + 1}")
+        
+        # Keep only 4 options if we have more
+        if len(question_data["options"]) > 4:
+            # Make sure correct answer is included
+            correct_answer = question_data["correct_answer"]
+            other_options = [opt for opt in question_data["options"] if opt != correct_answer]
+            question_data["options"] = [correct_answer] + random.sample(other_options, 3)
+        
+        # Always shuffle the options
+        random.shuffle(question_data["options"])
+    
+    return question_data
+
+def backup_question(ex_type, difficulty):
+    """Placeholder question served when generation fails"""
+    backup_question = {
+        "question": f"Sample {ex_type} question ({difficulty})",
+        "correct_answer": "sample answer",
+        "explanation": "இது ஒரு மாதிரி கேள்வி",
+        "difficulty": difficulty,
+        "exercise_type": ex_type,
+        "audio_url": "",
+        "question_id": f"backup_{random.randint(1000, 9999)}"
+    }
+    
+    # Add options for listening exercises
+    if ex_type == "listening":
+        backup_question["options"] = [
+            "sample answer", 
+            "option one", 
+            "option two", 
+            "option three"
+        ]
+        random.shuffle(backup_question["options"])
+        
+    return backup_question
+
+# Ready-made questions, refilled in the background
+question_pool = QuestionPool(build_question)
+
+# Question ids each user has already been served, to avoid repetition
+seen_questions = SeenIndex()
+
+def generate_question(ex_type, difficulty, native_language="tamil", past_question_ids=None, user_id=None):
+    """Serve an unseen question from the pool, generating one inline only when none is stocked"""
+    if user_id and past_question_ids:
+        seen_questions.add_many(user_id, past_question_ids)
+    seen = seen_questions.for_user(user_id) if user_id else set(past_question_ids or ())
+    
+    question = question_pool.take((ex_type, difficulty, native_language), seen)
+    if not question:
+        try:
+            question = build_question(ex_type, difficulty, native_language)
+        except Exception as e:
+            print(f"Error generating question: {e}")
+            # Return backup question with fallback audio
+            return backup_question(ex_type, difficulty)
+    
+    if user_id:
+        seen_questions.add(user_id, question["question_id"])
+    return question
 
 @app.route('/api/get_question', methods=['POST'])
 def get_question():
@@ -332,7 +319,8 @@ def get_question():
             ex_type, 
             difficulty, 
             data.get('native_language', 'tamil'),
-            past_question_ids
+            past_question_ids,
+            user_id
         )
         
         return jsonify(question)
@@ -385,25 +373,22 @@ def submit_answer():
         "reward": reward
     })
 
-# Simple caching middleware to prevent duplicate questions
-@app.before_request
-def before_request():
-    # Only apply to get_question endpoint
-    if request.path == '/api/get_question' and request.method == 'POST':
-        try:
-            data = request.get_json()
-            if not data or not isinstance(data, dict):
-                return
-                
-            # Remember recent questions by user to prevent repetition
-            user_id = data.get('user_id')
-            if user_id:
-                cache_key = f"user_{user_id}_recent"
-                if cache_key not in question_cache:
-                    question_cache[cache_key] = []
-                # We'll use this in generate_question to avoid duplicates
-        except:
-            pass
+@app.route('/api/question_pool/stats', methods=['GET'])
+def question_pool_stats():
+    """Stock levels and hit rate of the prefetched question pool"""
+    return jsonify({**question_pool.stats(), "seen": seen_questions.stats()})
 
 if __name__ == '__main__':
+    # Opt-in: QUESTION_POOL_PREWARM=tamil,hindi stocks every (type, difficulty)
+    # in those languages up to low_water - about 45 LLM calls per language.
+    # With debug=True the reloader runs this block in a watcher process too;
+    # only the child that serves requests (WERKZEUG_RUN_MAIN set) warms the pool.
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        prewarm_languages = [lang for lang in os.getenv("QUESTION_POOL_PREWARM", "").split(",") if lang]
+        question_pool.warm(
+            (ex_type, difficulty, lang)
+            for lang in prewarm_languages
+            for difficulty, level in DIFFICULTY_LEVELS.items()
+            for ex_type in level["types"]
+        )
     app.run(host='0.0.0.0',debug=True, port=5003)
\ No newline at end of file
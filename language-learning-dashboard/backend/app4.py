@@ -1,40 +1,49 @@
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, jsonify, request, send_from_directory, Response, url_for
 from flask_cors import CORS
 import os
 import cv2
 import numpy as np
 import base64
-import requests
 import json
+import html
 import tempfile
-from groq import Groq
-import mediapipe as mp
+import threading
+from functools import lru_cache
+from dotenv import load_dotenv
+
+# Load environment variables before the backend modules below read their settings
+load_dotenv()
+
+from llm_gateway import get_gateway
+from face_mesh_pool import FaceMeshPool, FaceMeshBusyError
+from image_resolver import ImageResolver
+from mouth_stream import MouthStream
+from mouth_shape import (MOUTH_REFERENCES, MouthLocator, session_id_from, mouth_features,
+                         draw_mouth, generate_mouth_feedback)
 import random
 import speech_recognition as sr
-from dotenv import load_dotenv
 from pydub import AudioSegment
 
-# Load environment variables
-load_dotenv()
+# WebSocket support is optional - without flask-sock only the HTTP endpoints exist
+try:
+    from flask_sock import Sock
+    from simple_websocket import ConnectionClosed
+except ImportError:
+    Sock = None
 
 app = Flask(__name__, static_folder='../frontend/build')
 CORS(app)
 
 # Initialize AI clients with environment variables
 api_key = os.getenv("GROQ_API_KEY") 
-UNSPLASH_KEY = os.getenv("UNSPLASH_API_KEY")
-client = Groq(api_key=API_KEY)
-
-# MediaPipe setup
-# MediaPipe setup
-mp_face_mesh = mp.solutions.face_mesh
-face_mesh = mp_face_mesh.FaceMesh(
-    static_image_mode=False,
-    max_num_faces=1,
-    refine_landmarks=True,
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5
-)
+llm = get_gateway()
+
+# MediaPipe setup - graphs are not thread-safe, so each request borrows one
+# from the pool; a webcam session keeps getting the same graph for tracking
+face_mesh_pool = FaceMeshPool()
+
+def get_session_id():
+    return session_id_from(request)
 
 # Serve React app
 @app.route('/', defaults={'path': ''})
@@ -47,13 +56,12 @@ def serve(path):
 
 def generate_with_llama(prompt):
     try:
-        response = client.chat.completions.create(
+        # Identical lesson/paragraph prompts are served from the gateway cache
+        return llm.chat_json(
+            [{"role": "user", "content": prompt}],
             model="llama3-70b-8192",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            response_format={"type": "json_object"}
+            temperature=0.7
         )
-        return json.loads(response.choices[0].message.content)
     except Exception as e:
         print(f"Error generating with Llama: {str(e)}")
         # Return a fallback response with required structure
@@ -106,17 +114,26 @@ def generate_fallback_response():
             }
         }
 
+def placeholder_image_url(query):
+    """Locally served picture card, used when no photo can be fetched"""
+    return url_for('placeholder_image', word=query, _external=True)
+
+# Lesson images: cached query -> URL lookups, fetched in parallel on a miss
+image_resolver = ImageResolver(placeholder=placeholder_image_url)
+
 def generate_image(query):
-    try:
-        url = f"https://api.unsplash.com/photos/random?query={query}&client_id={UNSPLASH_KEY}"
-        response = requests.get(url)
-        if response.status_code == 200:
-            return response.json()["urls"]["small"]
-        else:
-            return "https://via.placeholder.com/300"
-    except Exception as e:
-        print(f"Error generating image: {str(e)}")
-        return "https://via.placeholder.com/300"
+    return image_resolver.resolve(query)
+
+@app.route('/api/placeholder/<word>.svg', methods=['GET'])
+def placeholder_image(word):
+    """Offline placeholder image showing the word"""
+    svg = f"""<svg xmlns="http://www.w3.org/2000/svg" width="300" height="200" viewBox="0 0 300 200">
+<rect width="300" height="200" fill="#e8eef7"/>
+<text x="150" y="110" font-family="sans-serif" font-size="28" fill="#34495e" text-anchor="middle">{html.escape(word[:40])}</text>
+</svg>"""
+    response = Response(svg, mimetype='image/svg+xml')
+    response.headers['Cache-Control'] = 'public, max-age=86400'
+    return response
 
 @app.route('/api/generate-lesson', methods=['POST'])
 def generate_lesson():
@@ -135,8 +152,10 @@ def generate_lesson():
         if not lesson.get('words'):
             lesson['words'] = []
         
+        # Fetch every word's image at once - the lesson waits only for the slowest
+        images = image_resolver.resolve_many([word.get('english', 'learning') for word in lesson['words']])
         for word in lesson['words']:
-            word['image'] = generate_image(word.get('english', 'learning'))
+            word['image'] = images[word.get('english', 'learning')]
             # Ensure word has required properties
             if 'sentences' not in word:
                 word['sentences'] = []
@@ -375,6 +394,13 @@ def analyze_pronunciation():
             "tips": "Focus on speaking clearly and with confidence"
         })
 
+# Mouth landmarks: each webcam session borrows pooled FaceMesh graphs and
+# keeps its own face box
+mouth_locator = MouthLocator(face_mesh_pool)
+
+def find_mouth_points(img, session_id, downscale=False):
+    return mouth_locator.find(img, session_id, downscale)
+
 @app.route('/api/analyze-mouth-shape', methods=['POST'])
 def analyze_mouth_shape():
     try:
@@ -424,15 +450,19 @@ def analyze_mouth_shape():
                 "analyzedImage": None
             })
             
-        # Convert to RGB for MediaPipe
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        
-        # Process with MediaPipe
-        results = face_mesh.process(img_rgb)
-        print(f"Face detection results: {results.multi_face_landmarks is not None}")
+        # Full-resolution landmarks on the whole frame
+        try:
+            mouth_points = find_mouth_points(img, get_session_id())
+        except FaceMeshBusyError as e:
+            return jsonify({
+                "error": str(e),
+                "score": 0,
+                "feedback": ["The server is busy, please try again"],
+                "analyzedImage": None
+            }), 503
         
         # Handle case when no face is detected
-        if not results.multi_face_landmarks:
+        if mouth_points is None:
             # Create a copy of the image and add text
             no_face_img = img.copy()
             cv2.putText(no_face_img, "No face detected", (50, 50), 
@@ -440,10 +470,7 @@ def analyze_mouth_shape():
             
             retval, buffer = cv2.imencode('.jpg', no_face_img)
             no_face_image_b64 = base64.b64encode(buffer).decode('utf-8')
-
-            print(f"Sending response with score: {feedback['score']}")
-        
-         
+            
             return jsonify({
                 "error": "No face detected",
                 "score": 0,
@@ -451,49 +478,18 @@ def analyze_mouth_shape():
                 "analyzedImage": f"data:image/jpeg;base64,{no_face_image_b64}"
             })
         
-        # Mouth landmarks analysis
-        mouth_points = []
-        MOUTH_LANDMARKS = [61, 291, 39, 181, 17, 406, 335, 273]
-        
-        face_landmarks = results.multi_face_landmarks[0]
-        for landmark_id in MOUTH_LANDMARKS:
-            if landmark_id < len(face_landmarks.landmark):
-                landmark = face_landmarks.landmark[landmark_id]
-                mouth_points.append((landmark.x, landmark.y))
-                
-                # Draw circles on the landmarks for visualization
-                x = int(landmark.x * img.shape[1])
-                y = int(landmark.y * img.shape[0])
-                cv2.circle(img, (x, y), 3, (0, 255, 0), -1)
-            else:
-                mouth_points.append((0.5, 0.5))  # Fallback point
-        
-        # Calculate mouth metrics
-        if len(mouth_points) >= 4:
-            mouth_width = abs(mouth_points[0][0] - mouth_points[1][0])
-            mouth_height = abs(mouth_points[2][1] - mouth_points[3][1])
-            
-            # Draw lines connecting points for visualization
-            for i in range(len(mouth_points)):
-                x1 = int(mouth_points[i][0] * img.shape[1])
-                y1 = int(mouth_points[i][1] * img.shape[0])
-                x2 = int(mouth_points[(i+1) % len(mouth_points)][0] * img.shape[1])
-                y2 = int(mouth_points[(i+1) % len(mouth_points)][1] * img.shape[0])
-                cv2.line(img, (x1, y1), (x2, y2), (255, 0, 0), 1)
-        else:
-            mouth_width, mouth_height = 0.3, 0.2  # Default values
+        features = mouth_features(mouth_points, img.shape)
+        draw_mouth(img, mouth_points)
         
         # Generate feedback based on target sound and mouth shape
-        feedback = generate_mouth_feedback(target_sound, mouth_width, mouth_height)
+        feedback = generate_mouth_feedback(target_sound, features)
         
         # Convert analyzed image to base64
         retval, buffer = cv2.imencode('.jpg', img)
         analyzed_img = base64.b64encode(buffer).decode('utf-8')
         
-        # Create a simple reference image showing the ideal mouth shape
-        ref_img = create_reference_image(target_sound)
-        retval, buffer = cv2.imencode('.jpg', ref_img)
-        ref_img_b64 = base64.b64encode(buffer).decode('utf-8')
+        # Reference images are rendered once per sound
+        ref_img_b64 = base64.b64encode(reference_image_jpeg(target_sound)).decode('utf-8')
         
         return jsonify({
             "score": feedback['score'],
@@ -511,6 +507,145 @@ def analyze_mouth_shape():
             "analyzedImage": None
         })
 
+@app.route('/api/analyze-mouth-frame', methods=['POST'])
+def analyze_mouth_frame():
+    """Lean per-frame analysis: raw image bytes in, numeric metrics and score out.
+
+    Accepts multipart (field "frame") or application/octet-stream bodies;
+    targetSound, sessionId and annotate=1 (to get the annotated image back)
+    go in the query string or form.
+    """
+    try:
+        params = request.values
+        target_sound = params.get('targetSound', 'TH')
+    
+        if request.files:
+            upload = request.files.get('frame') or next(iter(request.files.values()))
+            raw = upload.read()
+        else:
+            raw = request.get_data()
+    
+        img = cv2.imdecode(np.frombuffer(raw, np.uint8), cv2.IMREAD_COLOR) if raw else None
+        if img is None:
+            return jsonify({
+                "error": "Could not decode image",
+                "score": 0,
+                "feedback": ["Image could not be processed"]
+            }), 400
+    
+        try:
+            mouth_points = find_mouth_points(img, get_session_id(), downscale=True)
+        except FaceMeshBusyError as e:
+            return jsonify({
+                "error": str(e),
+                "score": 0,
+                "feedback": ["The server is busy, please try again"]
+            }), 503
+    
+        if mouth_points is None:
+            return jsonify({
+                "error": "No face detected",
+                "score": 0,
+                "feedback": ["No face detected clearly", "Position your face in the center of the camera"]
+            })
+    
+        feedback = generate_mouth_feedback(target_sound, mouth_features(mouth_points, img.shape))
+        response = {
+            "score": feedback['score'],
+            "feedback": feedback['tips'],
+            "reference": feedback['reference'],
+            "closest": feedback['closest'],
+            "metrics": feedback['metrics'],
+            "referenceImage": url_for('reference_image', sound=target_sound, _external=True)
+        }
+    
+        if params.get('annotate') in ('1', 'true'):
+            draw_mouth(img, mouth_points)
+            retval, buffer = cv2.imencode('.jpg', img)
+            response["analyzedImage"] = f"data:image/jpeg;base64,{base64.b64encode(buffer).decode('utf-8')}"
+    
+        return jsonify(response)
+    except Exception as e:
+        print(f"Error in analyze_mouth_frame: {str(e)}")
+        return jsonify({
+            "error": str(e),
+            "score": 0,
+            "feedback": ["Analysis failed due to a technical error"]
+        }), 500
+
+@app.route('/api/reference-image/<sound>.jpg', methods=['GET'])
+def reference_image(sound):
+    """Cached reference picture for a target sound"""
+    response = Response(reference_image_jpeg(sound), mimetype='image/jpeg')
+    response.headers['Cache-Control'] = 'public, max-age=86400'
+    return response
+
+# Live mouth-tracking sessions currently connected
+mouth_streams = set()
+
+if Sock:
+    sock = Sock(app)
+
+    @sock.route('/ws/mouth-tracking')
+    def mouth_tracking(ws):
+        """Streaming mouth analysis over a WebSocket.
+
+        The client sends binary JPEG frames and JSON text messages such as
+        {"targetSound": "W"}; smoothed scores are pushed back at MOUTH_PUSH_HZ.
+        """
+        session_id = get_session_id()
+
+        def analyze(frame):
+            img = cv2.imdecode(np.frombuffer(frame, np.uint8), cv2.IMREAD_COLOR)
+            if img is None:
+                return None
+            mouth_points = find_mouth_points(img, session_id, downscale=True)
+            return mouth_features(mouth_points, img.shape) if mouth_points is not None else None
+
+        stream = MouthStream(
+            analyze,
+            generate_mouth_feedback,
+            lambda message: ws.send(json.dumps(message)),
+            target_sound=request.args.get('targetSound', 'TH')
+        )
+        worker = threading.Thread(target=stream.run, daemon=True)
+        worker.start()
+        mouth_streams.add(stream)
+
+        try:
+            while True:
+                message = ws.receive()
+                if message is None:
+                    break
+                if isinstance(message, bytes):
+                    stream.submit_frame(message)
+                    continue
+                # A bad control message is ignored; the session carries on
+                try:
+                    control = json.loads(message)
+                except ValueError:
+                    print(f"Ignoring malformed mouth tracking message: {message[:100]!r}")
+                    continue
+                if isinstance(control, dict) and isinstance(control.get('targetSound'), str):
+                    stream.set_target(control['targetSound'])
+        except ConnectionClosed as e:
+            print(f"Mouth tracking session ended: {str(e)}")
+        finally:
+            stream.close()
+            worker.join(timeout=1)
+            mouth_streams.discard(stream)
+
+@app.route('/api/face-mesh/stats', methods=['GET'])
+def face_mesh_stats():
+    """Saturation of the FaceMesh pool and live tracking sessions"""
+    return jsonify({**face_mesh_pool.stats(), "live_streams": len(mouth_streams)})
+
+@lru_cache(maxsize=64)
+def reference_image_jpeg(target_sound):
+    """JPEG bytes of the reference image - rendered once per sound"""
+    retval, buffer = cv2.imencode('.jpg', create_reference_image(target_sound))
+    return buffer.tobytes()
+
 def create_reference_image(target_sound):
     """Create a simple reference image showing the ideal mouth shape for a sound"""
     img = np.ones((300, 300, 3), dtype=np.uint8) * 255  # White background
@@ -541,36 +676,6 @@ def create_reference_image(target_sound):
     
     return img
 
-def generate_mouth_feedback(target_sound, width, height):
-    # Reference values for different sounds
-    references = {
-        'TH': {'width': 0.3, 'height': 0.2, 'tip': "Tongue between teeth like த but forward"},
-        'V': {'width': 0.2, 'height': 0.1, 'tip': "Bite lower lip slightly"},
-        'W': {'width': 0.4, 'height': 0.3, 'tip': "Round lips tightly like ஊ"},
-        'F': {'width': 0.25, 'height': 0.15, 'tip': "Upper teeth on lower lip"},
-        'R': {'width': 0.35, 'height': 0.25, 'tip': "Curl tongue back slightly"},
-        'L': {'width': 0.3, 'height': 0.22, 'tip': "Tongue tip touching upper teeth"},
-        'P': {'width': 0.15, 'height': 0.05, 'tip': "Close lips fully then release quickly"},
-        'B': {'width': 0.15, 'height': 0.05, 'tip': "Close lips fully with vibration"}
-    }
-    ref = references.get(target_sound, {'width': 0.3, 'height': 0.2, 'tip': "Focus on proper mouth shape"})
-    
-    width_diff = abs(width - ref['width'])
-    height_diff = abs(height - ref['height'])
-    score = max(0, 100 - int((width_diff + height_diff) * 150))
-    
-    tips = []
-    if width_diff > 0.05:
-        tips.append(f"Adjust mouth width: {'wider' if width < ref['width'] else 'narrower'}")
-    if height_diff > 0.05:
-        tips.append(f"Adjust mouth opening: {'taller' if height < ref['height'] else 'shorter'}")
-    
-    return {
-        'score': score,
-        'tips': tips if tips else ["Good mouth position!"],
-        'reference': f"For '{target_sound}': {ref['tip']}"
-    }
-
 def annotate_mouth_shape(img, results):
     # Draw landmarks on image
     if hasattr(results, 'multi_face_landmarks') and results.multi_face_landmarks:
@@ -585,4 +690,7 @@ def annotate_mouth_shape(img, results):
     return img
 
 if __name__ == '__main__':
+    # Render the reference image for every known sound up front
+    for sound in MOUTH_REFERENCES:
+        reference_image_jpeg(sound)
     app.run(host='0.0.0.0',port=5004, debug=True)
\ No newline at end of file
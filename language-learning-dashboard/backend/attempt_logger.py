@@ -0,0 +1,214 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+
+# One client, and so one connection pool, per process
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
+MONGO_DB = os.getenv("MONGO_DB", "language_learning_db")
+MONGO_MAX_POOL = int(os.getenv("MONGO_MAX_POOL", 50))
+# Write-behind queue and how often, and in what batch size, it is flushed
+ATTEMPT_QUEUE_SIZE = int(os.getenv("ATTEMPT_QUEUE_SIZE", 10000))
+FLUSH_INTERVAL = float(os.getenv("ATTEMPT_FLUSH_INTERVAL", 0.5))
+FLUSH_BATCH_SIZE = int(os.getenv("ATTEMPT_FLUSH_BATCH", 500))
+MAX_WRITE_ATTEMPTS = int(os.getenv("ATTEMPT_MAX_WRITE_ATTEMPTS", 5))
+
+DUPLICATE_KEY_ERROR = 11000
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Shared MongoClient - one connection pool for the whole process"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = MongoClient(
+                MONGO_URI,
+                maxPoolSize=MONGO_MAX_POOL,
+                minPoolSize=1,
+                maxIdleTimeMS=60000,
+                serverSelectionTimeoutMS=5000,
+                connect=False
+            )
+    return _client
+
+
+def get_db():
+    return get_client()[MONGO_DB]
+
+
+class AttemptLogger:
+    """Write-behind logger for writing attempts.
+
+    Request threads enqueue attempt records; a background thread drains the
+    queue and writes each batch with one ordered bulk_write of score upserts
+    into db.overall and one insert_many into db.writing.
+
+    A batch that fails is kept and retried on the next flush, up to
+    max_attempts writes, after which it is counted as dead-lettered. Each
+    step is retried only if it has not gone through yet: upserts that
+    succeeded are dropped from the batch so a score is never incremented
+    twice, and records carry their _id so a repeated insert is recognised
+    as a duplicate.
+    """
+
+    def __init__(self, db_getter=get_db, max_queue=ATTEMPT_QUEUE_SIZE,
+                 flush_interval=FLUSH_INTERVAL, batch_size=FLUSH_BATCH_SIZE,
+                 max_attempts=MAX_WRITE_ATTEMPTS):
+        self._get_db = db_getter
+        self._queue = queue.Queue(maxsize=max_queue)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._retry = deque()
+        self._stop = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"enqueued": 0, "written": 0, "batches": 0, "sync_writes": 0, "errors": 0,
+                       "retried": 0, "dead_lettered": 0}
+        self._last_flush = None
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log_attempt(self, username, content_type, accuracy, is_correct, timestamp=None):
+        """Queue one attempt; falls back to a direct write if the queue is full"""
+        item = {
+            '_id': ObjectId(),
+            'username': username,
+            'score': 1 if is_correct else 0,
+            'content_type': content_type,
+            'timestamp': timestamp or datetime.now(),
+            'accuracy': accuracy,
+            'is_correct': is_correct
+        }
+        try:
+            self._queue.put_nowait((time.time(), item))
+            self._count("enqueued")
+        except queue.Full:
+            self._count("sync_writes")
+            self._write(self._new_batch([item]))
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._stop.wait(self.flush_interval)
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        """Retry failed batches once, then drain the queue into MongoDB in batches"""
+        with self._flush_lock:
+            for _ in range(len(self._retry)):
+                self._write(self._retry.popleft())
+            while True:
+                batch = []
+                while len(batch) < self.batch_size:
+                    try:
+                        _, item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    batch.append(item)
+                if not batch:
+                    return
+                self._write(self._new_batch(batch))
+
+    @staticmethod
+    def _new_batch(records):
+        # Aggregate score increments per user so each user gets one upsert
+        increments = defaultdict(int)
+        last_seen = {}
+        for record in records:
+            if record['is_correct']:
+                increments[record['username']] += 1
+                last_seen[record['username']] = record
+
+        upserts = [
+            UpdateOne(
+                {'username': username},
+                {
+                    '$inc': {'score': count},
+                    '$setOnInsert': {
+                        'username': username,
+                        'created_at': last_seen[username]['timestamp']
+                    },
+                    '$set': {
+                        'last_updated': last_seen[username]['timestamp'],
+                        'last_activity': last_seen[username]['content_type']
+                    }
+                },
+                upsert=True
+            ) for username, count in increments.items()
+        ]
+        return {'records': records, 'upserts': upserts, 'inserted': False, 'attempts': 0}
+
+    def _write(self, batch):
+        batch['attempts'] += 1
+        try:
+            db = self._get_db()
+            if batch['upserts']:
+                try:
+                    db.overall.bulk_write(batch['upserts'], ordered=True)
+                except BulkWriteError as e:
+                    # Ordered: everything before the first failed upsert went through
+                    del batch['upserts'][:e.details['writeErrors'][0]['index']]
+                    raise
+                batch['upserts'] = []
+            if not batch['inserted']:
+                try:
+                    db.writing.insert_many([dict(r) for r in batch['records']], ordered=False)
+                except BulkWriteError as e:
+                    # Records already inserted by an earlier attempt come back as duplicates
+                    if any(error['code'] != DUPLICATE_KEY_ERROR for error in e.details['writeErrors']):
+                        raise
+                batch['inserted'] = True
+            with self._stats_lock:
+                self._stats["written"] += len(batch['records'])
+                self._stats["batches"] += 1
+                self._last_flush = time.time()
+        except Exception as e:
+            self._count("errors")
+            print(f"Database error: {str(e)}")
+            if batch['attempts'] < self.max_attempts:
+                self._count("retried")
+                self._retry.append(batch)
+            else:
+                with self._stats_lock:
+                    self._stats["dead_lettered"] += len(batch['records'])
+                print(f"Dropping {len(batch['records'])} attempt records after {batch['attempts']} failed writes")
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        """Queue depth and lag of the oldest pending record"""
+        with self._queue.mutex:
+            oldest = self._queue.queue[0][0] if self._queue.queue else None
+            depth = len(self._queue.queue)
+        with self._stats_lock:
+            return {
+                "queue_depth": depth,
+                "queue_capacity": self._queue.maxsize,
+                "retry_batches": len(self._retry),
+                "lag_seconds": round(time.time() - oldest, 3) if oldest else 0,
+                "last_flush": self._last_flush,
+                **self._stats
+            }
+
+    def close(self):
+        """Stop the flusher and write everything still queued"""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(timeout=10)
+        self.flush()
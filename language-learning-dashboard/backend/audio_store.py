@@ -0,0 +1,181 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Shared by app1 and app3; least recently used clips go once MAX_BYTES is passed
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", "static/audio")
+AUDIO_CACHE_MAX_BYTES = int(os.getenv("AUDIO_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+AUDIO_SYNTH_BACKEND = os.getenv("AUDIO_SYNTH_BACKEND", "gtts")
+PRESYNTH_WORKERS = int(os.getenv("PRESYNTH_WORKERS", 2))
+
+
+class GTTSSynthesizer:
+    """Synthesizes speech with gTTS"""
+
+    def synthesize(self, text, lang, tld, slow, path):
+        from gtts import gTTS
+        tts = gTTS(text=text, lang=lang, tld=tld, slow=slow, lang_check=False)
+        tts.save(path)
+
+
+class StubSynthesizer:
+    """Offline synthesizer for tests - writes a tiny placeholder file"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def synthesize(self, text, lang, tld, slow, path):
+        self.calls += 1
+        with open(path, 'wb') as f:
+            f.write(b"ID3" + f"{lang}|{tld}|{slow}|{text}".encode('utf-8'))
+
+
+SYNTHESIZERS = {
+    "gtts": GTTSSynthesizer,
+    "stub": StubSynthesizer
+}
+
+
+def audio_key(text, lang='en', tld='com', slow=False):
+    """Content address for a synthesized clip"""
+    return hashlib.sha1(f"{lang}|{tld}|{int(slow)}|{text}".encode('utf-8')).hexdigest()
+
+
+class AudioStore:
+    """Content-addressed store of synthesized speech files.
+
+    Files are named by audio_key, so the same (text, lang, tld, slow) is only
+    ever synthesized once. Concurrent requests for a clip that is still being
+    rendered wait for that render instead of starting another. A clip another
+    process has written to the same directory since startup is adopted rather
+    than rendered again. When the directory grows past max_bytes the least
+    recently used clips are removed.
+    """
+
+    def __init__(self, directory=AUDIO_CACHE_DIR, max_bytes=AUDIO_CACHE_MAX_BYTES, synthesizer=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.synthesizer = synthesizer or SYNTHESIZERS[AUDIO_SYNTH_BACKEND]()
+        self._lock = threading.Lock()
+        self._files = OrderedDict()  # key -> size, oldest first
+        self._in_flight = {}
+        self._total_bytes = 0
+        self._executor = ThreadPoolExecutor(max_workers=PRESYNTH_WORKERS, thread_name_prefix="presynth")
+        self.hits = 0
+        self.misses = 0
+
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        # Index clips left from earlier runs, least recently modified first
+        existing = []
+        for name in os.listdir(directory):
+            if name.endswith('.mp3') and len(name) == 44:
+                path = os.path.join(directory, name)
+                existing.append((os.path.getmtime(path), name[:-4], os.path.getsize(path)))
+        for _, key, size in sorted(existing):
+            self._files[key] = size
+            self._total_bytes += size
+
+    def path_for(self, key):
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def get(self, text, lang='en', tld='com', slow=False):
+        """Return the path of the clip, synthesizing it if needed (None on failure)"""
+        key = audio_key(text, lang, tld, slow)
+        with self._lock:
+            if key in self._files and os.path.exists(self.path_for(key)):
+                self._files.move_to_end(key)
+                self.hits += 1
+                return self.path_for(key)
+
+            adopted = self._adopt(key)
+            if adopted:
+                self.hits += 1
+                return adopted
+
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+                self.misses += 1
+
+        if not owner:
+            return future.result()
+
+        path = None
+        try:
+            path = self._synthesize(key, text, lang, tld, slow)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_result(path)
+        return path
+
+    def _synthesize(self, key, text, lang, tld, slow):
+        path = self.path_for(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            self.synthesizer.synthesize(text, lang, tld, slow, tmp_path)
+            if not os.path.exists(tmp_path) or os.path.getsize(tmp_path) == 0:
+                print(f"Generated audio file is empty or missing: {path}")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return None
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Error generating audio: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+
+        size = os.path.getsize(path)
+        with self._lock:
+            self._total_bytes += size - self._files.pop(key, 0)
+            self._files[key] = size
+            self._evict()
+        return path
+
+    def _adopt(self, key):
+        """Index a clip written by another process; caller holds the lock"""
+        path = self.path_for(key)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        # Also forgets an indexed clip that another process has evicted
+        self._total_bytes -= self._files.pop(key, 0)
+        if not size:
+            return None
+        self._files[key] = size
+        self._total_bytes += size
+        self._evict()
+        return path
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._files) > 1:
+            key, size = self._files.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
+
+    def prefetch(self, texts, lang='en', tld='com', slow=False):
+        """Render clips in the background so later get() calls are hits"""
+        return [self._executor.submit(self.get, text, lang, tld, slow) for text in texts]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "clips": len(self._files),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "in_flight": len(self._in_flight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "synthesizer": type(self.synthesizer).__name__
+            }
@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# FaceMesh graphs kept warm, and how long a frame waits for a free one
+FACE_MESH_POOL_SIZE = int(os.getenv("FACE_MESH_POOL_SIZE", 4))
+FACE_MESH_TIMEOUT = float(os.getenv("FACE_MESH_TIMEOUT", 5))
+
+
+class FaceMeshBusyError(Exception):
+    """Raised when no FaceMesh instance frees up in time"""
+
+
+def default_face_mesh():
+    import mediapipe as mp
+    return mp.solutions.face_mesh.FaceMesh(
+        static_image_mode=False,
+        max_num_faces=1,
+        refine_landmarks=True,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5
+    )
+
+
+class _Slot:
+    __slots__ = ("mesh", "owner", "busy", "last_used")
+
+    def __init__(self):
+        self.mesh = None
+        self.owner = None
+        self.busy = True
+        self.last_used = 0.0
+
+
+class FaceMeshPool:
+    """Fixed set of FaceMesh graphs shared by request threads.
+
+    A graph is used by one thread at a time. Sessions are sticky: a session
+    gets the graph it used last whenever that graph is free, so tracking mode
+    carries over between its consecutive frames. When a graph passes to a
+    different session it is reset first, so no tracking state leaks between
+    users. Graphs are created lazily, up to size; another session's graph
+    is only taken over once the pool is full.
+    """
+
+    def __init__(self, factory=default_face_mesh, size=FACE_MESH_POOL_SIZE, timeout=FACE_MESH_TIMEOUT):
+        self._factory = factory
+        self.size = size
+        self.timeout = timeout
+        self._slots = []
+        self._cond = threading.Condition()
+        self._waiting = 0
+        self._stats = {"checkouts": 0, "sticky_hits": 0, "owner_switches": 0, "timeouts": 0}
+        self._wait_seconds = 0.0
+        self._max_wait = 0.0
+
+    @contextmanager
+    def checkout(self, session_id=None):
+        """Borrow a FaceMesh for the duration of the with-block"""
+        slot = self._acquire(session_id)
+        try:
+            yield slot.mesh
+        finally:
+            with self._cond:
+                slot.busy = False
+                slot.last_used = time.time()
+                self._cond.notify()
+
+    def _acquire(self, session_id):
+        start = time.time()
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    slot = self._pick(session_id, can_grow=len(self._slots) < self.size)
+                    if slot:
+                        break
+                    if len(self._slots) < self.size:
+                        slot = _Slot()  # created busy; the graph is built below
+                        self._slots.append(slot)
+                        break
+                    remaining = start + self.timeout - time.time()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise FaceMeshBusyError("Face analysis is busy, please try again")
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+            waited = time.time() - start
+            self._wait_seconds += waited
+            self._max_wait = max(self._max_wait, waited)
+            self._stats["checkouts"] += 1
+            switched = slot.mesh is not None and (slot.owner != session_id or session_id is None)
+            if slot.mesh is not None and not switched:
+                self._stats["sticky_hits"] += 1
+            elif switched:
+                self._stats["owner_switches"] += 1
+            slot.owner = session_id
+
+        try:
+            if slot.mesh is None:
+                slot.mesh = self._factory()
+            elif switched and hasattr(slot.mesh, "reset"):
+                slot.mesh.reset()
+        except Exception:
+            with self._cond:
+                if slot.mesh is None:
+                    self._slots.remove(slot)
+                else:
+                    slot.busy = False
+                self._cond.notify()
+            raise
+        return slot
+
+    def _pick(self, session_id, can_grow):
+        # Caller holds the lock: the session's own graph, else an unowned one.
+        # Another session's graph (least recently used first) is only taken
+        # when no new graph can be created; otherwise return None to grow.
+        free = [slot for slot in self._slots if not slot.busy]
+        own = [slot for slot in free if session_id is not None and slot.owner == session_id]
+        unowned = [slot for slot in free if slot.owner is None]
+        candidates = own or unowned
+        if not candidates and not can_grow:
+            candidates = sorted(free, key=lambda s: s.last_used)
+        if not candidates:
+            return None
+        slot = candidates[0]
+        slot.busy = True
+        return slot
+
+    def stats(self):
+        with self._cond:
+            checkouts = self._stats["checkouts"]
+            return {
+                "size": self.size,
+                "created": len(self._slots),
+                "in_use": sum(1 for slot in self._slots if slot.busy),
+                "waiting": self._waiting,
+                "avg_wait_ms": round(self._wait_seconds / checkouts * 1000, 2) if checkouts else 0,
+                "max_wait_ms": round(self._max_wait * 1000, 2),
+                **self._stats
+            }
@@ -0,0 +1,175 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Default settings, overridable through the environment variables of the same
+# name. They are read when a resolver or backend is created, so values from a
+# .env loaded after this import still apply.
+UNSPLASH_API_URL = "https://api.unsplash.com/photos/random"
+IMAGE_BACKEND = "unsplash"
+IMAGE_CACHE_DB = "images.db"
+IMAGE_CACHE_TTL = 7 * 24 * 3600
+IMAGE_FETCH_TIMEOUT = 4
+IMAGE_FETCH_WORKERS = 8
+IMAGE_MEMORY_SIZE = 5000
+
+
+class UnsplashBackend:
+    """Looks up a photo for a query over a pooled, keep-alive session.
+
+    Point UNSPLASH_API_URL at a local stub server to test without the network.
+    """
+
+    def __init__(self, api_key=None, url=None, pool_size=None):
+        self.api_key = api_key or os.getenv("UNSPLASH_API_KEY")
+        self.url = url or os.getenv("UNSPLASH_API_URL", UNSPLASH_API_URL)
+        pool_size = pool_size or int(os.getenv("IMAGE_FETCH_WORKERS", IMAGE_FETCH_WORKERS))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def lookup(self, query, timeout):
+        response = self.session.get(
+            self.url,
+            params={"query": query, "client_id": self.api_key},
+            timeout=timeout
+        )
+        if response.status_code != 200:
+            return None
+        return response.json()["urls"]["small"]
+
+
+class StubBackend:
+    """Offline backend for tests - deterministic URLs, optional delay"""
+
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.calls = 0
+
+    def lookup(self, query, timeout):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return f"https://images.example/{query.replace(' ', '-')}.jpg"
+
+
+BACKENDS = {
+    "unsplash": UnsplashBackend,
+    "stub": StubBackend
+}
+
+
+class ImageResolver:
+    """Resolves lesson words to image URLs.
+
+    query -> URL results are cached in memory and in a SQLite file for
+    ttl seconds. Misses are fetched concurrently, each bounded by the fetch
+    timeout, so a lesson waits for its slowest lookup rather than the sum
+    of them. Queries that fail or time out get placeholder(query) and are
+    not cached, so they are retried on the next lesson.
+    """
+
+    def __init__(self, backend=None, placeholder=None, db_path=None, ttl=None, timeout=None, workers=None,
+                 memory_size=None):
+        self.backend = backend or BACKENDS[os.getenv("IMAGE_BACKEND", IMAGE_BACKEND)]()
+        self.placeholder = placeholder or (lambda query: "https://via.placeholder.com/300")
+        db_path = db_path or os.getenv("IMAGE_CACHE_DB", IMAGE_CACHE_DB)
+        self.ttl = ttl or float(os.getenv("IMAGE_CACHE_TTL", IMAGE_CACHE_TTL))
+        self.timeout = timeout or float(os.getenv("IMAGE_FETCH_TIMEOUT", IMAGE_FETCH_TIMEOUT))
+        self.memory_size = memory_size or int(os.getenv("IMAGE_MEMORY_SIZE", IMAGE_MEMORY_SIZE))
+        workers = workers or int(os.getenv("IMAGE_FETCH_WORKERS", IMAGE_FETCH_WORKERS))
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="images")
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "fetched": 0, "failed": 0, "timed_out": 0}
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS images (
+                query TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def resolve(self, query):
+        return self.resolve_many([query])[query]
+
+    def resolve_many(self, queries):
+        """Map each query to an image URL, fetching all misses in parallel"""
+        results = {}
+        missing = []
+        now = time.time()
+
+        with self._lock:
+            for query in dict.fromkeys(queries):
+                entry = self._memory.get(query)
+                if entry is None:
+                    row = self._conn.execute(
+                        "SELECT url, created_at FROM images WHERE query=?", (query,)
+                    ).fetchone()
+                    if row:
+                        entry = (row[0], row[1] + self.ttl)
+                        self._remember(query, entry)
+                if entry and entry[1] > now:
+                    results[query] = entry[0]
+                    self._stats["hits"] += 1
+                else:
+                    missing.append(query)
+                    self._stats["misses"] += 1
+
+        if missing:
+            futures = {self._executor.submit(self._fetch, query): query for query in missing}
+            done, not_done = wait(futures, timeout=self.timeout + 1)
+            for future, query in futures.items():
+                url = future.result() if future in done else None
+                if future in not_done:
+                    with self._lock:
+                        self._stats["timed_out"] += 1
+                results[query] = url or self.placeholder(query)
+
+        return results
+
+    def _fetch(self, query):
+        try:
+            url = self.backend.lookup(query, self.timeout)
+        except Exception as e:
+            print(f"Error generating image: {str(e)}")
+            url = None
+
+        with self._lock:
+            if not url:
+                self._stats["failed"] += 1
+                return None
+            now = time.time()
+            self._remember(query, (url, now + self.ttl))
+            self._conn.execute("INSERT OR REPLACE INTO images VALUES (?, ?, ?)", (query, url, now))
+            self._conn.commit()
+            self._stats["fetched"] += 1
+        return url
+
+    def _remember(self, query, entry):
+        # Caller holds the lock
+        self._memory[query] = entry
+        self._memory.move_to_end(query)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+            return {
+                "memory_entries": len(self._memory),
+                "stored_rows": rows,
+                "backend": type(self.backend).__name__,
+                **self._stats
+            }
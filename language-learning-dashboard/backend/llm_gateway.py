@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Fallbacks for the environment variables of the same name (LLM_MODEL for
+# DEFAULT_MODEL). The environment is read when a gateway or backend is created,
+# not at import, so a .env loaded after this import still applies.
+GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+DEFAULT_MODEL = "llama3-70b-8192"
+LLM_BACKEND = "groq"
+LLM_TIMEOUT = 30
+LLM_MAX_CONCURRENCY = 16
+LLM_CACHE_SIZE = 1024
+LLM_CACHE_TTL = 6 * 3600
+
+
+class LLMError(Exception):
+    """Raised when the upstream call fails or times out"""
+
+
+class GroqBackend:
+    """Chat completions over HTTP with a pooled, keep-alive session"""
+
+    def __init__(self, api_key=None, url=None, pool_size=None):
+        self.api_key = api_key or os.getenv("GROQ_API_KEY")
+        self.url = url or os.getenv("GROQ_API_URL", GROQ_API_URL)
+        pool_size = pool_size or int(os.getenv("LLM_MAX_CONCURRENCY", LLM_MAX_CONCURRENCY))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=1)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def complete(self, model, messages, params, timeout):
+        response = self.session.post(
+            self.url,
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            },
+            json={"model": model, "messages": messages, **params},
+            timeout=timeout
+        )
+        if response.status_code != 200:
+            raise LLMError(f"Error: {response.text}")
+        return response.json()['choices'][0]['message']['content']
+
+
+class FakeBackend:
+    """Offline backend for tests.
+
+    responder(model, messages, params) returns the completion text; by
+    default it echoes the last message, wrapped in JSON when JSON was asked for.
+    """
+
+    def __init__(self, responder=None, delay=0):
+        self.responder = responder
+        self.delay = delay
+        self.calls = 0
+
+    def complete(self, model, messages, params, timeout):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.responder:
+            return self.responder(model, messages, params)
+        content = messages[-1]["content"]
+        if params.get("response_format", {}).get("type") == "json_object":
+            return json.dumps({"echo": content})
+        return content
+
+
+BACKENDS = {
+    "groq": GroqBackend,
+    "fake": FakeBackend
+}
+
+
+class LLMGateway:
+    """Shared entry point for chat completion calls.
+
+    Upstream calls run on a bounded pool with per-call timeouts, identical
+    in-flight requests are coalesced into one upstream call, and responses
+    are cached by (model, messages, params). Requests made with cache=False
+    want a fresh completion each time, so they are neither cached nor coalesced.
+    """
+
+    def __init__(self, backend=None, max_concurrency=None, cache_size=None, cache_ttl=None, timeout=None,
+                 model=None):
+        self.backend = backend or BACKENDS[os.getenv("LLM_BACKEND", LLM_BACKEND)]()
+        self.model = model or os.getenv("LLM_MODEL", DEFAULT_MODEL)
+        self.timeout = timeout or float(os.getenv("LLM_TIMEOUT", LLM_TIMEOUT))
+        self.cache_size = cache_size or int(os.getenv("LLM_CACHE_SIZE", LLM_CACHE_SIZE))
+        self.cache_ttl = cache_ttl or float(os.getenv("LLM_CACHE_TTL", LLM_CACHE_TTL))
+        max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", LLM_MAX_CONCURRENCY))
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._cache = OrderedDict()
+        self._stats = {"calls": 0, "cache_hits": 0, "coalesced": 0, "errors": 0, "timeouts": 0}
+
+    @staticmethod
+    def request_key(model, messages, params):
+        payload = json.dumps([model, messages, params], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def submit(self, messages, model=None, cache=True, **params):
+        """Start a completion and return a Future for its text"""
+        model = model or self.model
+        key = self.request_key(model, messages, params)
+        with self._lock:
+            if cache:
+                entry = self._cache.get(key)
+                if entry and entry[0] > time.time():
+                    self._cache.move_to_end(key)
+                    self._stats["cache_hits"] += 1
+                    future = Future()
+                    future.set_result(entry[1])
+                    return future
+
+                future = self._in_flight.get(key)
+                if future is not None:
+                    self._stats["coalesced"] += 1
+                    return future
+
+            future = self._executor.submit(self._call, key, model, messages, params, cache)
+            if cache:
+                self._in_flight[key] = future
+            return future
+
+    def _call(self, key, model, messages, params, cache):
+        try:
+            self._count("calls")
+            content = self.backend.complete(model, messages, params, self.timeout)
+            if cache:
+                with self._lock:
+                    self._cache[key] = (time.time() + self.cache_ttl, content)
+                    self._cache.move_to_end(key)
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+            return content
+        except Exception:
+            self._count("errors")
+            raise
+        finally:
+            if cache:
+                with self._lock:
+                    self._in_flight.pop(key, None)
+
+    def chat(self, messages, model=None, timeout=None, cache=True, **params):
+        """Blocking completion; raises LLMError on failure or timeout"""
+        future = self.submit(messages, model=model, cache=cache, **params)
+        try:
+            return future.result(timeout=timeout or self.timeout)
+        except FutureTimeoutError:
+            self._count("timeouts")
+            raise LLMError("LLM request timed out")
+        except LLMError:
+            raise
+        except Exception as e:
+            raise LLMError(str(e))
+
+    def chat_json(self, messages, model=None, timeout=None, cache=True, **params):
+        """Completion in JSON mode, parsed"""
+        params.setdefault("response_format", {"type": "json_object"})
+        content = self.chat(messages, model=model, timeout=timeout, cache=cache, **params)
+        try:
+            return json.loads(content)
+        except ValueError as e:
+            raise LLMError(f"Invalid JSON from model: {e}")
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": len(self._in_flight),
+                "cached": len(self._cache),
+                "backend": type(self.backend).__name__,
+                **self._stats
+            }
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    """Process-wide gateway instance"""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway()
+    return _gateway
@@ -0,0 +1,186 @@
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# Reference mouth shapes per sound, in mouth_features() units:
+# aperture and width relative to face width, rounding = lip height / width,
+# protrusion = how far the lip centres sit in front of the mouth corners,
+# relative to face width (about 0.08 for relaxed lips)
+MOUTH_REFERENCES = {
+    'TH': {'aperture': 0.06, 'width': 0.40, 'rounding': 0.35, 'protrusion': 0.08, 'tip': "Tongue between teeth like த but forward"},
+    'V': {'aperture': 0.02, 'width': 0.40, 'rounding': 0.25, 'protrusion': 0.07, 'tip': "Bite lower lip slightly"},
+    'W': {'aperture': 0.04, 'width': 0.28, 'rounding': 0.70, 'protrusion': 0.14, 'tip': "Round lips tightly like ஊ"},
+    'F': {'aperture': 0.02, 'width': 0.41, 'rounding': 0.25, 'protrusion': 0.07, 'tip': "Upper teeth on lower lip"},
+    'R': {'aperture': 0.06, 'width': 0.33, 'rounding': 0.50, 'protrusion': 0.11, 'tip': "Curl tongue back slightly"},
+    'L': {'aperture': 0.08, 'width': 0.38, 'rounding': 0.40, 'protrusion': 0.08, 'tip': "Tongue tip touching upper teeth"},
+    'P': {'aperture': 0.00, 'width': 0.38, 'rounding': 0.25, 'protrusion': 0.09, 'tip': "Close lips fully then release quickly"},
+    'B': {'aperture': 0.00, 'width': 0.38, 'rounding': 0.25, 'protrusion': 0.09, 'tip': "Close lips fully with vibration"}
+}
+DEFAULT_MOUTH_REFERENCE = {'aperture': 0.05, 'width': 0.38, 'rounding': 0.35, 'protrusion': 0.08, 'tip': "Focus on proper mouth shape"}
+
+FEATURE_NAMES = ['aperture', 'width', 'rounding', 'protrusion']
+# Typical spread of each feature, used to put them on a common scale
+FEATURE_SCALE = np.array([0.04, 0.06, 0.2, 0.03])
+REFERENCE_SOUNDS = list(MOUTH_REFERENCES)
+REFERENCE_VECTORS = np.array([[MOUTH_REFERENCES[sound][name] for name in FEATURE_NAMES] for sound in REFERENCE_SOUNDS])
+
+# FaceMesh lip contours in drawing order, outer ring then inner ring
+LIP_OUTER = [61, 146, 91, 181, 84, 17, 314, 405, 321, 375, 291, 409, 270, 269, 267, 0, 37, 39, 40, 185]
+LIP_INNER = [78, 95, 88, 178, 87, 14, 317, 402, 318, 324, 308, 415, 310, 311, 312, 13, 82, 81, 80, 191]
+# Cheeks, forehead and chin - for face size normalization and the face box
+FACE_OUTLINE = [234, 454, 10, 152]
+MOUTH_LANDMARKS = LIP_OUTER + LIP_INNER + FACE_OUTLINE
+
+# Lean frames are analyzed at most this many pixels on their longer side
+LEAN_MAX_SIDE = int(os.getenv("LEAN_MAX_SIDE", 256))
+FACE_BOX_CAPACITY = 1000
+
+
+def session_id_from(request):
+    """Identify the calling webcam session (falls back to the client address).
+
+    Checks the X-Session-Id header, then session_id / sessionId in the query
+    string or form (binary frame uploads carry it in the query string), then
+    a sessionId JSON field.
+    """
+    session_id = (request.headers.get('X-Session-Id') or request.values.get('session_id')
+                  or request.values.get('sessionId'))
+    if not session_id and request.is_json:
+        session_id = (request.get_json(silent=True) or {}).get('sessionId')
+    return session_id or request.remote_addr
+
+
+class MouthLocator:
+    """Finds the mouth landmarks in webcam frames with a FaceMeshPool.
+
+    Remembers the last face box of each session, so lean frames only run
+    FaceMesh on the face.
+    """
+
+    def __init__(self, pool, max_side=LEAN_MAX_SIDE, capacity=FACE_BOX_CAPACITY):
+        self.pool = pool
+        self.max_side = max_side
+        self.capacity = capacity
+        self.face_boxes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def find(self, img, session_id, downscale=False):
+        """(N, 3) array of MOUTH_LANDMARKS in normalized frame coordinates, or None if no face is found.
+
+        With downscale, FaceMesh runs on the session's last face box (or the
+        whole frame when there is none) shrunk to at most max_side pixels.
+        """
+        h, w = img.shape[:2]
+        x0, y0, x1, y1 = 0, 0, w, h
+        if downscale:
+            with self._lock:
+                box = self.face_boxes.get(session_id)
+            if box:
+                x0, y0, x1, y1 = box
+        crop = img[y0:y1, x0:x1]
+
+        if downscale and max(crop.shape[:2]) > self.max_side:
+            scale = self.max_side / max(crop.shape[:2])
+            crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+        with self.pool.checkout(session_id) as face_mesh:
+            results = face_mesh.process(cv2.cvtColor(crop, cv2.COLOR_BGR2RGB))
+
+        if not results.multi_face_landmarks:
+            with self._lock:
+                self.face_boxes.pop(session_id, None)  # search the whole frame next time
+            return None
+
+        # One pass over just the landmarks we use, then crop -> frame coordinates in bulk
+        landmarks = results.multi_face_landmarks[0].landmark
+        points = np.array([(lm.x, lm.y, lm.z) for lm in map(landmarks.__getitem__, MOUTH_LANDMARKS)])
+        crop_w, crop_h = x1 - x0, y1 - y0
+        points *= (crop_w, crop_h, crop_w)
+        points[:, 0] += x0
+        points[:, 1] += y0
+        points /= (w, h, w)
+
+        if downscale:
+            # Remember the face box, padded so the face stays inside it as it moves
+            low = points[:, :2].min(axis=0) * (w, h)
+            high = points[:, :2].max(axis=0) * (w, h)
+            pad = (high - low) * 0.25
+            box = (
+                max(0, int(low[0] - pad[0])),
+                max(0, int(low[1] - pad[1])),
+                min(w, int(high[0] + pad[0])),
+                min(h, int(high[1] + pad[1]))
+            )
+            if box[2] - box[0] > 16 and box[3] - box[1] > 16:
+                with self._lock:
+                    self.face_boxes[session_id] = box
+                    self.face_boxes.move_to_end(session_id)
+                    while len(self.face_boxes) > self.capacity:
+                        self.face_boxes.popitem(last=False)
+
+        return points
+
+
+def mouth_features(mouth_points, frame_shape):
+    """Face-size independent mouth shape vector, ordered as FEATURE_NAMES"""
+    h, w = frame_shape[:2]
+    xyz = mouth_points * (w, h, w)  # back to pixels so x and y share a scale
+    outer, inner, face = xyz[:20], xyz[20:40], xyz[40:]
+
+    face_width = np.linalg.norm(face[0, :2] - face[1, :2]) or 1.0
+    width = np.linalg.norm(outer[0, :2] - outer[10, :2]) or 1.0
+    # Inner lower lip points against the inner upper lip points above them
+    aperture = np.linalg.norm(inner[1:10, :2] - inner[19:10:-1, :2], axis=1).mean()
+    lip_height = np.linalg.norm(outer[5, :2] - outer[15, :2])
+    # Lip centres (0, 17) against the mouth corners (61, 291), so the baseline
+    # sits right at the mouth; FaceMesh z is smaller towards the camera
+    protrusion = outer[[0, 10], 2].mean() - outer[[5, 15], 2].mean()
+
+    return np.array([aperture / face_width, width / face_width, lip_height / width, protrusion / face_width])
+
+
+def draw_mouth(img, mouth_points):
+    """Draw the lip contours and landmarks on img for visualization"""
+    h, w = img.shape[:2]
+    pixels = np.round(mouth_points[:40, :2] * (w, h)).astype(np.int32)
+    cv2.polylines(img, [pixels[:20], pixels[20:]], True, (255, 0, 0), 1)
+    # Single-point polylines draw every landmark dot in one call
+    cv2.polylines(img, pixels.reshape(-1, 1, 2), True, (0, 255, 0), 4)
+
+
+def generate_mouth_feedback(target_sound, features):
+    """Score a mouth_features() vector against the target sound's reference shape"""
+    ref = MOUTH_REFERENCES.get(target_sound, DEFAULT_MOUTH_REFERENCE)
+    target = np.array([ref[name] for name in FEATURE_NAMES])
+
+    diffs = (np.asarray(features) - target) / FEATURE_SCALE
+    distance = np.sqrt(np.mean(diffs ** 2))
+    score = max(0, 100 - int(distance * 40))
+
+    # Nearest reference shape over all sounds at once
+    distances = np.sqrt(np.mean(((REFERENCE_VECTORS - features) / FEATURE_SCALE) ** 2, axis=1))
+    closest = REFERENCE_SOUNDS[int(distances.argmin())]
+
+    aperture, width, rounding, protrusion = diffs
+    tips = []
+    if abs(width) > 0.5:
+        tips.append(f"Adjust mouth width: {'wider' if width < 0 else 'narrower'}")
+    if abs(aperture) > 0.5:
+        tips.append(f"Adjust mouth opening: {'taller' if aperture < 0 else 'shorter'}")
+    if abs(rounding) > 0.5:
+        tips.append("Round your lips more" if rounding < 0 else "Relax the rounding of your lips")
+    if abs(protrusion) > 0.5:
+        tips.append("Push your lips forward" if protrusion < 0 else "Keep your lips back against your teeth")
+    if closest != target_sound and distance - distances.min() > 0.5:
+        tips.append(f"Your mouth shape looks more like '{closest}' than '{target_sound}'")
+
+    return {
+        'score': score,
+        'tips': tips if tips else ["Good mouth position!"],
+        'reference': f"For '{target_sound}': {ref['tip']}",
+        'closest': closest,
+        'metrics': {name: round(float(value), 4) for name, value in zip(FEATURE_NAMES, features)}
+    }
@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+from collections import deque
+
+# Frames averaged into each score, and how often scores are pushed
+MOUTH_SMOOTHING_WINDOW = int(os.getenv("MOUTH_SMOOTHING_WINDOW", 5))
+MOUTH_PUSH_HZ = float(os.getenv("MOUTH_PUSH_HZ", 5))
+
+
+class MouthStream:
+    """Scores a continuous webcam frame stream for one client.
+
+    The socket thread hands frames to submit_frame(); only the newest
+    unprocessed frame is kept, so frames that arrive while the previous one
+    is still being analyzed are dropped instead of queueing up. run()
+    analyzes frames on its own thread, smooths the mouth features over the
+    last `window` analyzed frames and pushes a score through send() at a
+    fixed rate.
+
+    analyze(frame) returns a mouth feature vector or None when no face is
+    found; score(target_sound, features) returns generate_mouth_feedback's dict.
+    """
+
+    def __init__(self, analyze, score, send, target_sound='TH',
+                 window=MOUTH_SMOOTHING_WINDOW, push_hz=MOUTH_PUSH_HZ):
+        self._analyze = analyze
+        self._score = score
+        self._send = send
+        self.target_sound = target_sound
+        self.push_interval = 1.0 / push_hz
+        self._window = deque(maxlen=window)
+        self._frame = None
+        self._face = False
+        self._cond = threading.Condition()
+        self._closed = False
+        self.stats = {"received": 0, "analyzed": 0, "dropped": 0, "skipped": 0, "pushed": 0}
+
+    def submit_frame(self, frame):
+        with self._cond:
+            if self._frame is not None:
+                self.stats["dropped"] += 1
+            self._frame = frame
+            self.stats["received"] += 1
+            self._cond.notify()
+
+    def set_target(self, target_sound):
+        with self._cond:
+            self.target_sound = target_sound
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def run(self):
+        next_push = time.time() + self.push_interval
+        while True:
+            with self._cond:
+                while self._frame is None and not self._closed:
+                    remaining = next_push - time.time()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._closed:
+                    return
+                frame, self._frame = self._frame, None
+
+            if frame is not None:
+                self._process(frame)
+
+            if time.time() >= next_push:
+                next_push = max(next_push + self.push_interval, time.time())
+                if not self._push():
+                    return
+
+    def _process(self, frame):
+        try:
+            features = self._analyze(frame)
+        except Exception as e:
+            # e.g. the FaceMesh pool is saturated - skip this frame
+            print(f"Error analyzing mouth frame: {str(e)}")
+            self._count("skipped")
+            return
+        self._count("analyzed")
+        self._face = features is not None
+        if self._face:
+            self._window.append(features)
+        else:
+            self._window.clear()
+
+    def _push(self):
+        with self._cond:
+            stats = dict(self.stats)
+        if not stats["analyzed"]:
+            return True  # nothing to report yet
+
+        if self._face and self._window:
+            # Mean of each feature over the window
+            smoothed = [sum(column) / len(self._window) for column in zip(*self._window)]
+            feedback = self._score(self.target_sound, smoothed)
+            message = {
+                "score": feedback['score'],
+                "feedback": feedback['tips'],
+                "reference": feedback['reference'],
+                "metrics": feedback['metrics']
+            }
+        else:
+            message = {
+                "error": "No face detected",
+                "score": 0,
+                "feedback": ["No face detected clearly", "Position your face in the center of the camera"]
+            }
+        message["targetSound"] = self.target_sound
+        message["stats"] = stats
+
+        try:
+            self._send(message)
+        except Exception as e:
+            print(f"Mouth stream closed: {str(e)}")
+            self.close()
+            return False
+        self._count("pushed")
+        return True
+
+    def _count(self, name):
+        # submit_frame() updates the same counters from the socket thread
+        with self._cond:
+            self.stats[name] += 1
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+
+# In-memory LRU size and entry lifetime; OCR_CACHE_DIR adds a disk tier
+DEFAULT_CACHE_SIZE = int(os.getenv("OCR_CACHE_SIZE", 2048))
+DEFAULT_CACHE_TTL = float(os.getenv("OCR_CACHE_TTL", 24 * 3600))
+DEFAULT_CACHE_DIR = os.getenv("OCR_CACHE_DIR")  # Unset = memory only
+
+# Drawings are hashed on their ink region, so the same strokes drawn anywhere
+# on the canvas share a key, while a small letter on a large canvas keeps
+# enough detail to tell it apart. Regions larger than HASH_SIDE pixels are
+# shrunk to it, keeping their aspect ratio; smaller ones are never upscaled.
+HASH_SIDE = 256
+
+
+def image_key(image, mode):
+    """Content hash of a decoded image's ink region, binarized, plus the OCR mode"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+
+    # Dark strokes on a light canvas, as in app.crop_to_ink
+    _, mask = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY_INV)
+    ink = cv2.findNonZero(mask)
+    if ink is not None:
+        x, y, w, h = cv2.boundingRect(ink)
+        gray = gray[y:y + h, x:x + w]
+
+    height, width = gray.shape
+    scale = min(1.0, HASH_SIDE / max(height, width))
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    resized = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+    _, binary = cv2.threshold(resized, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    digest = hashlib.sha1(binary.tobytes())
+    digest.update(f"|{size[0]}x{size[1]}|{mode}".encode())
+    return digest.hexdigest()
+
+
+class OCRResultCache:
+    """LRU cache with TTL for OCR results, with an optional on-disk tier.
+
+    Values must be JSON serializable so they can be written to disk.
+    """
+
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL, cache_dir=DEFAULT_CACHE_DIR):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if cache_dir and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached value or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+        # Fall back to disk
+        if self.cache_dir:
+            try:
+                with open(self._disk_path(key), 'r') as f:
+                    record = json.load(f)
+                if record["expires_at"] > now:
+                    with self._lock:
+                        self._store(key, record["value"], record["expires_at"])
+                        self.disk_hits += 1
+                    return record["value"]
+                os.remove(self._disk_path(key))
+            except (OSError, ValueError, KeyError):
+                pass
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, value, expires_at)
+
+        if self.cache_dir:
+            try:
+                tmp_path = self._disk_path(key) + ".tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump({"expires_at": expires_at, "value": value}, f)
+                os.replace(tmp_path, self._disk_path(key))
+            except (OSError, TypeError) as e:
+                print(f"OCR cache write error: {e}")
+
+    def _store(self, key, value, expires_at):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0,
+                "disk_tier": bool(self.cache_dir)
+            }
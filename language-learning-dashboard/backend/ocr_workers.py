@@ -0,0 +1,242 @@
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+# Each worker process loads its own EasyOCR reader, so keep the pool small
+DEFAULT_WORKERS = int(os.getenv("OCR_WORKERS", min(4, os.cpu_count() or 1)))
+DEFAULT_QUEUE_SIZE = int(os.getenv("OCR_QUEUE_SIZE", 64))
+DEFAULT_JOB_TIMEOUT = float(os.getenv("OCR_JOB_TIMEOUT", 30))
+
+
+class OCRBusyError(Exception):
+    """Raised when the job queue is full"""
+
+
+class OCRTimeoutError(Exception):
+    """Raised when a job does not finish within its timeout"""
+
+
+_spawn_lock = threading.Lock()
+
+
+@contextmanager
+def _without_main_script():
+    """Keep spawned workers from re-running the parent's __main__ script.
+
+    The spawn start method normally re-imports the main script (app.py) in
+    every child as __mp_main__, repeating its startup work there. Workers
+    only need this module, so the script is hidden while they start.
+    """
+    main = sys.modules['__main__']
+    with _spawn_lock:
+        saved = {name: main.__dict__[name] for name in ('__file__', '__spec__') if name in main.__dict__}
+        main.__dict__.pop('__file__', None)
+        main.__spec__ = None
+        try:
+            yield
+        finally:
+            main.__dict__.pop('__spec__', None)
+            main.__dict__.update(saved)
+
+
+def _worker_main(worker_id, job_queue, result_queue, reader_kwargs, num_threads):
+    """Worker process loop: load the EasyOCR model once, then serve jobs"""
+    import easyocr
+    import torch
+
+    # Share the cores between workers instead of each using all of them
+    torch.set_num_threads(num_threads)
+    reader = easyocr.Reader(['en'], gpu=torch.cuda.is_available(), **reader_kwargs)
+    result_queue.put(('ready', None, worker_id, None))
+
+    while True:
+        job = job_queue.get()
+        if job is None:
+            break
+
+        job_id, deadline, method, args, kwargs = job
+        if time.time() > deadline:
+            # The caller already gave up on this job while it was queued
+            result_queue.put(('skipped', job_id, worker_id, None))
+            continue
+        result_queue.put(('started', job_id, worker_id, None))
+        try:
+            output = getattr(reader, method)(*args, **kwargs)
+            # Convert numpy types so results pickle cheaply
+            output = [(
+                [[int(p[0]), int(p[1])] for p in box],
+                text,
+                float(conf)
+            ) for box, text, conf in output]
+            result_queue.put(('done', job_id, worker_id, output))
+        except Exception as e:
+            result_queue.put(('error', job_id, worker_id, f"{type(e).__name__}: {e}"))
+
+
+class OCRWorkerPool:
+    """Pool of OCR worker processes, each holding its own easyocr.Reader.
+
+    Flask request threads submit jobs through a bounded queue and block on
+    a future with a timeout, so recognition runs in parallel across cores
+    instead of serializing behind one model and the GIL.
+    """
+
+    def __init__(self, num_workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+                 job_timeout=DEFAULT_JOB_TIMEOUT, **reader_kwargs):
+        self.num_workers = max(1, num_workers)
+        self.queue_size = queue_size
+        self.job_timeout = job_timeout
+        self.reader_kwargs = reader_kwargs
+
+        self._ctx = mp.get_context('spawn')
+        self._job_queue = self._ctx.Queue(maxsize=queue_size)
+        self._result_queue = self._ctx.Queue()
+        self._lock = threading.Lock()
+        self._job_ids = itertools.count(1)
+        self._futures = {}
+        self._running = {}  # worker_id -> job_id
+        self._workers = {}
+        self._ready = set()
+        self.threads_per_worker = max(1, (os.cpu_count() or 1) // self.num_workers)
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "timed_out": 0, "rejected": 0,
+                       "skipped": 0, "restarts": 0}
+        self._closed = False
+
+        for worker_id in range(self.num_workers):
+            self._spawn(worker_id)
+
+        self._collector = threading.Thread(target=self._collect_results, daemon=True)
+        self._collector.start()
+
+    def _spawn(self, worker_id):
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self._job_queue, self._result_queue, self.reader_kwargs, self.threads_per_worker),
+            daemon=True
+        )
+        with _without_main_script():
+            process.start()
+        self._workers[worker_id] = process
+
+    def _collect_results(self):
+        """Route worker messages to the waiting futures"""
+        while not self._closed:
+            try:
+                kind, job_id, worker_id, payload = self._result_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            with self._lock:
+                if kind == 'ready':
+                    self._ready.add(worker_id)
+                    continue
+                if kind == 'started':
+                    self._running[worker_id] = job_id
+                    continue
+
+                if self._running.get(worker_id) == job_id:
+                    del self._running[worker_id]
+                future = self._futures.pop(job_id, None)
+                if kind == 'done':
+                    self._stats["completed"] += 1
+                elif kind == 'skipped':
+                    self._stats["skipped"] += 1
+                else:
+                    self._stats["failed"] += 1
+
+            if future is None or future.done():
+                continue
+            if kind == 'done':
+                future.set_result(payload)
+            elif kind == 'skipped':
+                future.set_exception(OCRTimeoutError("OCR job timed out"))
+            else:
+                future.set_exception(RuntimeError(payload))
+
+    def submit(self, method, *args, timeout=None, **kwargs):
+        """Queue a reader call and return a Future for its result.
+
+        Workers skip the job if it is still queued after timeout seconds.
+        """
+        job_id = next(self._job_ids)
+        deadline = time.time() + (timeout or self.job_timeout)
+        future = Future()
+        with self._lock:
+            self._futures[job_id] = future
+            self._stats["submitted"] += 1
+        try:
+            self._job_queue.put_nowait((job_id, deadline, method, args, kwargs))
+        except queue.Full:
+            with self._lock:
+                self._futures.pop(job_id, None)
+                self._stats["rejected"] += 1
+            raise OCRBusyError("OCR queue is full, please retry shortly")
+        future.job_id = job_id
+        return future
+
+    def run(self, method, *args, timeout=None, **kwargs):
+        """Submit a reader call and wait for it, restarting the worker on timeout"""
+        timeout = timeout or self.job_timeout
+        future = self.submit(method, *args, timeout=timeout, **kwargs)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            self._abandon(future.job_id)
+            raise OCRTimeoutError("OCR job timed out")
+
+    def readtext(self, image, **kwargs):
+        return self.run('readtext', image, **kwargs)
+
+    def recognize(self, image, **kwargs):
+        return self.run('recognize', image, **kwargs)
+
+    def _abandon(self, job_id):
+        """Drop a timed out job and replace the worker stuck on it"""
+        with self._lock:
+            self._futures.pop(job_id, None)
+            self._stats["timed_out"] += 1
+            stuck = [w for w, j in self._running.items() if j == job_id]
+            for worker_id in stuck:
+                del self._running[worker_id]
+                self._ready.discard(worker_id)
+                self._workers[worker_id].terminate()
+                self._spawn(worker_id)
+                self._stats["restarts"] += 1
+
+    def stats(self):
+        """Queue depth and worker utilization"""
+        with self._lock:
+            busy = len(self._running)
+            pending = len(self._futures) - busy
+            return {
+                "workers": self.num_workers,
+                "threads_per_worker": self.threads_per_worker,
+                "ready_workers": len(self._ready),
+                "busy_workers": busy,
+                "utilization": round(busy / self.num_workers, 2),
+                "queue_depth": max(0, pending),
+                "queue_capacity": self.queue_size,
+                **self._stats
+            }
+
+    def shutdown(self, timeout=5):
+        """Stop all workers"""
+        for _ in self._workers:
+            try:
+                self._job_queue.put(None, timeout=1)
+            except queue.Full:
+                break
+        deadline = time.time() + timeout
+        for process in self._workers.values():
+            process.join(max(0, deadline - time.time()))
+            if process.is_alive():
+                process.terminate()
+        self._closed = True
@@ -0,0 +1,269 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+# SQLite store and the qtable.json it migrates from on first open
+QTABLE_DB = os.getenv("QTABLE_DB", "qtable.db")
+QTABLE_LEGACY_JSON = os.getenv("QTABLE_LEGACY_JSON", "qtable.json")
+DIFFICULTY_COUNT = 5
+EXERCISE_TYPES = ("speaking_word", "speaking_sentence", "listening", "writing")
+
+
+def state_key(user_id, difficulty, exercise_type):
+    return f"{user_id}-{difficulty}-{exercise_type}"
+
+
+def parse_state(state):
+    """Split a state key into (user_id, difficulty, exercise_type), or None.
+
+    User ids may themselves contain '-', so split from the right.
+    """
+    parts = state.rsplit('-', 2)
+    if len(parts) != 3 or not parts[1].isdigit():
+        return None
+    return parts[0], int(parts[1]), parts[2]
+
+
+class QTableStore:
+    """Array-backed Q-table written through to SQLite one state at a time.
+
+    Users and exercise types are encoded as integers and all Q-values live
+    in one NumPy array of shape (users, difficulties, exercise types,
+    actions), so picking the best exercise type is a single argmax.
+    update_batch() applies many (user, difficulty, type, reward) events in
+    vectorized steps and upserts only the rows of the states it touched into
+    a SQLite WAL database, so an answer costs the same however many learners
+    exist. Events are also appended to an attempts table that replay() can
+    retrain from. A legacy qtable.json is imported on first use.
+    """
+
+    def __init__(self, db_path=QTABLE_DB, legacy_json=QTABLE_LEGACY_JSON,
+                 difficulties=DIFFICULTY_COUNT, exercise_types=EXERCISE_TYPES, log_attempts=True):
+        self.db_path = db_path
+        self.difficulties = difficulties
+        self.log_attempts = log_attempts
+        self._user_ids = {}
+        self._user_names = []
+        self._type_ids = {}
+        self._type_names = []
+        for exercise_type in exercise_types:
+            self._type_ids[exercise_type] = len(self._type_names)
+            self._type_names.append(exercise_type)
+        self.q = np.zeros((64, difficulties, len(self._type_names), difficulties))
+        self.present = np.zeros(self.q.shape[:3], dtype=bool)
+        self._lock = threading.Lock()
+        self.writes = 0
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS q_values (
+                state TEXT PRIMARY KEY,
+                q_values TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS attempts (
+                user_id TEXT NOT NULL,
+                difficulty INTEGER NOT NULL,
+                exercise_type TEXT NOT NULL,
+                reward REAL NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+        rows = self._conn.execute("SELECT state, q_values FROM q_values").fetchall()
+        if not rows and legacy_json and os.path.exists(legacy_json):
+            rows = self._import_json(legacy_json)
+        for state, values in rows:
+            parsed = parse_state(state)
+            if parsed and 1 <= parsed[1] <= difficulties:
+                u, d, t = self._encode(*parsed)
+                values = json.loads(values)[:difficulties]
+                self.q[u, d, t, :len(values)] = values
+                self.present[u, d, t] = True
+
+    def _import_json(self, path):
+        try:
+            with open(path, 'r') as f:
+                legacy = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not import Q-table from {path}: {e}")
+            return []
+        now = time.time()
+        rows = [(state, json.dumps(values)) for state, values in legacy.items()]
+        with self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO q_values VALUES (?, ?, ?)",
+                                   [row + (now,) for row in rows])
+        print(f"Imported {len(rows)} Q-table states from {path}")
+        return rows
+
+    def _encode(self, user_id, difficulty, exercise_type):
+        """Array indices for a state, growing the array for new users and types"""
+        u = self._user_ids.get(user_id)
+        if u is None:
+            u = self._user_ids[user_id] = len(self._user_names)
+            self._user_names.append(user_id)
+            if u >= self.q.shape[0]:
+                self._grow(0, self.q.shape[0])
+        t = self._type_ids.get(exercise_type)
+        if t is None:
+            t = self._type_ids[exercise_type] = len(self._type_names)
+            self._type_names.append(exercise_type)
+            self._grow(2, 1)
+        return u, difficulty - 1, t
+
+    def _grow(self, axis, extra):
+        pad = [(0, 0)] * 4
+        pad[axis] = (0, extra)
+        self.q = np.pad(self.q, pad)
+        self.present = np.pad(self.present, pad[:3])
+
+    def update(self, user_id, difficulty, exercise_type, reward, alpha, gamma):
+        """Apply one Q-learning update and return the new value (None for an unknown difficulty)"""
+        values = self.update_batch([(user_id, difficulty, exercise_type, reward)], alpha, gamma)
+        return float(values[0]) if len(values) else None
+
+    def update_batch(self, events, alpha, gamma):
+        """Apply (user_id, difficulty, exercise_type, reward) events in order.
+
+        Events for distinct states are applied together in one vectorized
+        step; repeated states are split into successive rounds so the result
+        matches applying the events one at a time. Returns the new values.
+        """
+        events = [(str(user_id), int(difficulty), exercise_type, float(reward))
+                  for user_id, difficulty, exercise_type, reward in events
+                  if 1 <= int(difficulty) <= self.difficulties]
+        if not events:
+            return np.empty(0)
+
+        with self._lock:
+            idx = np.array([self._encode(u, d, t) for u, d, t, _ in events])
+            rewards = np.array([event[3] for event in events])
+            users, diffs, types = idx.T
+            flat = np.ravel_multi_index((users, diffs, types), self.present.shape)
+
+            # Occurrence number of each event within its state
+            order = np.argsort(flat, kind='stable')
+            sorted_flat = flat[order]
+            starts = np.flatnonzero(np.r_[True, sorted_flat[1:] != sorted_flat[:-1]])
+            rounds = np.empty(len(flat), dtype=int)
+            rounds[order] = np.arange(len(flat)) - np.repeat(starts, np.diff(np.r_[starts, len(flat)]))
+
+            new_values = np.empty(len(flat))
+            for r in range(rounds.max() + 1):
+                sel = np.flatnonzero(rounds == r)
+                u, d, t = users[sel], diffs[sel], types[sel]
+                # The action is the difficulty itself, as in the original table
+                old_value = self.q[u, d, t, d]
+                next_max = self.q[u, d, t].max(axis=1)
+                value = (1 - alpha) * old_value + alpha * (rewards[sel] + gamma * next_max)
+                self.q[u, d, t, d] = value
+                new_values[sel] = value
+            self.present[users, diffs, types] = True
+
+            self._persist(events, np.unique(idx, axis=0))
+            return new_values
+
+    def _persist(self, events, touched):
+        # Caller holds the lock
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO q_values VALUES (?, ?, ?)",
+                [(state_key(self._user_names[u], d + 1, self._type_names[t]),
+                  json.dumps(self.q[u, d, t].tolist()), now) for u, d, t in touched]
+            )
+            if self.log_attempts:
+                self._conn.executemany("INSERT INTO attempts VALUES (?, ?, ?, ?, ?)",
+                                       [event + (now,) for event in events])
+        self.writes += len(touched)
+
+    def has_user(self, user_id):
+        return str(user_id) in self._user_ids
+
+    def best_action(self, user_id, difficulty):
+        """Exercise type with the highest Q-value for this user at this difficulty, or None"""
+        u = self._user_ids.get(str(user_id))
+        if u is None or not 1 <= difficulty <= self.difficulties:
+            return None
+        with self._lock:
+            present = self.present[u, difficulty - 1]
+            if not present.any():
+                return None
+            scores = np.where(present, self.q[u, difficulty - 1].max(axis=1), -np.inf)
+            return self._type_names[int(scores.argmax())]
+
+    def attempts(self):
+        """Logged (user_id, difficulty, exercise_type, reward) events, oldest first"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT user_id, difficulty, exercise_type, reward FROM attempts ORDER BY rowid"
+            ).fetchall()
+
+    def summary(self):
+        """Per-difficulty analytics over all learners"""
+        with self._lock:
+            n = len(self._user_names)
+            present = self.present[:n]
+            values = np.where(present, self.q[:n].max(axis=3), -np.inf)
+            best = np.where(present.any(axis=2), values.argmax(axis=2), -1)
+            result = {}
+            for d in range(self.difficulties):
+                counts = present[:, d].sum(axis=0)
+                totals = np.where(present[:, d], values[:, d], 0).sum(axis=0)
+                result[str(d + 1)] = {
+                    "learners": int(present[:, d].any(axis=1).sum()),
+                    "mean_q": {name: round(float(totals[t] / counts[t]), 4)
+                               for t, name in enumerate(self._type_names) if counts[t]},
+                    "best_type_counts": {name: int((best[:, d] == t).sum())
+                                         for t, name in enumerate(self._type_names) if (best[:, d] == t).any()}
+                }
+            return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "states": int(self.present.sum()),
+                "users": len(self._user_names),
+                "exercise_types": len(self._type_names),
+                "array_bytes": self.q.nbytes,
+                "writes": self.writes,
+                "db_path": self.db_path
+            }
+
+
+def replay(source_db, target_db, alpha, gamma, batch_size=10000):
+    """Retrain a fresh Q-table in target_db from the attempts logged in source_db"""
+    if os.path.exists(target_db):
+        raise ValueError(f"{target_db} already exists")
+    events = QTableStore(source_db, legacy_json=None).attempts()
+    target = QTableStore(target_db, legacy_json=None, log_attempts=False)
+    start = time.time()
+    for i in range(0, len(events), batch_size):
+        target.update_batch(events[i:i + batch_size], alpha, gamma)
+    return target, len(events), time.time() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Retrain the tutor Q-table from logged attempts")
+    parser.add_argument("--source", default=QTABLE_DB, help="database holding the attempts log")
+    parser.add_argument("--target", default="qtable_replayed.db", help="new database for the retrained table")
+    parser.add_argument("--alpha", type=float, default=0.1)
+    parser.add_argument("--gamma", type=float, default=0.6)
+    args = parser.parse_args()
+
+    try:
+        store, count, seconds = replay(args.source, args.target, args.alpha, args.gamma)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Replayed {count} attempts in {seconds:.2f}s")
+    print(json.dumps({"stats": store.stats(), "summary": store.summary()}, indent=2))
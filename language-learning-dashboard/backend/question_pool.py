@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+# A pool is refilled to TARGET whenever it drops below LOW_WATER
+QUESTION_POOL_TARGET = int(os.getenv("QUESTION_POOL_TARGET", 8))
+QUESTION_POOL_LOW_WATER = int(os.getenv("QUESTION_POOL_LOW_WATER", 3))
+QUESTION_REFILL_WORKERS = int(os.getenv("QUESTION_REFILL_WORKERS", 4))
+REFILL_BACKOFF = 30  # seconds to wait before retrying a pool whose producer failed
+
+
+class QuestionPool:
+    """Stock of ready-to-serve questions per (exercise type, difficulty, language).
+
+    producer(ex_type, difficulty, native_language) builds one complete
+    question (LLM call, options, rendered audio) and raises on failure.
+    Whenever a pool drops below low_water, background workers produce
+    questions until it is back at target, so take() normally returns
+    straight from stock. A produced question whose question_id is already
+    stocked is dropped, so the stock only holds distinct questions.
+    """
+
+    def __init__(self, producer, target=QUESTION_POOL_TARGET, low_water=QUESTION_POOL_LOW_WATER,
+                 workers=QUESTION_REFILL_WORKERS):
+        self._producer = producer
+        self.target = target
+        self.low_water = low_water
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qpool")
+        self._lock = threading.Lock()
+        self._pools = defaultdict(deque)
+        self._pending = defaultdict(int)
+        self._failed_at = {}
+        self._stats = {"hits": 0, "misses": 0, "produced": 0, "duplicates": 0, "errors": 0}
+        self._produce_seconds = 0.0
+
+    def take(self, key, exclude=()):
+        """Pop a stocked question for key whose question_id is not in exclude.
+
+        Returns None when nothing suitable is stocked; a refill is scheduled
+        either way if the pool is running low.
+        """
+        question = None
+        with self._lock:
+            pool = self._pools[key]
+            for i, candidate in enumerate(pool):
+                if candidate["question_id"] not in exclude:
+                    question = candidate
+                    del pool[i]
+                    break
+            self._stats["hits" if question else "misses"] += 1
+            self._schedule(key)
+        return question
+
+    def warm(self, keys, depth=None):
+        """Stock the given pools in the background, up to depth (default low_water).
+
+        Warming only to low_water keeps start-up cheap; the first take() on
+        a pool tops it up to target.
+        """
+        depth = self.low_water if depth is None else depth
+        with self._lock:
+            for key in keys:
+                self._schedule(key, depth)
+
+    def _schedule(self, key, depth=None):
+        # Caller holds the lock
+        stock = len(self._pools[key]) + self._pending[key]
+        if stock >= self.low_water or time.time() - self._failed_at.get(key, 0) < REFILL_BACKOFF:
+            return
+        depth = self.target if depth is None else depth
+        for _ in range(depth - stock):
+            self._pending[key] += 1
+            self._executor.submit(self._refill, key)
+
+    def _refill(self, key):
+        start = time.time()
+        try:
+            question = self._producer(*key)
+        except Exception as e:
+            print(f"Error refilling question pool {key}: {e}")
+            with self._lock:
+                self._stats["errors"] += 1
+                self._failed_at[key] = time.time()
+            return
+        finally:
+            with self._lock:
+                self._pending[key] -= 1
+
+        with self._lock:
+            self._produce_seconds += time.time() - start
+            pool = self._pools[key]
+            if any(stocked["question_id"] == question["question_id"] for stocked in pool):
+                self._stats["duplicates"] += 1
+                return
+            pool.append(question)
+            self._stats["produced"] += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            built = self._stats["produced"] + self._stats["duplicates"]
+            return {
+                "target": self.target,
+                "low_water": self.low_water,
+                "stock": {"_".join(map(str, key)): len(pool) for key, pool in self._pools.items()},
+                "pending": sum(self._pending.values()),
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0,
+                "avg_produce_seconds": round(self._produce_seconds / built, 3) if built else 0,
+                **self._stats
+            }
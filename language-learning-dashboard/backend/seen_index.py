@@ -0,0 +1,97 @@
+import hashlib
+import math
+import os
+import threading
+from collections import OrderedDict
+
+# Exact sets switch to a bloom filter past SEEN_EXACT_LIMIT ids per user
+SEEN_EXACT_LIMIT = int(os.getenv("SEEN_EXACT_LIMIT", 2000))
+SEEN_BLOOM_CAPACITY = int(os.getenv("SEEN_BLOOM_CAPACITY", 100000))
+SEEN_BLOOM_ERROR = float(os.getenv("SEEN_BLOOM_ERROR", 0.001))
+SEEN_MAX_USERS = int(os.getenv("SEEN_MAX_USERS", 10000))
+
+
+class BloomFilter:
+    """Fixed-size bloom filter over string ids"""
+
+    def __init__(self, capacity=SEEN_BLOOM_CAPACITY, error_rate=SEEN_BLOOM_ERROR):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def __len__(self):
+        return self.count
+
+
+class SeenIndex:
+    """Per-user set of question ids already served.
+
+    Each user starts with an exact set; once it grows past exact_limit it is
+    folded into a bloom filter, so long histories stay small at the cost of
+    rarely skipping a question the user has not actually seen. Membership
+    tests are O(1) either way. Only the max_users most recently active users
+    are kept.
+    """
+
+    def __init__(self, exact_limit=SEEN_EXACT_LIMIT, max_users=SEEN_MAX_USERS):
+        self.exact_limit = exact_limit
+        self.max_users = max_users
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def for_user(self, user_id):
+        """The user's seen container (supports `in`)"""
+        with self._lock:
+            return self._get(user_id)
+
+    def add(self, user_id, question_id):
+        self.add_many(user_id, (question_id,))
+
+    def add_many(self, user_id, question_ids):
+        with self._lock:
+            seen = self._get(user_id)
+            for question_id in question_ids:
+                if question_id not in seen:
+                    seen.add(question_id)
+            if isinstance(seen, set) and len(seen) > self.exact_limit:
+                bloom = BloomFilter()
+                for question_id in seen:
+                    bloom.add(question_id)
+                self._users[user_id] = bloom
+
+    def _get(self, user_id):
+        # Caller holds the lock
+        seen = self._users.get(user_id)
+        if seen is None:
+            seen = set()
+            self._users[user_id] = seen
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+        return seen
+
+    def stats(self):
+        with self._lock:
+            blooms = sum(1 for seen in self._users.values() if isinstance(seen, BloomFilter))
+            return {
+                "users": len(self._users),
+                "bloom_users": blooms,
+                "tracked_ids": sum(len(seen) for seen in self._users.values()),
+                "exact_limit": self.exact_limit
+            }
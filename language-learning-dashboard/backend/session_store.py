@@ -0,0 +1,85 @@
+import os
+import threading
+import time
+
+# Idle seconds before a session is dropped, and how many may be live at once
+SESSION_IDLE_TIMEOUT = float(os.getenv("SESSION_IDLE_TIMEOUT", 30 * 60))
+SESSION_MAX = int(os.getenv("SESSION_MAX", 1000))
+SWEEP_INTERVAL = 60
+
+
+class SessionStore:
+    """Thread-safe map of session id -> per-session state record.
+
+    Records are created on first use with the given factory. Sessions idle
+    for longer than idle_timeout are evicted, unless is_busy(record) says
+    they are still doing work (e.g. narrating); when max_sessions is
+    reached the least recently used idle session is evicted.
+    """
+
+    def __init__(self, factory, idle_timeout=SESSION_IDLE_TIMEOUT, max_sessions=SESSION_MAX,
+                 is_busy=None, on_evict=None):
+        self._factory = factory
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self._is_busy = is_busy or (lambda record: False)
+        self._on_evict = on_evict
+        self._sessions = {}
+        self._last_seen = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.time()
+        self.evicted = 0
+
+    def get(self, session_id):
+        """Return the record for session_id, creating it if needed"""
+        now = time.time()
+        with self._lock:
+            if now - self._last_sweep > SWEEP_INTERVAL:
+                self._sweep(now)
+
+            record = self._sessions.get(session_id)
+            if record is None:
+                if len(self._sessions) >= self.max_sessions:
+                    self._evict_oldest()
+                record = self._factory(session_id)
+                self._sessions[session_id] = record
+            self._last_seen[session_id] = now
+            return record
+
+    def peek(self, session_id):
+        """Return the record without creating or touching it"""
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def _sweep(self, now):
+        self._last_sweep = now
+        expired = [sid for sid, seen in self._last_seen.items()
+                   if now - seen > self.idle_timeout and not self._is_busy(self._sessions[sid])]
+        for sid in expired:
+            self._remove(sid)
+
+    def _evict_oldest(self):
+        for sid in sorted(self._last_seen, key=self._last_seen.get):
+            if not self._is_busy(self._sessions[sid]):
+                self._remove(sid)
+                return
+
+    def _remove(self, session_id):
+        record = self._sessions.pop(session_id)
+        del self._last_seen[session_id]
+        self.evicted += 1
+        if self._on_evict:
+            self._on_evict(record)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active_sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "idle_timeout": self.idle_timeout,
+                "evicted": self.evicted
+            }
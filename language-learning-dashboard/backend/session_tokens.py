@@ -0,0 +1,138 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from functools import wraps
+
+from flask import g, jsonify, request
+
+# Default settings, overridable through the SESSION_SECRET and SESSION_TOKEN_TTL
+# environment variables. They are read when SessionTokens is created, so values
+# from a .env loaded after this import still apply. Every backend that
+# validates tokens must share the same SESSION_SECRET.
+#
+# Revocations (logout) are only known to the process that issued them, so a
+# token revoked in app2 still passes a signature check in any other backend
+# until it expires. The TTL bounds that window; it is kept short at the cost
+# of users logging in again every hour.
+DEFAULT_TOKEN_TTL = 3600
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class SessionTokens:
+    """Issues and validates signed, expiring session tokens.
+
+    A token is base64url(claims JSON) + "." + base64url(HMAC-SHA256), so
+    validating one is a signature and expiry check in memory - no database
+    lookup and no password hashing. Revoked token ids are kept until the
+    token would have expired anyway.
+    """
+
+    def __init__(self, secret=None, ttl=None):
+        secret = secret or os.getenv("SESSION_SECRET")
+        if ttl is None:
+            ttl = float(os.getenv("SESSION_TOKEN_TTL", DEFAULT_TOKEN_TTL))
+        if not secret:
+            print("SESSION_SECRET is not set - using a random secret, tokens will not survive a restart")
+            secret = secrets.token_hex(32)
+        self._key = secret.encode("utf-8")
+        self.ttl = ttl
+        self._revoked = {}  # token id -> expiry
+        self._lock = threading.Lock()
+        self._stats = {"issued": 0, "valid": 0, "invalid": 0, "expired": 0, "revoked": 0}
+
+    def _sign(self, payload):
+        return _b64encode(hmac.new(self._key, payload.encode("ascii"), hashlib.sha256).digest())
+
+    def issue(self, username, user_id=None):
+        """Return (token, expires_at) for a freshly authenticated user"""
+        now = time.time()
+        claims = {
+            "sub": username,
+            "uid": user_id,
+            "iat": int(now),
+            "exp": int(now + self.ttl),
+            "jti": secrets.token_urlsafe(12)
+        }
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+        self._count("issued")
+        return f"{payload}.{self._sign(payload)}", claims["exp"]
+
+    def validate(self, token):
+        """Claims of a valid token, or None if it is malformed, forged, expired or revoked"""
+        try:
+            payload, signature = token.split(".")
+            # Compare bytes: compare_digest rejects non-ASCII str with a TypeError
+            if not hmac.compare_digest(signature.encode("utf-8"), self._sign(payload).encode("ascii")):
+                raise ValueError("bad signature")
+            claims = json.loads(_b64decode(payload))
+            if not isinstance(claims, dict):
+                raise ValueError("claims are not an object")
+        except (AttributeError, TypeError, ValueError, UnicodeError):
+            self._count("invalid")
+            return None
+
+        if claims.get("exp", 0) < time.time():
+            self._count("expired")
+            return None
+        if claims.get("jti") in self._revoked:
+            self._count("revoked")
+            return None
+        self._count("valid")
+        return claims
+
+    def revoke(self, token):
+        """Revoke a token; returns False if it was not valid to begin with"""
+        claims = self.validate(token)
+        if not claims:
+            return False
+        now = time.time()
+        with self._lock:
+            self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+            self._revoked[claims["jti"]] = claims["exp"]
+        return True
+
+    def _count(self, outcome):
+        with self._lock:
+            self._stats[outcome] += 1
+
+    def stats(self):
+        with self._lock:
+            return {"revoked_tokens": len(self._revoked), "ttl": self.ttl, **self._stats}
+
+
+def bearer_token():
+    """Token from the Authorization header.
+
+    Query-string tokens are not accepted - URLs end up in access logs,
+    browser history and Referer headers.
+    """
+    header = request.headers.get("Authorization", "")
+    if header.startswith("Bearer "):
+        return header[7:].strip()
+    return None
+
+
+def require_session(tokens):
+    """Route decorator: reject requests without a valid token, else set g.session to its claims"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            claims = tokens.validate(bearer_token())
+            if not claims:
+                return jsonify({"error": "Invalid or expired session"}), 401
+            g.session = claims
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
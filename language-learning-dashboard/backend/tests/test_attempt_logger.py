@@ -0,0 +1,129 @@
+import threading
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+from pymongo.errors import AutoReconnect, BulkWriteError  # noqa: E402
+
+from attempt_logger import AttemptLogger  # noqa: E402
+
+
+class FakeCollection:
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def bulk_write(self, requests, ordered=True):
+        with self._lock:
+            self.calls.append(list(requests))
+
+    def insert_many(self, documents, ordered=True):
+        with self._lock:
+            self.calls.append(list(documents))
+
+
+class FakeDB:
+    def __init__(self):
+        self.overall = FakeCollection()
+        self.writing = FakeCollection()
+
+
+def test_concurrent_attempts_are_all_written_and_counted():
+    db = FakeDB()
+    logger = AttemptLogger(db_getter=lambda: db, max_queue=50, flush_interval=0.01, batch_size=20)
+
+    def log(user):
+        for i in range(100):
+            logger.log_attempt(user, "word", 80, i % 2 == 0)
+
+    threads = [threading.Thread(target=log, args=(f"user{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    logger.close()
+
+    stats = logger.stats()
+    assert stats["enqueued"] + stats["sync_writes"] == 800
+    assert stats["written"] == 800
+    assert sum(len(batch) for batch in db.writing.calls) == 800
+    assert stats["queue_depth"] == 0
+
+
+def test_failed_batches_are_retried_then_dead_lettered():
+    def broken_db():
+        raise RuntimeError("mongo down")
+
+    logger = AttemptLogger(db_getter=broken_db, flush_interval=60, max_attempts=3)
+    logger.log_attempt("alice", "letter", 100, True)
+    for _ in range(4):
+        logger.flush()
+    logger.close()
+
+    stats = logger.stats()
+    assert stats["errors"] == 3
+    assert stats["retried"] == 2
+    assert stats["dead_lettered"] == 1
+    assert stats["written"] == 0
+    assert stats["retry_batches"] == 0
+
+
+class FlakyCollection(FakeCollection):
+    """Fails the first call; with `applied` the failed call still reaches the database"""
+
+    def __init__(self, applied=False):
+        super().__init__()
+        self.applied = applied
+        self.failed = False
+
+    def _fail_once(self, items):
+        if not self.failed:
+            self.failed = True
+            if self.applied:
+                self.calls.append(items)
+            raise AutoReconnect("connection reset")
+        if self.applied and items in self.calls:
+            raise BulkWriteError({"writeErrors": [{"index": i, "code": 11000} for i in range(len(items))]})
+        self.calls.append(items)
+
+    def bulk_write(self, requests, ordered=True):
+        self._fail_once(list(requests))
+
+    def insert_many(self, documents, ordered=True):
+        self._fail_once(list(documents))
+
+
+def test_insert_failure_is_retried_without_repeating_the_score_update():
+    db = FakeDB()
+    db.writing = FlakyCollection()
+    logger = AttemptLogger(db_getter=lambda: db, flush_interval=60)
+    logger.log_attempt("alice", "letter", 100, True)
+    logger.log_attempt("bob", "word", 40, False)
+
+    logger.flush()
+    assert logger.stats()["written"] == 0
+    logger.flush()
+    logger.close()
+
+    assert len(db.overall.calls) == 1
+    assert len(db.writing.calls) == 1
+    assert len(db.writing.calls[0]) == 2
+    stats = logger.stats()
+    assert stats["written"] == 2
+    assert stats["retried"] == 1
+    assert stats["dead_lettered"] == 0
+
+
+def test_insert_that_landed_before_failing_is_not_duplicated():
+    db = FakeDB()
+    db.writing = FlakyCollection(applied=True)
+    logger = AttemptLogger(db_getter=lambda: db, flush_interval=60)
+    logger.log_attempt("alice", "letter", 100, True)
+
+    logger.flush()
+    logger.flush()
+    logger.close()
+
+    assert len(db.writing.calls) == 1
+    assert logger.stats()["written"] == 1
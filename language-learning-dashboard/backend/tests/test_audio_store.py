@@ -0,0 +1,78 @@
+import threading
+import time
+
+from audio_store import AudioStore, StubSynthesizer, audio_key
+
+
+class SlowSynthesizer(StubSynthesizer):
+    def synthesize(self, text, lang, tld, slow, path):
+        time.sleep(0.2)
+        super().synthesize(text, lang, tld, slow, path)
+
+
+def test_clips_are_synthesized_once_and_reused(tmp_path):
+    synthesizer = StubSynthesizer()
+    store = AudioStore(directory=str(tmp_path), synthesizer=synthesizer)
+    path = store.get("hello")
+    assert path.endswith(f"{audio_key('hello')}.mp3")
+    assert store.get("hello") == path
+    assert synthesizer.calls == 1
+
+    reopened = AudioStore(directory=str(tmp_path), synthesizer=StubSynthesizer())
+    assert reopened.get("hello") == path
+    assert reopened.synthesizer.calls == 0
+
+
+def test_concurrent_requests_share_one_render(tmp_path):
+    synthesizer = SlowSynthesizer()
+    store = AudioStore(directory=str(tmp_path), synthesizer=synthesizer)
+    paths = []
+    threads = [threading.Thread(target=lambda: paths.append(store.get("shared"))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert synthesizer.calls == 1
+    assert len(set(paths)) == 1
+
+
+def test_oldest_clips_are_evicted_past_max_bytes(tmp_path):
+    store = AudioStore(directory=str(tmp_path), max_bytes=60, synthesizer=StubSynthesizer())
+    for word in ("one", "two", "three", "four"):
+        store.get(word)
+    stats = store.stats()
+    assert stats["bytes"] <= 60
+    assert not (tmp_path / f"{audio_key('one')}.mp3").exists()
+    assert (tmp_path / f"{audio_key('four')}.mp3").exists()
+
+
+def test_failed_synthesis_returns_none(tmp_path):
+    class Broken:
+        def synthesize(self, text, lang, tld, slow, path):
+            raise RuntimeError("tts down")
+
+    store = AudioStore(directory=str(tmp_path), synthesizer=Broken())
+    assert store.get("hello") is None
+    assert store.stats()["clips"] == 0
+
+
+def test_clip_written_by_another_process_is_adopted(tmp_path):
+    # app1 and app3 share one audio directory
+    first = AudioStore(directory=str(tmp_path), synthesizer=StubSynthesizer())
+    second = AudioStore(directory=str(tmp_path), synthesizer=StubSynthesizer())
+
+    path = first.get("shared")
+    assert second.get("shared") == path
+    assert first.synthesizer.calls + second.synthesizer.calls == 1
+    assert second.stats()["clips"] == 1
+    assert second.stats()["hits"] == 1
+
+
+def test_empty_synthesis_leaves_no_temp_file(tmp_path):
+    class Silent:
+        def synthesize(self, text, lang, tld, slow, path):
+            open(path, 'wb').close()
+
+    store = AudioStore(directory=str(tmp_path), synthesizer=Silent())
+    assert store.get("hello") is None
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,90 @@
+import threading
+
+import pytest
+
+from face_mesh_pool import FaceMeshBusyError, FaceMeshPool
+
+
+class StubMesh:
+    def __init__(self):
+        self.resets = 0
+
+    def reset(self):
+        self.resets += 1
+
+
+def test_interleaved_sessions_keep_their_own_graph():
+    meshes = []
+
+    def factory():
+        meshes.append(StubMesh())
+        return meshes[-1]
+
+    pool = FaceMeshPool(factory=factory, size=4, timeout=1)
+    for _ in range(20):
+        for session in ("a", "b", "c"):
+            with pool.checkout(session):
+                pass
+
+    stats = pool.stats()
+    assert stats["created"] == 3
+    assert stats["owner_switches"] == 0
+    assert stats["sticky_hits"] == 57
+    assert sum(mesh.resets for mesh in meshes) == 0
+
+
+def test_full_pool_hands_least_recent_graph_to_new_session():
+    meshes = []
+
+    def factory():
+        meshes.append(StubMesh())
+        return meshes[-1]
+
+    pool = FaceMeshPool(factory=factory, size=2, timeout=1)
+    with pool.checkout("a") as mesh_a:
+        pass
+    with pool.checkout("b"):
+        pass
+    with pool.checkout("c") as mesh_c:
+        pass
+
+    assert mesh_c is mesh_a
+    assert mesh_a.resets == 1
+    assert pool.stats()["owner_switches"] == 1
+
+
+def test_saturated_pool_raises_busy():
+    pool = FaceMeshPool(factory=StubMesh, size=1, timeout=0.1)
+    holding = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with pool.checkout("a"):
+            holding.set()
+            release.wait(2)
+
+    worker = threading.Thread(target=hold)
+    worker.start()
+    holding.wait(2)
+    try:
+        with pytest.raises(FaceMeshBusyError):
+            with pool.checkout("b"):
+                pass
+    finally:
+        release.set()
+        worker.join()
+
+    assert pool.stats()["timeouts"] == 1
+    with pool.checkout("b"):
+        pass
+
+
+def test_failed_factory_frees_the_slot():
+    def factory():
+        raise RuntimeError("no model")
+
+    pool = FaceMeshPool(factory=factory, size=1, timeout=0.1)
+    with pytest.raises(RuntimeError):
+        with pool.checkout("a"):
+            pass
+    assert pool.stats()["created"] == 0
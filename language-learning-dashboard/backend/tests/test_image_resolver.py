@@ -0,0 +1,108 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+pytest.importorskip("requests")
+
+from image_resolver import ImageResolver, StubBackend, UnsplashBackend  # noqa: E402
+
+
+class SlowBackend:
+    def __init__(self, delay, fail=()):
+        self.delay = delay
+        self.fail = fail
+
+    def lookup(self, query, timeout):
+        time.sleep(self.delay)
+        if query in self.fail:
+            raise ConnectionError("offline")
+        return f"https://images.example/{query}.jpg"
+
+
+def make_resolver(tmp_path, backend, **kwargs):
+    return ImageResolver(backend=backend, placeholder=lambda query: f"placeholder:{query}",
+                         db_path=str(tmp_path / "images.db"), **kwargs)
+
+
+def test_misses_are_fetched_in_parallel_and_then_cached(tmp_path):
+    resolver = make_resolver(tmp_path, SlowBackend(0.3), workers=8)
+    words = ["apple", "book", "cat", "dog", "egg"]
+
+    start = time.time()
+    images = resolver.resolve_many(words)
+    assert time.time() - start < 0.9
+    assert images["cat"] == "https://images.example/cat.jpg"
+
+    start = time.time()
+    assert resolver.resolve_many(words) == images
+    assert time.time() - start < 0.1
+    assert resolver.stats()["hits"] == 5
+
+
+def test_urls_survive_restart(tmp_path):
+    backend = StubBackend()
+    make_resolver(tmp_path, backend).resolve("apple")
+    fresh = StubBackend()
+    assert make_resolver(tmp_path, fresh).resolve("apple") == "https://images.example/apple.jpg"
+    assert fresh.calls == 0
+
+
+def test_failures_and_timeouts_use_placeholder_and_are_retried(tmp_path):
+    resolver = make_resolver(tmp_path, SlowBackend(0, fail={"bad"}))
+    assert resolver.resolve_many(["bad", "good"]) == {
+        "bad": "placeholder:bad", "good": "https://images.example/good.jpg"
+    }
+    assert resolver.stats()["stored_rows"] == 1
+
+    slow = make_resolver(tmp_path, SlowBackend(2), timeout=0.1)
+    start = time.time()
+    assert slow.resolve("sloth") == "placeholder:sloth"
+    assert time.time() - start < 1.5
+    assert slow.stats()["timed_out"] == 1
+
+
+def test_backend_comes_from_environment_at_creation(tmp_path, monkeypatch):
+    # app4 imports image_resolver before it loads .env
+    monkeypatch.setenv("IMAGE_BACKEND", "stub")
+    monkeypatch.setenv("IMAGE_CACHE_DB", str(tmp_path / "env.db"))
+    resolver = ImageResolver()
+    assert isinstance(resolver.backend, StubBackend)
+    assert resolver.stats()["backend"] == "StubBackend"
+
+
+@pytest.fixture
+def stub_server():
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)["query"][0]
+            if query == "missing":
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = json.dumps({"urls": {"small": f"https://cdn.example/{query}.jpg"}}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/photos/random"
+    server.shutdown()
+
+
+def test_unsplash_backend_against_stub_server(tmp_path, monkeypatch, stub_server):
+    monkeypatch.setenv("UNSPLASH_API_URL", stub_server)
+    resolver = make_resolver(tmp_path, UnsplashBackend(api_key="test"))
+    assert resolver.resolve_many(["apple", "missing"]) == {
+        "apple": "https://cdn.example/apple.jpg", "missing": "placeholder:missing"
+    }
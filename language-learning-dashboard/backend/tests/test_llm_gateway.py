@@ -0,0 +1,87 @@
+import threading
+
+import pytest
+
+from llm_gateway import FakeBackend, LLMError, LLMGateway
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+def test_responses_are_cached():
+    backend = FakeBackend()
+    gateway = LLMGateway(backend=backend)
+    assert gateway.chat(MESSAGES) == "hello"
+    assert gateway.chat(MESSAGES) == "hello"
+    assert backend.calls == 1
+    assert gateway.stats()["cache_hits"] == 1
+
+
+def test_identical_in_flight_requests_are_coalesced():
+    backend = FakeBackend(delay=0.2)
+    gateway = LLMGateway(backend=backend)
+    futures = [gateway.submit(MESSAGES) for _ in range(5)]
+    assert [future.result() for future in futures] == ["hello"] * 5
+    assert backend.calls == 1
+    assert gateway.stats()["coalesced"] == 4
+
+
+def test_uncached_requests_each_go_upstream():
+    backend = FakeBackend(delay=0.1)
+    gateway = LLMGateway(backend=backend)
+    futures = [gateway.submit(MESSAGES, cache=False) for _ in range(5)]
+    [future.result() for future in futures]
+    assert gateway.stats()["calls"] == 5
+    assert gateway.stats()["cached"] == 0
+
+
+def test_chat_json_parses_and_rejects_bad_json():
+    gateway = LLMGateway(backend=FakeBackend())
+    assert gateway.chat_json(MESSAGES) == {"echo": "hello"}
+
+    gateway = LLMGateway(backend=FakeBackend(responder=lambda *args: "not json"))
+    with pytest.raises(LLMError):
+        gateway.chat_json(MESSAGES)
+
+
+def test_timeouts_and_errors_raise_llm_error():
+    gateway = LLMGateway(backend=FakeBackend(delay=0.5))
+    with pytest.raises(LLMError):
+        gateway.chat(MESSAGES, timeout=0.05)
+    assert gateway.stats()["timeouts"] == 1
+
+    def fail(*args):
+        raise RuntimeError("upstream down")
+
+    gateway = LLMGateway(backend=FakeBackend(responder=fail))
+    with pytest.raises(LLMError):
+        gateway.chat(MESSAGES)
+    assert gateway.stats()["errors"] == 1
+
+
+def test_counters_are_exact_under_concurrency():
+    gateway = LLMGateway(backend=FakeBackend(), max_concurrency=16)
+
+    def ask(i):
+        for j in range(50):
+            gateway.chat([{"role": "user", "content": f"{i}-{j}"}], cache=False)
+
+    threads = [threading.Thread(target=ask, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert gateway.stats()["calls"] == 400
+
+
+def test_settings_come_from_environment_at_creation(monkeypatch):
+    # app4 used to import llm_gateway before it loaded .env
+    monkeypatch.setenv("LLM_BACKEND", "fake")
+    monkeypatch.setenv("LLM_MODEL", "test-model")
+    monkeypatch.setenv("LLM_TIMEOUT", "2.5")
+    seen = []
+    gateway = LLMGateway()
+    assert isinstance(gateway.backend, FakeBackend)
+    gateway.backend.responder = lambda model, messages, params: seen.append(model) or "ok"
+    assert gateway.chat(MESSAGES) == "ok"
+    assert seen == ["test-model"]
+    assert gateway.timeout == 2.5
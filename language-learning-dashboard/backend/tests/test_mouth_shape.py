@@ -0,0 +1,140 @@
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+from flask import Flask, request
+
+from face_mesh_pool import FaceMeshPool
+from mouth_shape import (MOUTH_LANDMARKS, MOUTH_REFERENCES, MouthLocator, generate_mouth_feedback, mouth_features,
+                         session_id_from)
+
+
+class StubFaceMesh:
+    """Puts every landmark on the bright region of the frame, like a face detector would"""
+
+    def process(self, rgb):
+        ys, xs = np.nonzero(rgb[:, :, 0])
+        if not len(xs):
+            return SimpleNamespace(multi_face_landmarks=None)
+        h, w = rgb.shape[:2]
+        corners = [(xs.min() / w, ys.min() / h), (xs.max() / w, ys.max() / h)]
+        landmarks = [SimpleNamespace(x=0.5, y=0.5, z=0.0) for _ in range(478)]
+        for i, index in enumerate(MOUTH_LANDMARKS):
+            x, y = corners[i % 2]
+            landmarks[index] = SimpleNamespace(x=x, y=y, z=0.0)
+        return SimpleNamespace(multi_face_landmarks=[SimpleNamespace(landmark=landmarks)])
+
+
+def frame_with_face(x0, y0, x1, y1):
+    img = np.zeros((480, 640, 3), np.uint8)
+    cv2.rectangle(img, (x0, y0), (x1, y1), (255, 255, 255), -1)
+    return img
+
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+
+def test_session_id_sources(app):
+    for kwargs, expected in [
+        ({"headers": {"X-Session-Id": "hdr"}}, "hdr"),
+        ({"query_string": {"session_id": "ws"}}, "ws"),
+        ({"query_string": {"sessionId": "frame"}, "method": "POST", "data": b"\xff\xd8",
+          "content_type": "application/octet-stream"}, "frame"),
+        ({"method": "POST", "json": {"sessionId": "json"}}, "json"),
+        ({"method": "POST", "data": {"sessionId": "form"}}, "form"),
+        ({}, "10.0.0.1"),
+    ]:
+        with app.test_request_context("/", environ_base={"REMOTE_ADDR": "10.0.0.1"}, **kwargs):
+            assert session_id_from(request) == expected
+
+
+def test_query_string_sessions_behind_one_address_are_kept_apart(app):
+    pool = FaceMeshPool(factory=StubFaceMesh, size=4, timeout=1)
+    locator = MouthLocator(pool)
+    frames = {"alice": frame_with_face(40, 60, 200, 260), "bob": frame_with_face(400, 100, 600, 400)}
+
+    for _ in range(3):
+        for name, frame in frames.items():
+            with app.test_request_context(f"/api/analyze-mouth-frame?sessionId={name}", method="POST",
+                                          data=b"frame", content_type="application/octet-stream",
+                                          environ_base={"REMOTE_ADDR": "192.168.0.10"}):
+                assert locator.find(frame, session_id_from(request), downscale=True) is not None
+
+    assert set(locator.face_boxes) == {"alice", "bob"}
+    assert locator.face_boxes["alice"] != locator.face_boxes["bob"]
+    # Alice's box stays around her face, not Bob's
+    x0, y0, x1, y1 = locator.face_boxes["alice"]
+    assert x0 <= 40 and x1 >= 200 and x1 < 400
+    stats = pool.stats()
+    assert stats["created"] == 2
+    assert stats["owner_switches"] == 0
+
+
+def test_lost_face_clears_the_box(app):
+    locator = MouthLocator(FaceMeshPool(factory=StubFaceMesh, size=1, timeout=1))
+    locator.find(frame_with_face(40, 60, 200, 260), "alice", downscale=True)
+    assert "alice" in locator.face_boxes
+    assert locator.find(np.zeros((480, 640, 3), np.uint8), "alice", downscale=True) is None
+    assert "alice" not in locator.face_boxes
+
+
+# Synthetic FaceMesh fixture in mouth_features() point order (outer lip ring,
+# inner lip ring, cheeks/forehead/chin), with proportions of an adult face.
+# The cheeks sit far behind the lips, as real FaceMesh output does.
+def synthetic_mouth(width=0.36, rounding=0.30, aperture=0.01, protrusion=0.08, face_width=200,
+                    center=(320, 300), frame=(480, 640)):
+    cx, cy = center
+    mouth_half = width * face_width / 2
+    lip_half_height = rounding * width * face_width / 2
+    depth = protrusion * face_width
+    angles = np.pi - np.arange(20) * np.pi / 10  # corner, lower lip, corner, upper lip
+    ring = np.stack([np.cos(angles), np.sin(angles)], axis=1)
+    # Corners at z=0, lip centres `depth` closer to the camera
+    z = -depth * np.abs(ring[:, 1])
+    outer = np.column_stack([cx + mouth_half * ring[:, 0], cy + lip_half_height * ring[:, 1], z])
+    inner_half_height = aperture * face_width / 2
+    inner = np.column_stack([cx + 0.8 * mouth_half * ring[:, 0], cy + inner_half_height * ring[:, 1], z * 0.8])
+    cheek_depth = 0.4 * face_width
+    face = np.array([
+        [cx - face_width / 2, cy - 40, cheek_depth],
+        [cx + face_width / 2, cy - 40, cheek_depth],
+        [cx, cy - 220, 0.1 * face_width],
+        [cx, cy + 80, 0.05 * face_width],
+    ])
+    h, w = frame
+    return np.vstack([outer, inner, face]) / (w, h, w), (h, w, 3)
+
+
+def test_features_of_a_relaxed_mouth():
+    points, shape = synthetic_mouth()
+    assert mouth_features(points, shape) == pytest.approx([0.01, 0.36, 0.30, 0.08], abs=0.005)
+
+
+def test_features_do_not_depend_on_face_size_or_position():
+    small, shape = synthetic_mouth(face_width=120, center=(150, 200))
+    large, _ = synthetic_mouth(face_width=260, center=(400, 260))
+    assert mouth_features(small, shape) == pytest.approx(mouth_features(large, shape), abs=1e-6)
+
+
+@pytest.mark.parametrize("sound", list(MOUTH_REFERENCES) + ["ZH"])
+def test_relaxed_mouth_scores_above_zero_for_every_sound(sound):
+    points, shape = synthetic_mouth()
+    feedback = generate_mouth_feedback(sound, mouth_features(points, shape))
+    assert feedback["score"] > 0
+    assert "Keep your lips back against your teeth" not in feedback["tips"]
+
+
+def test_shapes_are_recognised():
+    closed, shape = synthetic_mouth(aperture=0.0, rounding=0.25, protrusion=0.09)
+    feedback = generate_mouth_feedback("P", mouth_features(closed, shape))
+    assert feedback["score"] >= 90
+    assert feedback["tips"] == ["Good mouth position!"]
+
+    rounded, _ = synthetic_mouth(width=0.28, rounding=0.70, aperture=0.04, protrusion=0.14)
+    assert generate_mouth_feedback("TH", mouth_features(rounded, shape))["closest"] == "W"
+    spread = generate_mouth_feedback("W", mouth_features(closed, shape))
+    assert "Round your lips more" in spread["tips"]
+    assert spread["score"] < 50
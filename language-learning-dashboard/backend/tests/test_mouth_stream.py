@@ -0,0 +1,91 @@
+import threading
+import time
+
+from mouth_stream import MouthStream
+
+
+def score(target_sound, features):
+    return {"score": round(features[0] * 100), "tips": [target_sound], "reference": target_sound,
+            "metrics": {"aperture": features[0]}}
+
+
+def start(stream):
+    worker = threading.Thread(target=stream.run)
+    worker.start()
+    return worker
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out waiting"
+        time.sleep(0.01)
+
+
+def test_scores_are_smoothed_over_the_window():
+    sent = []
+    stream = MouthStream(lambda frame: [frame], score, sent.append, window=2, push_hz=50)
+    worker = start(stream)
+
+    for value in (0.2, 0.4, 0.6):
+        stream.submit_frame(value)
+        wait_for(lambda: stream.stats["analyzed"] == round(value * 5))
+    wait_for(lambda: sent and sent[-1]["score"] == 50)
+    stream.set_target("W")
+    wait_for(lambda: sent[-1]["targetSound"] == "W")
+
+    stream.close()
+    worker.join(2)
+    assert not worker.is_alive()
+
+
+def test_only_the_newest_frame_is_kept():
+    release = threading.Event()
+
+    def slow_analyze(frame):
+        release.wait(2)
+        return [frame]
+
+    stream = MouthStream(slow_analyze, score, lambda message: None, push_hz=50)
+    worker = start(stream)
+    stream.submit_frame(0.1)
+    wait_for(lambda: stream._frame is None)
+    for value in (0.2, 0.3, 0.4):
+        stream.submit_frame(value)
+    release.set()
+    wait_for(lambda: stream.stats["analyzed"] == 2)
+
+    assert stream.stats["received"] == 4
+    assert stream.stats["dropped"] == 2
+    stream.close()
+    worker.join(2)
+
+
+def test_no_face_and_errors_are_reported():
+    sent = []
+
+    def analyze(frame):
+        if frame == "boom":
+            raise RuntimeError("pool busy")
+        return None
+
+    stream = MouthStream(analyze, score, sent.append, push_hz=50)
+    worker = start(stream)
+    stream.submit_frame("boom")
+    wait_for(lambda: stream.stats["skipped"] == 1)
+    stream.submit_frame("empty")
+    wait_for(lambda: sent and sent[-1].get("error") == "No face detected")
+    stream.close()
+    worker.join(2)
+
+
+def test_failed_send_ends_the_stream():
+    def send(message):
+        raise ConnectionError("socket closed")
+
+    stream = MouthStream(lambda frame: [0.5], score, send, push_hz=50)
+    worker = start(stream)
+    stream.submit_frame(0.5)
+    worker.join(2)
+    assert not worker.is_alive()
+    assert stream.stats["pushed"] == 0
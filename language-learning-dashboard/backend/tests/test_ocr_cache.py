@@ -0,0 +1,44 @@
+import cv2
+import numpy as np
+
+from ocr_cache import OCRResultCache, image_key
+
+
+def draw(text, origin=(280, 300), canvas=(600, 600), scale=1.0):
+    image = np.full((canvas[1], canvas[0], 3), 255, np.uint8)
+    cv2.putText(image, text, origin, cv2.FONT_HERSHEY_SIMPLEX, scale, (0, 0, 0), 2)
+    return image
+
+
+def test_distinct_letters_on_same_canvas_get_distinct_keys():
+    keys = {image_key(draw(letter), "char") for letter in "ABCDEOQPRlI1"}
+    assert len(keys) == 12
+
+
+def test_same_drawing_elsewhere_on_canvas_shares_key():
+    assert image_key(draw("A"), "char") == image_key(draw("A", origin=(40, 80)), "char")
+
+
+def test_png_round_trip_shares_key():
+    # The drawing canvas submits PNG data URLs
+    image = draw("hello", origin=(100, 300), scale=2.0)
+    _, encoded = cv2.imencode(".png", image)
+    assert image_key(image, "text") == image_key(cv2.imdecode(encoded, cv2.IMREAD_COLOR), "text")
+
+
+def test_mode_is_part_of_key():
+    image = draw("A")
+    assert image_key(image, "char") != image_key(image, "convert")
+
+
+def test_blank_canvas_has_a_key():
+    blank = np.full((300, 400, 3), 255, np.uint8)
+    assert image_key(blank, "text") == image_key(blank.copy(), "text")
+
+
+def test_cache_round_trip_and_disk_tier(tmp_path):
+    cache = OCRResultCache(max_size=2, ttl=60, cache_dir=str(tmp_path))
+    cache.set("a", "A")
+    assert cache.get("a") == "A"
+    assert OCRResultCache(ttl=60, cache_dir=str(tmp_path)).get("a") == "A"
+    assert cache.get("missing") is None
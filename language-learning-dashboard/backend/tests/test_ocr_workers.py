@@ -0,0 +1,56 @@
+import queue
+import sys
+import threading
+import time
+import types
+
+import ocr_workers
+from ocr_workers import _without_main_script, _worker_main
+
+
+def fake_modules(monkeypatch, thread_counts):
+    class Reader:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def readtext(self, image, **kwargs):
+            return [([[0, 0], [1, 0], [1, 1], [0, 1]], image, 0.9)]
+
+    easyocr = types.SimpleNamespace(Reader=Reader)
+    torch = types.SimpleNamespace(
+        cuda=types.SimpleNamespace(is_available=lambda: False),
+        set_num_threads=thread_counts.append
+    )
+    monkeypatch.setitem(sys.modules, "easyocr", easyocr)
+    monkeypatch.setitem(sys.modules, "torch", torch)
+
+
+def test_worker_skips_jobs_past_their_deadline(monkeypatch):
+    thread_counts = []
+    fake_modules(monkeypatch, thread_counts)
+    jobs, results = queue.Queue(), queue.Queue()
+    worker = threading.Thread(target=_worker_main, args=(0, jobs, results, {}, 3))
+    worker.start()
+
+    jobs.put((1, time.time() - 1, "readtext", ("late",), {}))
+    jobs.put((2, time.time() + 30, "readtext", ("fresh",), {}))
+    jobs.put(None)
+    worker.join(5)
+
+    messages = []
+    while not results.empty():
+        messages.append(results.get())
+    assert thread_counts == [3]
+    assert ("skipped", 1, 0, None) in messages
+    assert ("done", 2, 0, [([[0, 0], [1, 0], [1, 1], [0, 1]], "fresh", 0.9)]) in messages
+    assert not any(kind == "started" and job_id == 1 for kind, job_id, _, _ in messages)
+
+
+def test_main_script_is_hidden_only_while_starting():
+    main = sys.modules["__main__"]
+    before = (main.__dict__.get("__file__"), main.__spec__)
+    with _without_main_script():
+        assert getattr(main, "__file__", None) is None
+        assert main.__spec__ is None
+    assert (main.__dict__.get("__file__"), main.__spec__) == before
+    assert not ocr_workers._spawn_lock.locked()
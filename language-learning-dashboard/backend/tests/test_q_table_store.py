@@ -0,0 +1,103 @@
+import json
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from q_table_store import QTableStore, parse_state, replay, state_key  # noqa: E402
+
+ALPHA, GAMMA = 0.1, 0.6
+TYPES = ["speaking_word", "speaking_sentence", "listening", "writing"]
+
+
+def random_events(count, seed=7):
+    rng = random.Random(seed)
+    users = ["u1", "u-2", "learner-3-x", "42"]
+    return [(rng.choice(users), rng.randint(1, 5), rng.choice(TYPES), rng.choice([-1.0, 0.5, 1.0]))
+            for _ in range(count)]
+
+
+def reference_table(events):
+    # The original dict-of-lists update, one event at a time
+    table = {}
+    for user_id, difficulty, exercise_type, reward in events:
+        values = table.setdefault(state_key(user_id, difficulty, exercise_type), [0.0] * 5)
+        old_value = values[difficulty - 1]
+        values[difficulty - 1] = (1 - ALPHA) * old_value + ALPHA * (reward + GAMMA * max(values))
+    return table
+
+
+def table_of(store):
+    table = {}
+    for user_id, u in store._user_ids.items():
+        for d in range(store.difficulties):
+            for t, name in enumerate(store._type_names):
+                if store.present[u, d, t]:
+                    table[state_key(user_id, d + 1, name)] = store.q[u, d, t].tolist()
+    return table
+
+
+def assert_tables_match(actual, expected):
+    assert actual.keys() == expected.keys()
+    for state in expected:
+        assert actual[state] == pytest.approx(expected[state])
+
+
+def test_parse_state_handles_dashes_in_user_ids():
+    assert parse_state("learner-3-x-2-listening") == ("learner-3-x", 2, "listening")
+    assert parse_state("nonsense") is None
+
+
+def test_update_batch_matches_sequential_updates(tmp_path):
+    events = random_events(500)
+
+    batched = QTableStore(str(tmp_path / "batched.db"), legacy_json=None)
+    batched.update_batch(events, ALPHA, GAMMA)
+
+    sequential = QTableStore(str(tmp_path / "sequential.db"), legacy_json=None)
+    for event in events:
+        sequential.update(*event, ALPHA, GAMMA)
+
+    expected = reference_table(events)
+    assert_tables_match(table_of(batched), expected)
+    assert_tables_match(table_of(sequential), expected)
+
+
+def test_table_reloads_from_database(tmp_path):
+    db_path = str(tmp_path / "qtable.db")
+    events = random_events(200)
+    QTableStore(db_path, legacy_json=None).update_batch(events, ALPHA, GAMMA)
+
+    reloaded = QTableStore(db_path, legacy_json=None)
+    assert_tables_match(table_of(reloaded), reference_table(events))
+    assert len(reloaded.attempts()) == 200
+
+
+def test_legacy_json_is_imported_once(tmp_path):
+    legacy = tmp_path / "qtable.json"
+    legacy.write_text(json.dumps({"u1-2-writing": [0, 0.4, 0, 0, 0], "u1-2-listening": [0, 0.1, 0.9, 0, 0]}))
+    db_path = str(tmp_path / "qtable.db")
+
+    store = QTableStore(db_path, legacy_json=str(legacy))
+    assert store.best_action("u1", 2) == "listening"
+    assert store.best_action("u1", 3) is None
+    assert store.best_action("nobody", 2) is None
+
+    legacy.write_text("{}")
+    assert QTableStore(db_path, legacy_json=str(legacy)).stats()["states"] == 2
+
+
+def test_replay_rebuilds_the_same_table(tmp_path):
+    source = str(tmp_path / "source.db")
+    events = random_events(300)
+    store = QTableStore(source, legacy_json=None)
+    for i in range(0, len(events), 50):
+        store.update_batch(events[i:i + 50], ALPHA, GAMMA)
+
+    target, count, _ = replay(source, str(tmp_path / "target.db"), ALPHA, GAMMA, batch_size=128)
+    assert count == 300
+    assert_tables_match(table_of(target), table_of(store))
+
+    with pytest.raises(ValueError):
+        replay(source, str(tmp_path / "target.db"), ALPHA, GAMMA)
@@ -0,0 +1,81 @@
+import itertools
+import time
+
+from llm_gateway import FakeBackend, LLMGateway
+from question_pool import QuestionPool
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out waiting"
+        time.sleep(0.01)
+
+
+def make_pool(target=8, workers=4):
+    # Same prompt for every refill, like app3.build_question
+    counter = itertools.count()
+    backend = FakeBackend(responder=lambda model, messages, params: f'{{"question": "Q{next(counter)}"}}',
+                          delay=0.05)
+    gateway = LLMGateway(backend=backend)
+
+    def producer(ex_type, difficulty, native_language):
+        question = gateway.chat_json([{"role": "user", "content": "same prompt"}], cache=False)
+        question["question_id"] = question["question"]
+        return question
+
+    return QuestionPool(producer, target=target, low_water=3, workers=workers), backend
+
+
+def test_parallel_refills_produce_distinct_questions():
+    pool, backend = make_pool(target=8)
+    key = ("listening", 1, "tamil")
+    pool.warm([key], depth=8)
+    wait_for(lambda: pool.stats()["produced"] == 8)
+
+    assert backend.calls == 8
+    taken = [pool.take(key)["question_id"] for _ in range(8)]
+    assert len(set(taken)) == 8
+
+
+def test_take_skips_excluded_questions():
+    pool, _ = make_pool(target=4)
+    key = ("writing", 2, "tamil")
+    pool.warm([key], depth=4)
+    wait_for(lambda: pool.stats()["produced"] == 4)
+
+    first = pool.take(key)["question_id"]
+    second = pool.take(key, exclude={first})
+    assert second["question_id"] != first
+
+
+def test_duplicate_questions_are_not_stocked():
+    pool = QuestionPool(lambda *key: {"question_id": "same"}, target=4, low_water=3, workers=2)
+    key = ("speaking_word", 1, "tamil")
+    pool.warm([key], depth=4)
+    wait_for(lambda: pool.stats()["pending"] == 0)
+
+    stats = pool.stats()
+    assert stats["stock"]["speaking_word_1_tamil"] == 1
+    assert stats["duplicates"] == 3
+
+
+def test_warm_stocks_only_to_low_water():
+    pool, backend = make_pool(target=8)
+    keys = [("listening", 1, "tamil"), ("writing", 1, "tamil")]
+    pool.warm(keys)
+    wait_for(lambda: pool.stats()["pending"] == 0)
+    assert backend.calls == 6
+
+    # First use tops the pool up to target
+    pool.take(keys[0])
+    wait_for(lambda: pool.stats()["pending"] == 0)
+    assert pool.stats()["stock"]["listening_1_tamil"] == 8
+
+
+def test_empty_pool_returns_none_and_refills():
+    pool, _ = make_pool(target=4)
+    key = ("listening", 3, "hindi")
+    assert pool.take(key) is None
+    wait_for(lambda: pool.stats()["produced"] == 4)
+    assert pool.take(key) is not None
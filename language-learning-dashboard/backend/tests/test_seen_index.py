@@ -0,0 +1,35 @@
+from seen_index import BloomFilter, SeenIndex
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"q{i}")
+    assert all(f"q{i}" in bloom for i in range(1000))
+    false_positives = sum(f"other{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+    assert len(bloom) == 1000
+
+
+def test_users_switch_to_bloom_past_exact_limit():
+    index = SeenIndex(exact_limit=10, max_users=100)
+    index.add_many("alice", [f"q{i}" for i in range(5)])
+    assert isinstance(index.for_user("alice"), set)
+
+    index.add_many("alice", [f"q{i}" for i in range(5, 20)])
+    seen = index.for_user("alice")
+    assert isinstance(seen, BloomFilter)
+    assert all(f"q{i}" in seen for i in range(20))
+    assert "q0" not in index.for_user("bob")
+    assert index.stats()["bloom_users"] == 1
+
+
+def test_least_recent_users_are_dropped():
+    index = SeenIndex(exact_limit=10, max_users=2)
+    index.add("alice", "q1")
+    index.add("bob", "q1")
+    index.for_user("alice")
+    index.add("carol", "q1")
+    assert index.stats()["users"] == 2
+    assert "q1" in index.for_user("alice")
+    assert "q1" not in index.for_user("bob")
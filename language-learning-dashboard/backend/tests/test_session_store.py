@@ -0,0 +1,34 @@
+import time
+
+import session_store
+from session_store import SessionStore
+
+
+def test_records_are_created_once_per_session():
+    store = SessionStore(lambda session_id: {"id": session_id})
+    record = store.get("a")
+    assert store.get("a") is record
+    assert store.peek("b") is None
+    assert len(store) == 1
+
+
+def test_least_recently_used_idle_session_is_evicted_when_full():
+    evicted = []
+    store = SessionStore(lambda session_id: {"id": session_id, "busy": session_id == "a"}, max_sessions=2,
+                         is_busy=lambda record: record["busy"], on_evict=evicted.append)
+    store.get("a")
+    store.get("b")
+    store.get("c")
+    assert [record["id"] for record in evicted] == ["b"]
+    assert store.peek("a") is not None
+    assert store.stats()["evicted"] == 1
+
+
+def test_idle_sessions_are_swept(monkeypatch):
+    monkeypatch.setattr(session_store, "SWEEP_INTERVAL", 0)
+    store = SessionStore(lambda session_id: {}, idle_timeout=0.05)
+    store.get("old")
+    time.sleep(0.1)
+    store.get("new")
+    assert store.peek("old") is None
+    assert store.peek("new") is not None
@@ -0,0 +1,86 @@
+from flask import Flask, g, jsonify
+
+from session_tokens import SessionTokens, require_session
+
+
+def test_secret_is_read_when_created(monkeypatch):
+    # app2 imports session_tokens before load_dotenv() runs
+    monkeypatch.setenv("SESSION_SECRET", "shared-secret")
+    token, _ = SessionTokens().issue("alice")
+    assert SessionTokens(secret="shared-secret").validate(token)["sub"] == "alice"
+
+
+def test_ttl_is_read_when_created(monkeypatch):
+    monkeypatch.setenv("SESSION_TOKEN_TTL", "60")
+    assert SessionTokens(secret="s").ttl == 60
+
+
+def test_issued_token_validates():
+    tokens = SessionTokens(secret="s", ttl=60)
+    token, expires_at = tokens.issue("alice", user_id=7)
+    claims = tokens.validate(token)
+    assert claims["sub"] == "alice"
+    assert claims["uid"] == 7
+    assert claims["exp"] == expires_at
+
+
+def test_forged_and_malformed_tokens_are_invalid():
+    tokens = SessionTokens(secret="s", ttl=60)
+    token, _ = tokens.issue("alice")
+    payload, _ = token.split(".")
+    other, _ = SessionTokens(secret="other", ttl=60).issue("alice")
+
+    for bad in [None, "", "abc", "a.b.c", f"{payload}.forged", other,
+                f"{payload}.sígnatüre", "pâyload.signature", token + "x"]:
+        assert tokens.validate(bad) is None
+    assert tokens.stats()["invalid"] == 9
+
+
+def test_non_object_claims_are_invalid():
+    tokens = SessionTokens(secret="s", ttl=60)
+    payload = "NQ"  # base64url of "5"
+    assert tokens.validate(f"{payload}.{tokens._sign(payload)}") is None
+
+
+def test_expired_token_is_rejected():
+    tokens = SessionTokens(secret="s", ttl=-1)
+    token, _ = tokens.issue("alice")
+    assert tokens.validate(token) is None
+    assert tokens.stats()["expired"] == 1
+
+
+def test_revoked_token_is_rejected():
+    tokens = SessionTokens(secret="s", ttl=60)
+    token, _ = tokens.issue("alice")
+    assert tokens.revoke(token)
+    assert tokens.validate(token) is None
+    assert not tokens.revoke(token)
+    assert tokens.stats()["revoked_tokens"] == 1
+
+
+def test_require_session_returns_401_for_non_ascii_signature():
+    app = Flask(__name__)
+    tokens = SessionTokens(secret="s", ttl=60)
+
+    @app.route("/private")
+    @require_session(tokens)
+    def private():
+        return jsonify(g.session)
+
+    token, _ = tokens.issue("alice")
+    client = app.test_client()
+    assert client.get("/private", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+    assert client.get("/private", headers={"Authorization": "Bearer abc.\u00e9"}).status_code == 401
+
+
+def test_query_string_token_is_ignored():
+    app = Flask(__name__)
+    tokens = SessionTokens(secret="s", ttl=60)
+
+    @app.route("/private")
+    @require_session(tokens)
+    def private():
+        return jsonify(g.session)
+
+    token, _ = tokens.issue("alice")
+    assert app.test_client().get(f"/private?token={token}").status_code == 401
@@ -0,0 +1,81 @@
+import time
+
+import pytest
+
+from translation_cache import GoogleBackend, StubBackend, TranslationCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return TranslationCache(backend=StubBackend(), db_path=str(tmp_path / "translations.db"))
+
+
+def test_misses_go_to_backend_once_then_hit(cache):
+    assert cache.translate_many(["hello", "world", "hello"], "ta") == ["[ta] hello", "[ta] world", "[ta] hello"]
+    assert cache.backend.calls == 1
+
+    assert cache.translate("world", "ta") == "[ta] world"
+    assert cache.backend.calls == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_translations_survive_restart(tmp_path):
+    db_path = str(tmp_path / "translations.db")
+    TranslationCache(backend=StubBackend(), db_path=db_path).translate("hello", "hi")
+
+    backend = StubBackend()
+    assert TranslationCache(backend=backend, db_path=db_path).translate("hello", "hi") == "[hi] hello"
+    assert backend.calls == 0
+
+
+def test_blank_and_failed_texts_fall_back_to_original(cache):
+    class FailingBackend:
+        def translate_many(self, texts, source, target):
+            return [None if text == "bad" else text.upper() for text in texts]
+
+    cache.backend = FailingBackend()
+    assert cache.translate_many(["", "bad", "good"], "ta") == ["", "bad", "GOOD"]
+    # Failures are not cached
+    assert cache.stats()["stored_rows"] == 1
+
+
+def test_lookup_only_reads_the_cache(cache):
+    assert cache.lookup("hello", "ta") is None
+    assert cache.backend.calls == 0
+
+    cache.translate("hello", "ta")
+    assert cache.lookup("hello", "ta") == "[ta] hello"
+    assert cache.lookup("", "ta") == ""
+    assert cache.backend.calls == 1
+
+
+class SlowTranslator:
+    def __init__(self, source, target):
+        self.target = target
+
+    def translate(self, text):
+        time.sleep(2 if text == "hang" else 0.2)
+        if text == "bad":
+            raise RuntimeError("request failed")
+        return f"{self.target}:{text}"
+
+
+def test_google_backend_sends_batch_concurrently(monkeypatch):
+    deep_translator = pytest.importorskip("deep_translator")
+    monkeypatch.setattr(deep_translator, "GoogleTranslator", SlowTranslator)
+    backend = GoogleBackend(workers=8)
+
+    start = time.time()
+    translated = backend.translate_many(["a", "b", "bad", "c", "d"], "en", "ta")
+    assert time.time() - start < 0.6
+    assert translated == ["ta:a", "ta:b", None, "ta:c", "ta:d"]
+
+
+def test_google_backend_gives_up_on_slow_strings(monkeypatch):
+    deep_translator = pytest.importorskip("deep_translator")
+    monkeypatch.setattr(deep_translator, "GoogleTranslator", SlowTranslator)
+    backend = GoogleBackend(workers=4, timeout=0.5)
+
+    start = time.time()
+    assert backend.translate_many(["a", "hang", "b"], "en", "ta") == ["ta:a", None, "ta:b"]
+    assert time.time() - start < 1
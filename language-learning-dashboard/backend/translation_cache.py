@@ -0,0 +1,208 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# SQLite cache location and limits
+TRANSLATION_DB = os.getenv("TRANSLATION_DB", "translations.db")
+TRANSLATION_TTL = float(os.getenv("TRANSLATION_TTL", 30 * 24 * 3600))
+TRANSLATION_MAX_ROWS = int(os.getenv("TRANSLATION_MAX_ROWS", 100000))
+TRANSLATION_MEMORY_SIZE = int(os.getenv("TRANSLATION_MEMORY_SIZE", 10000))
+# Translator backend (google or stub), its request fan-out and time limit
+TRANSLATOR_BACKEND = os.getenv("TRANSLATOR_BACKEND", "google")
+TRANSLATOR_WORKERS = int(os.getenv("TRANSLATOR_WORKERS", 8))
+TRANSLATOR_TIMEOUT = float(os.getenv("TRANSLATOR_TIMEOUT", 5))
+
+
+class GoogleBackend:
+    """Translates through deep_translator's GoogleTranslator.
+
+    The Google endpoint takes one string per request, so a batch is sent as
+    concurrent requests and costs about one round trip rather than one per
+    string. A string that fails or takes longer than `timeout` seconds comes
+    back as None; the rest still succeed.
+    """
+
+    def __init__(self, workers=TRANSLATOR_WORKERS, timeout=TRANSLATOR_TIMEOUT):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="translate")
+
+    def translate_many(self, texts, source, target):
+        futures = [self._executor.submit(self._translate_one, text, source, target) for text in texts]
+        # deep_translator sets no socket timeout, so bound the wait here
+        done, not_done = wait(futures, timeout=self.timeout)
+        if not_done:
+            print(f"Translation timed out for {len(not_done)} of {len(futures)} strings")
+        return [future.result() if future in done else None for future in futures]
+
+    @staticmethod
+    def _translate_one(text, source, target):
+        from deep_translator import GoogleTranslator
+        try:
+            # One translator per string - translate() keeps the text in instance state
+            return GoogleTranslator(source=source, target=target).translate(text)
+        except Exception as e:
+            print(f"Translation error: {e}")
+            return None
+
+
+class StubBackend:
+    """Offline translator for tests - tags the text with the target language"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def translate_many(self, texts, source, target):
+        self.calls += 1
+        return [f"[{target}] {text}" for text in texts]
+
+
+BACKENDS = {
+    "google": GoogleBackend,
+    "stub": StubBackend
+}
+
+
+class TranslationCache:
+    """Memoizes translations keyed by (source, target, text).
+
+    Lookups hit an in-memory LRU first and then a SQLite file that survives
+    restarts. Misses are handed to the backend together in one
+    translate_many() call, which the Google backend runs concurrently.
+    """
+
+    def __init__(self, backend=None, db_path=TRANSLATION_DB, ttl=TRANSLATION_TTL,
+                 max_rows=TRANSLATION_MAX_ROWS, memory_size=TRANSLATION_MEMORY_SIZE):
+        self.backend = backend or BACKENDS[TRANSLATOR_BACKEND]()
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS translations (
+                source TEXT NOT NULL,
+                target TEXT NOT NULL,
+                text TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (source, target, text)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_translations_created ON translations (created_at)")
+        self._conn.commit()
+
+    def translate(self, text, target, source="en"):
+        return self.translate_many([text], target, source)[0]
+
+    def lookup(self, text, target, source="en"):
+        """Cached translation of text, or None - never calls the backend"""
+        if not text or not text.strip():
+            return text
+        with self._lock:
+            return self._cached((source, target, text), time.time())
+
+    def translate_many(self, texts, target, source="en"):
+        """Translate a list of strings, handing all misses to the backend at once.
+
+        Falls back to the original text for anything the backend fails on.
+        """
+        results = {}
+        missing = []
+        now = time.time()
+
+        with self._lock:
+            for text in dict.fromkeys(texts):
+                if not text or not text.strip():
+                    results[text] = text
+                    continue
+                translation = self._cached((source, target, text), now)
+                if translation is not None:
+                    results[text] = translation
+                else:
+                    missing.append(text)
+                    self.misses += 1
+
+        if missing:
+            try:
+                translated = self.backend.translate_many(missing, source, target)
+            except Exception as e:
+                print(f"Translation error: {e}")
+                translated = [None] * len(missing)
+
+            fresh = []
+            for text, translation in zip(missing, translated):
+                if translation:
+                    results[text] = translation
+                    fresh.append((source, target, text, translation, now))
+                else:
+                    results[text] = text  # Return original if translation fails
+            if fresh:
+                self._store(fresh)
+
+        return [results[text] for text in texts]
+
+    def _cached(self, key, now):
+        """Memory then SQLite lookup; caller holds the lock"""
+        entry = self._memory.get(key)
+        if entry and entry[1] > now:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        row = self._conn.execute(
+            "SELECT translation, created_at FROM translations WHERE source=? AND target=? AND text=?",
+            key
+        ).fetchone()
+        if row and row[1] + self.ttl > now:
+            self._remember(key, row[0], row[1] + self.ttl)
+            self.hits += 1
+            return row[0]
+        return None
+
+    def _remember(self, key, translation, expires_at):
+        self._memory[key] = (translation, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _store(self, rows):
+        with self._lock:
+            for source, target, text, translation, created_at in rows:
+                self._remember((source, target, text), translation, created_at + self.ttl)
+            self._conn.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)", rows)
+            self._writes += len(rows)
+            # Prune expired and excess rows now and then, not on every write
+            if self._writes >= 500:
+                self._writes = 0
+                self._prune()
+            self._conn.commit()
+
+    def _prune(self):
+        self._conn.execute("DELETE FROM translations WHERE created_at < ?", (time.time() - self.ttl,))
+        self._conn.execute("""
+            DELETE FROM translations WHERE rowid IN (
+                SELECT rowid FROM translations ORDER BY created_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_rows,))
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "stored_rows": rows,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0,
+                "backend": type(self.backend).__name__
+            }
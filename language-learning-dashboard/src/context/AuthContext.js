@@ -3,31 +3,63 @@ import React, { createContext, useState, useEffect } from "react";
 
 export const AuthContext = createContext();
 
+const AUTH_API = "http://10.16.49.225:5002/api";
+
 export const AuthProvider = ({ children }) => {
   const [currentUser, setCurrentUser] = useState(null);
+  const [token, setToken] = useState(null);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
     // Check if user is stored in localStorage on initial load
     const user = localStorage.getItem("user");
+    const session = JSON.parse(localStorage.getItem("session") || "null");
     if (user) {
       setCurrentUser(JSON.parse(user));
     }
+    // Drop tokens that have already expired; the server re-checks the rest
+    if (session && session.expiresAt * 1000 > Date.now()) {
+      setToken(session.token);
+    } else {
+      localStorage.removeItem("session");
+    }
     setLoading(false);
   }, []);
 
-  const login = (userData) => {
+  // newToken/expiresAt come from /api/login; profile updates keep the current session
+  const login = (userData, newToken, expiresAt) => {
     setCurrentUser(userData);
     localStorage.setItem("user", JSON.stringify(userData));
+    if (newToken) {
+      setToken(newToken);
+      localStorage.setItem(
+        "session",
+        JSON.stringify({ token: newToken, expiresAt })
+      );
+    }
   };
 
   const logout = () => {
+    if (token) {
+      // Revoke the token server-side; logging out locally does not wait for it
+      fetch(`${AUTH_API}/logout`, {
+        method: "POST",
+        headers: { Authorization: `Bearer ${token}` },
+      }).catch(() => {});
+    }
     setCurrentUser(null);
+    setToken(null);
     localStorage.removeItem("user");
+    localStorage.removeItem("session");
   };
 
+  // Headers for calls to backends that validate the session token
+  const authHeaders = () => (token ? { Authorization: `Bearer ${token}` } : {});
+
   return (
-    <AuthContext.Provider value={{ currentUser, login, logout, loading }}>
+    <AuthContext.Provider
+      value={{ currentUser, token, login, logout, authHeaders, loading }}
+    >
       {children}
     </AuthContext.Provider>
   );
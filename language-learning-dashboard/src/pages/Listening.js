@@ -4,6 +4,21 @@ import "../styles/Listening.css";
 
 const API_BASE_URL = "http://10.16.49.225:5001";
 
+// Identifies this browser tab's listening session on the server
+const getSessionId = () => {
+  let sessionId = sessionStorage.getItem("listeningSessionId");
+  if (!sessionId) {
+    sessionId = `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+    sessionStorage.setItem("listeningSessionId", sessionId);
+  }
+  return sessionId;
+};
+
+const api = axios.create({
+  baseURL: API_BASE_URL,
+  params: { session_id: getSessionId() },
+});
+
 const Listening = () => {
   const [stories, setStories] = useState({});
   const [selectedStory, setSelectedStory] = useState(null);
@@ -42,11 +57,14 @@ const Listening = () => {
   const audioRef = useRef(null);
   const mediaRecorderRef = useRef(null);
   const audioChunksRef = useRef([]);
+  const progressSourceRef = useRef(null);
+  const lastSentenceRef = useRef("");
+  const narratingRef = useRef(false);
 
   useEffect(() => {
     // Fetch available stories
-    axios
-      .get(`${API_BASE_URL}/api/get_stories`)
+    api
+      .get(`/api/get_stories`)
       .then((response) => {
         console.log("Stories response:", response.data);
         if (response.data && response.data.stories) {
@@ -64,8 +82,8 @@ const Listening = () => {
       });
 
     // Fetch available languages
-    axios
-      .get(`${API_BASE_URL}/api/get_languages`)
+    api
+      .get(`/api/get_languages`)
       .then((response) => {
         setAvailableLanguages(response.data.languages);
       })
@@ -74,8 +92,8 @@ const Listening = () => {
       });
   }, []);
   const selectStory = (type) => {
-    axios
-      .post(`${API_BASE_URL}/api/select_story`, { type })
+    api
+      .post(`/api/select_story`, { type })
       .then((response) => {
         setSelectedStory(response.data.story_title);
         setFullText(response.data.full_text);
@@ -90,48 +108,116 @@ const Listening = () => {
         setCurrentSentence("");
         setCurrentTranslation("");
         startProgressTracking();
+        stopNarrationAudio();
+        narratingRef.current = true;
+        playNextChunk();
       })
       .catch((error) => {
         console.error("Error selecting story:", error);
       });
   };
 
+  // Progress is pushed by the server whenever narration advances
   const startProgressTracking = () => {
-    const interval = setInterval(() => {
-      axios
-        .get(`${API_BASE_URL}/api/get_story_status`)
-        .then((response) => {
-          setCompletion(response.data.completion_percentage);
-
-          // Update current sentence and translation
-          if (
-            response.data.current_sentence &&
-            response.data.current_sentence !== currentSentence
-          ) {
-            if (currentSentence) {
-              setSentenceHistory((prev) =>
-                [currentSentence, ...prev].slice(0, 5)
-              ); // Keep last 5 sentences
-            }
-            setCurrentSentence(response.data.current_sentence);
-            setCurrentTranslation(response.data.translation);
-          }
+    if (progressSourceRef.current) {
+      progressSourceRef.current.close();
+    }
+    lastSentenceRef.current = "";
+
+    const source = new EventSource(
+      `${API_BASE_URL}/api/story_events?session_id=${encodeURIComponent(
+        getSessionId()
+      )}`
+    );
+    progressSourceRef.current = source;
+
+    source.onmessage = (event) => {
+      const data = JSON.parse(event.data);
+      setCompletion(data.completion_percentage);
+
+      // Update current sentence and translation
+      if (
+        data.current_sentence &&
+        data.current_sentence !== lastSentenceRef.current
+      ) {
+        const previous = lastSentenceRef.current;
+        if (previous) {
+          setSentenceHistory((prev) => [previous, ...prev].slice(0, 5)); // Keep last 5 sentences
+        }
+        lastSentenceRef.current = data.current_sentence;
+        setCurrentSentence(data.current_sentence);
+        setCurrentTranslation(data.translation);
+      } else if (data.current_sentence) {
+        // Follow-up event carrying the translation of the same sentence
+        setCurrentTranslation(data.translation);
+      }
 
-          if (response.data.is_completed) {
-            setStoryCompleted(true);
-            clearInterval(interval);
-          }
-        })
-        .catch((error) => {
-          console.error("Error getting story status:", error);
-          clearInterval(interval);
-        });
-    }, 1000);
+      if (data.is_completed) {
+        setStoryCompleted(true);
+        // A null translation means a follow-up event is still coming
+        if (data.translation !== null) {
+          source.close();
+        }
+      }
+    };
+
+    source.onerror = (error) => {
+      console.error("Error in story progress stream:", error);
+    };
+  };
+
+  // Close the progress stream when leaving the page
+  useEffect(() => {
+    return () => {
+      if (progressSourceRef.current) {
+        progressSourceRef.current.close();
+      }
+      narratingRef.current = false;
+    };
+  }, []);
+
+  // Narration audio is streamed from the server one chunk at a time;
+  // when a chunk ends the next one is requested
+  const playNextChunk = () => {
+    api
+      .post(`/api/narration/next`)
+      .then((response) => {
+        if (response.data.done || !response.data.audio_url) return;
+        if (!narratingRef.current || !audioRef.current) return;
+        audioRef.current.src = `${API_BASE_URL}${response.data.audio_url}`;
+        audioRef.current
+          .play()
+          .catch((error) => console.error("Error playing narration:", error));
+      })
+      .catch((error) => {
+        console.error("Error fetching narration:", error);
+      });
+  };
+
+  const handleChunkEnded = () => {
+    if (narratingRef.current) {
+      playNextChunk();
+    }
+  };
+
+  const stopNarrationAudio = () => {
+    narratingRef.current = false;
+    if (audioRef.current) {
+      audioRef.current.pause();
+    }
+  };
+
+  const playClip = (audioUrl) => {
+    if (!audioUrl) return;
+    new Audio(`${API_BASE_URL}${audioUrl}`)
+      .play()
+      .catch((error) => console.error("Error playing audio:", error));
   };
 
   const pauseStory = () => {
-    axios
-      .post(`${API_BASE_URL}/api/pause_story`)
+    stopNarrationAudio();
+    api
+      .post(`/api/pause_story`)
       .then(() => {
         setIsPlaying(false);
         setIsPaused(true);
@@ -142,11 +228,21 @@ const Listening = () => {
   };
 
   const continueStory = () => {
-    axios
-      .post(`${API_BASE_URL}/api/continue_story`)
+    api
+      .post(`/api/continue_story`)
       .then(() => {
         setIsPlaying(true);
         setIsPaused(false);
+        narratingRef.current = true;
+        const audio = audioRef.current;
+        if (audio && audio.src && audio.paused && !audio.ended) {
+          // Resume the chunk that was interrupted
+          audio
+            .play()
+            .catch((error) => console.error("Error playing narration:", error));
+        } else {
+          playNextChunk();
+        }
       })
       .catch((error) => {
         console.error("Error continuing story:", error);
@@ -154,11 +250,14 @@ const Listening = () => {
   };
 
   const repeatCurrent = () => {
-    axios
-      .post(`${API_BASE_URL}/api/repeat_current`)
+    api
+      .post(`/api/repeat_current`)
       .then(() => {
         setIsPlaying(true);
         setIsPaused(false);
+        stopNarrationAudio();
+        narratingRef.current = true;
+        playNextChunk();
       })
       .catch((error) => {
         console.error("Error repeating section:", error);
@@ -168,8 +267,10 @@ const Listening = () => {
   const askQuestion = () => {
     if (!currentQuestion.trim()) return;
 
-    axios
-      .post(`${API_BASE_URL}/api/ask_question`, {
+    // The server stops narration while answering
+    stopNarrationAudio();
+    api
+      .post(`/api/ask_question`, {
         question: currentQuestion,
       })
       .then((response) => {
@@ -177,6 +278,7 @@ const Listening = () => {
         setTamilAnswer(response.data.translation);
         setKeywords(response.data.keywords || []);
         setCurrentQuestion("");
+        playClip(response.data.audio_url);
       })
       .catch((error) => {
         console.error("Error asking question:", error);
@@ -184,8 +286,8 @@ const Listening = () => {
   };
 
   const generateQuiz = () => {
-    axios
-      .get(`${API_BASE_URL}/api/generate_quiz`)
+    api
+      .get(`/api/generate_quiz`)
       .then((response) => {
         setQuiz(response.data.quiz);
         setCurrentQuizIndex(0);
@@ -201,8 +303,8 @@ const Listening = () => {
   const checkAnswer = () => {
     const currentQuestion = quiz[currentQuizIndex];
 
-    axios
-      .post(`${API_BASE_URL}/api/check_answer`, {
+    api
+      .post(`/api/check_answer`, {
         type: currentQuestion.type,
         user_answer: userAnswer,
         correct_answer: currentQuestion.answer,
@@ -239,8 +341,8 @@ const Listening = () => {
   };
 
   const setPreferences = () => {
-    axios
-      .post(`${API_BASE_URL}/api/set_preferences`, {
+    api
+      .post(`/api/set_preferences`, {
         speed: speechSpeed,
         language: selectedLanguage,
         difficulty: difficultyLevel,
@@ -254,8 +356,8 @@ const Listening = () => {
   };
 
   const getUserProgress = () => {
-    axios
-      .get(`${API_BASE_URL}/api/get_user_progress`)
+    api
+      .get(`/api/get_user_progress`)
       .then((response) => {
         setUserProgress(response.data);
       })
@@ -265,8 +367,8 @@ const Listening = () => {
   };
 
   const getTranscript = () => {
-    axios
-      .get(`${API_BASE_URL}/api/get_transcript`)
+    api
+      .get(`/api/get_transcript`)
       .then((response) => {
         setAnalyzedText(response.data.transcript);
         setCulturalNotes(response.data.cultural_notes);
@@ -278,10 +380,11 @@ const Listening = () => {
   };
 
   const pronounceWord = (word) => {
-    axios
-      .post(`${API_BASE_URL}/api/pronounce_word`, { word })
+    api
+      .post(`/api/pronounce_word`, { word })
       .then((response) => {
         console.log("Pronouncing word:", response.data);
+        playClip(response.data.audio_url);
       })
       .catch((error) => {
         console.error("Error pronouncing word:", error);
@@ -332,8 +435,8 @@ const Listening = () => {
 
     setRecordingStatus("checking");
 
-    axios
-      .post(`${API_BASE_URL}/api/check_pronunciation`, formData)
+    api
+      .post(`/api/check_pronunciation`, formData)
       .then((response) => {
         setPronunciationFeedback(response.data);
         setRecordingStatus("idle");
@@ -695,7 +798,7 @@ const Listening = () => {
         </div>
       )}
 
-      <audio ref={audioRef} />
+      <audio ref={audioRef} onEnded={handleChunkEnded} />
     </div>
   );
 };
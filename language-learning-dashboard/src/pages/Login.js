@@ -35,7 +35,11 @@ function Login() {
       );
 
       // Login the user
-      login(response.data.user || { username: formData.username });
+      login(
+        response.data.user || { username: formData.username },
+        response.data.token,
+        response.data.expires_at
+      );
       navigate("/dashboard");
     } catch (err) {
       setError(
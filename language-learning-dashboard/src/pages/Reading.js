@@ -3,6 +3,16 @@ import { useSpeechSynthesis } from "react-speech-kit";
 import Webcam from "react-webcam";
 import "../styles/Reading.css";
 
+// Per-tab id so the server keeps this webcam on the same face tracker
+const getSessionId = () => {
+  let sessionId = sessionStorage.getItem("readingSessionId");
+  if (!sessionId) {
+    sessionId = `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+    sessionStorage.setItem("readingSessionId", sessionId);
+  }
+  return sessionId;
+};
+
 const ReadingPage = () => {
   // Speech synthesis
   const { speak, cancel } = useSpeechSynthesis();
@@ -12,6 +22,8 @@ const ReadingPage = () => {
   const canvasRef = useRef(null);
   const mediaRecorderRef = useRef(null);
   const audioChunksRef = useRef([]);
+  const socketRef = useRef(null);
+  const liveTimerRef = useRef(null);
 
   // Main application state
   const [state, setState] = useState({
@@ -31,6 +43,8 @@ const ReadingPage = () => {
     isRecording: false,
     audioURL: null,
     recordingStatus: "idle", // idle | recording | processing | done
+    liveTracking: false,
+    liveAnalysis: null,
   });
 
   // API call helper
@@ -215,8 +229,58 @@ const ReadingPage = () => {
     }
   };
 
+  // Live mouth tracking over a WebSocket
+  const stopLiveTracking = useCallback(() => {
+    clearInterval(liveTimerRef.current);
+    liveTimerRef.current = null;
+    if (socketRef.current) {
+      socketRef.current.close();
+      socketRef.current = null;
+    }
+    setState((prev) => ({ ...prev, liveTracking: false, liveAnalysis: null }));
+  }, []);
+
+  const startLiveTracking = () => {
+    const params = new URLSearchParams({
+      targetSound: state.targetSound,
+      session_id: getSessionId(),
+    });
+    const socket = new WebSocket(
+      `ws://10.16.49.225:5004/ws/mouth-tracking?${params}`
+    );
+    socket.onmessage = (event) => {
+      const analysis = JSON.parse(event.data);
+      setState((prev) => ({ ...prev, liveAnalysis: analysis }));
+    };
+    socket.onclose = () => stopLiveTracking();
+    socket.onopen = () => {
+      // ~10 fps; skip a tick while the previous frame is still being sent
+      liveTimerRef.current = setInterval(() => {
+        const canvas = webcamRef.current && webcamRef.current.getCanvas();
+        if (!canvas || socket.readyState !== WebSocket.OPEN || socket.bufferedAmount > 0) {
+          return;
+        }
+        canvas.toBlob((blob) => blob && socket.send(blob), "image/jpeg", 0.7);
+      }, 100);
+    };
+    socketRef.current = socket;
+    setState((prev) => ({ ...prev, liveTracking: true, liveAnalysis: null }));
+  };
+
+  // Tell the live session when the target sound changes
+  useEffect(() => {
+    if (socketRef.current && socketRef.current.readyState === WebSocket.OPEN) {
+      socketRef.current.send(JSON.stringify({ targetSound: state.targetSound }));
+    }
+  }, [state.targetSound]);
+
+  useEffect(() => stopLiveTracking, [stopLiveTracking]);
+
   // Webcam functions
   const toggleMirror = async () => {
+    if (state.isMirrorActive) {
+      stopLiveTracking();
+    }
     setState((prev) => ({ ...prev, isMirrorActive: !prev.isMirrorActive }));
   };
 
@@ -245,15 +309,19 @@ const ReadingPage = () => {
       }));
 
       console.log("Sending image for analysis...");
+      // Send the raw JPEG bytes instead of base64 JSON
+      const frame = await (await fetch(image)).blob();
+      const params = new URLSearchParams({
+        targetSound: state.targetSound,
+        sessionId: getSessionId(),
+        annotate: "1",
+      });
       const response = await fetch(
-        "http://10.16.49.225:5004/api/analyze-mouth-shape",
+        `http://10.16.49.225:5004/api/analyze-mouth-frame?${params}`,
         {
           method: "POST",
-          headers: { "Content-Type": "application/json" },
-          body: JSON.stringify({
-            image,
-            targetSound: state.targetSound,
-          }),
+          headers: { "Content-Type": "application/octet-stream" },
+          body: frame,
         }
       );
 
@@ -706,6 +774,26 @@ const ReadingPage = () => {
 
             {/* Mouth Analysis Results - Updated Rendering */}
             <div className="analysis-container">
+              {state.liveTracking && state.liveAnalysis && (
+                <div className="analysis-result">
+                  <h3>Live Feedback</h3>
+                  <div className="analysis-feedback">
+                    <div className="score">
+                      <h4>
+                        Score: <span>{state.liveAnalysis.score}/100</span>
+                      </h4>
+                    </div>
+                    <div className="feedback">
+                      <ul>
+                        {state.liveAnalysis.feedback.map((item, i) => (
+                          <li key={i}>{item}</li>
+                        ))}
+                      </ul>
+                    </div>
+                  </div>
+                </div>
+              )}
+
               {state.analyzingMouth && (
                 <div className="analyzing-indicator">
                   <p>Analyzing mouth shape...</p>
@@ -795,6 +883,17 @@ const ReadingPage = () => {
                     : "Analyze My Mouth Position"}
                 </button>
               )}
+
+              {state.isMirrorActive && (
+                <button
+                  onClick={
+                    state.liveTracking ? stopLiveTracking : startLiveTracking
+                  }
+                  className={state.liveTracking ? "stop-button" : "start-button"}
+                >
+                  {state.liveTracking ? "Stop Live Feedback" : "Live Feedback"}
+                </button>
+              )}
             </div>
 
             <div className="audio-recorder">